@@ -2,14 +2,18 @@
 
 # pyright: reportMissingTypeStubs=false
 
-from controller import update_controller
-from sim_api import fetch_simulator_data
+from runtime import runtime
+from sim_api import history
+from storage.history import METHODS, series_to_json
 
 from layout.All_Data_Tab import render_all_data_tab
 
+import threading
+
 from config import DEBUG_MODE
 from dash import Dash, dcc, html, Output, Input, State, ctx, no_update
 import dash_bootstrap_components as dbc
+from flask import jsonify, request
 
 
 from layout.main_tab import render_main_tab
@@ -20,15 +24,17 @@ from layout.pressurizer_tab import render_pressurizer_tab
 
 # Constants
 
-FETCH_INTERVAL_MS = 1000  # Poll every 2 seconds
+FETCH_INTERVAL_MS = 1000  # UI refresh period; control runs on its own thread (runtime.py)
+HISTORY_MAX_POINTS = 5000  # Upper bound on points per series returned by /api/history
+HISTORY_WINDOWS = {"1 hour": 60, "6 hours": 360, "1 day": 1440, "7 days": 10080}  # label -> in-game minutes
 
 # Initialize Dash app
 app = Dash(__name__, external_stylesheets=[dbc.themes.DARKLY], update_title=None, suppress_callback_exceptions=True)
 app.title = "Nucleares Reactor Controller"
 server = app.server
 
-# Shared global data store
-server.data = {}
+# Latest state published by the control runtime; callbacks only ever read it
+server.runtime = runtime
 
 #CORE_FACTOR = 14.154482083689501 -0.056352917328937525*RODS_POS_ACTUAL +0*COOLANT_CORE_CIRCULATION_PUMP_0_SPEED +0*COOLANT_CORE_CIRCULATION_PUMP_1_SPEED +0.0002587914581647562*COOLANT_CORE_CIRCULATION_PUMP_2_SPEED -0.033459251689966225 *CORE_IODINE_CUMULATIVE -0.10775036341414386*CORE_XENON_CUMULATIVE
 # 1.5 iodine per thermal energy unit each tick i think
@@ -42,7 +48,10 @@ server.data = {}
 def serve_layout():
     return html.Div([
         dcc.Store(id="controller-debug", data={}),
+        dcc.Store(id="rendered-view", data=None),
         html.H2("\u2699\ufe0f Reactor Autocontrol System", style={"margin": "10px"}),
+        dcc.Dropdown(id="history-window", options=[{"label": label, "value": minutes} for label, minutes in HISTORY_WINDOWS.items()],
+                     value=60, clearable=False, style={"width": "150px", "margin": "0 10px", "color": "black"}),
         dcc.Tabs(id="tabs", value="main", children=[
             dcc.Tab(label="Main", value="main"),
             dcc.Tab(label="Pressurizer", value="pressurizer"),
@@ -57,90 +66,100 @@ def serve_layout():
 
 app.layout = serve_layout
 
-# Callback to sync controller toggle into server.data
+# Callback to pass the controller toggle to the control runtime.  Only user clicks count:
+# the toggle is re-rendered from the shared snapshot every refresh, and echoing that value
+# back could undo a change another viewer just made.
 @app.callback(
-    Input("RodControllerToggle", "value")
+    Input("RodControllerToggle", "value"),
+    prevent_initial_call=True
 )
 def sync_controller_toggle(enabled):
-    server.data["rod_controller_enable"] = int(bool(enabled))
+    runtime.request("rod_controller_enable", int(bool(enabled)))
     if DEBUG_MODE:
-        print(f"[DEBUG] rod_controller_enable set to {server.data['rod_controller_enable']}")
-
+        print(f"[DEBUG] rod_controller_enable set to {int(bool(enabled))}")
 
-# Callback: Update simulator data
-@app.callback(
-    Output("tab-content", "children"),
-    Input("poll-interval", "n_intervals"),
-    State("tabs", "value")
-)
-def poll_and_update(n, tab):
-    print("")
-    print("---------------------------------------")
-    print(f"[DEBUG] Poll #{n} - Active Tab: {tab}")
-    try:
-        fetch_simulator_data(server.data)
-    except Exception as e:
-        import traceback
-        print("[ERROR] Exception during fetch:")
-        traceback.print_exc()
-        return html.Div("⚠️ UI rendering error.")
-    try:
-        update_controller(server.data)
-    except Exception as e:
-        import traceback
-        print("[ERROR] Exception during controller update:")
-        traceback.print_exc()
-        return html.Div("⚠️ UI rendering error.")
-    #fetch_simulator_data(server.data)
-    #try:
-    #    update_controller(server.data)
-    #except Exception as e:
-    #    import traceback
-    #    print("[ERROR] During controller update")
-    #    traceback.print_exc()
-    #
-    #if DEBUG_MODE:
-    #    keys = list(server.data.keys())
-    #    print(f"[DEBUG] server.data has {len(keys)} keys: {keys[:5]}")
 
+# History API: /api/history?vars=CORE_TEMP,CORE_PRESSURE&start=0&end=1440&points=500&method=lttb
+# start/end are TIME_STAMP in-game minutes (default: everything); method is lttb, minmax or raw.
+@server.route("/api/history")
+def history_api():
     try:
-        match tab:
-            case "main":        
-                return render_main_tab(server.data)
-            case "pressurizer":        
-                return render_pressurizer_tab(server.data)
-            case "AllData":
-                return render_all_data_tab(server.data)
-            case _:            
-                return html.Div("Tab not implemented.")
+        names = [name for name in request.args.get("vars", "").split(",") if name]
+        start = request.args.get("start", type=float)
+        end = request.args.get("end", type=float)
+        points = min(max(request.args.get("points", 500, type=int), 3), HISTORY_MAX_POINTS)
+        method = request.args.get("method", "lttb")
+        if not names or method not in METHODS:
+            return jsonify({"error": f"vars is required and method must be one of {list(METHODS)}"}), 400
+        return jsonify(series_to_json(history.query(names, start, end, points=points, method=method)))
     except Exception as e:
         import traceback
-        print("[ERROR] Exception during render:")
+        print("[ERROR] Exception during history query:")
         traceback.print_exc()
-        return html.Div("⚠️ UI rendering error.")
-    
-
-
-import threading
-import time
+        return jsonify({"error": str(e)}), 500
+
+
+# Rendered tab content for the current snapshot, shared by every viewer:
+# (snapshot version, {(tab, history window): children}).  Replaced by the first page rendered
+# from a newer snapshot; a page rendered from an older one is not stored.
+_render_cache = (-1, {})
+_render_cache_lock = threading.Lock()
+
+def render_tab(tab, data, history_window):
+    view = {**data, "history_window_minutes": history_window}
+    match tab:
+        case "main":        
+            return render_main_tab(view)
+        case "pressurizer":        
+            return render_pressurizer_tab(view)
+        case "AllData":
+            return render_all_data_tab(data)
+        case _:            
+            return html.Div("Tab not implemented.")
+
+# Callback: render the active tab from the latest snapshot.  Never fetches or controls,
+# so any number of open dashboards cost the simulator nothing extra.
+@app.callback(
+    Output("tab-content", "children"),
+    Output("rendered-view", "data"),
+    Input("poll-interval", "n_intervals"),
+    State("tabs", "value"),
+    State("history-window", "value"),
+    State("rendered-view", "data")
+)
+def poll_and_update(n, tab, history_window, rendered_view):
+    global _render_cache
+    if not runtime.stopped:
+        runtime.start()  # no-op once running; covers servers that import app instead of running it
+    data = runtime.latest()
+    view_key = f"{tab}:{history_window}:{data.version}"
+    if view_key == rendered_view:
+        return no_update, no_update
+    if DEBUG_MODE:
+        print(f"[DEBUG] Poll #{n} - Active Tab: {tab}")
 
-def background_controller_loop(data, interval_sec=0.5):
-    while True:
+    key = (tab, history_window)
+    with _render_cache_lock:
+        version, pages = _render_cache
+        children = pages.get(key) if version == data.version else None
+    if children is None:
         try:
-            if DEBUG_MODE:
-                print("Background Loop calling fetch simulator data")
-            fetch_simulator_data(data)
-            if DEBUG_MODE:
-                print("Background Loop calling fetch simulator data")
-            update_controller(data)
-            #if DEBUG_MODE:
-            #    print("[Background Controller] Tick")
-            time.sleep(interval_sec)
+            children = render_tab(tab, data, history_window or 60)
         except Exception as e:
             import traceback
-            print(f"[Controller Loop Error] {e}")
+            print("[ERROR] Exception during render:")
             traceback.print_exc()
+            return html.Div("⚠️ UI rendering error."), None
+        with _render_cache_lock:
+            version, pages = _render_cache
+            if version < data.version:
+                _render_cache = (data.version, {key: children})
+            elif version == data.version:
+                pages[key] = children
+    return children, view_key
+
 
 if __name__ == "__main__":
-    #threading.Thread(target=background_controller_loop, args=(server.data,), daemon=True).start()
-    app.run(debug=True)
+    runtime.start()
+    # The reloader would run this module twice and start a second control runtime.
+    app.run(debug=True, use_reloader=False)
@@ -1 +1,22 @@
+import os
+
 DEBUG_MODE = True
+
+# Where the simulator data logs are written.  Override with the NUCLEARES_LOG_DIR environment variable.
+LOG_DIR = os.environ.get("NUCLEARES_LOG_DIR", os.path.join(os.path.expanduser("~"), "Documents", "NuclearesDataRepo"))
+
+# Snapshot log segments roll over every in-game day or at this size; closed segments are
+# gzipped in the background and the oldest are deleted beyond these limits (None = no limit).
+LOG_SEGMENT_MAX_BYTES = 64 * 1024 * 1024
+LOG_RETENTION_DAYS = 30
+LOG_RETENTION_MAX_BYTES = 2 * 1024 * 1024 * 1024
+
+# Snapshot log rows go to a separate writer process through a bounded queue.  When it is
+# full, "drop" discards new rows immediately; "block" waits up to LOG_QUEUE_BLOCK_TIMEOUT_S
+# for room first.  Either way the control loop never waits on the disk for longer than that.
+LOG_QUEUE_MAX_ROWS = 10000
+LOG_QUEUE_POLICY = "drop"
+LOG_QUEUE_BLOCK_TIMEOUT_S = 0.05
+
+# Full-plant columnar time-series store (see storage/columnar.py).
+TIMESERIES_DIR = os.path.join(LOG_DIR, "timeseries")
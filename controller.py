@@ -1,17 +1,62 @@
-from sim_api import set_game_variable
+from sim_api import set_game_variable, flush_game_variables, actuator_stats
 from controllers.SecondaryLoop import update_secondary_loop_controllers
-from typing import Any, Dict
+from plant_state import PlantState, plant_state
+from controllers.Utilities.FSM_Compiler import compile_fsm
+from controller_registry import ControllerRegistry, ControllerScheduler
+from timer_wheel import active_timers, game_timers
+from typing import Any, Dict, Optional
 
 # Shared registry to track UI variable displays
 #_display_registry = {}
 
 
-ENABLE     = 0x100000
-RODHI      = 0x010000
-RODLO      = 0x001000
-PPMLIM     = 0x000100
-NOBORON    = 0x000010
-COREACTIVE = 0x000001
+ENABLE     = 0b100000
+RODHI      = 0b010000
+RODLO      = 0b001000
+PPMLIM     = 0b000100
+NOBORON    = 0b000010
+COREACTIVE = 0b000001
+
+# Boron dosing states 1-6 all leave through the same priority chain (first match wins)
+BORON_TRANSITIONS = {
+    (0, ENABLE)                   : 0,  # disabled
+    (ENABLE, ENABLE | COREACTIVE) : 6,  # core not reactive
+    PPMLIM                        : 4,
+    NOBORON                       : 5,
+    RODHI                         : 2,
+    RODLO                         : 3,
+    (0, 0)                        : 1,
+}
+BORON_FSM = compile_fsm({
+    0: {ENABLE: 1},
+    **{state: BORON_TRANSITIONS for state in range(1, 7)},
+})
+
+# Condenser state transition variable
+TEMP_HIGH = 0b10000
+TEMP_LOW  = 0b01000
+PUMP_MAX  = 0b00100
+PUMP_MIN  = 0b00010
+CRIT_TEMP = 0b00001
+
+# Slowest rate the condenser pump is stepped down at, in in-game minutes
+CONDENSER_DECREASE_TIMER = "condenser_decrease"
+CONDENSER_DECREASE_INGAME_MINUTES = 3
+
+# Longest in-game step the rod controller integrates its effort over in one tick.  A normal
+# tick covers about a minute; a longer gap (a stalled poll, a save loaded further on) must
+# not turn into one huge rod move.
+ROD_MAX_STEP_MINUTES = 5.0
+
+CONDENSER_FSM = compile_fsm({
+    0: {(0, 0): 1},                                                                            # Initialize
+    1: {CRIT_TEMP: 6, PUMP_MAX: 4, PUMP_MIN: 5, TEMP_HIGH: 2, TEMP_LOW: 3, (0, 0): 1},           # Hold
+    2: {CRIT_TEMP: 6, PUMP_MAX: 4, PUMP_MIN: 2, TEMP_HIGH: 2, TEMP_LOW: 3, (0, 0): 1},           # Increase
+    3: {CRIT_TEMP: 6, PUMP_MAX: 3, PUMP_MIN: 5, TEMP_HIGH: 2, TEMP_LOW: 3, (0, 0): 1},           # Decrease
+    4: {CRIT_TEMP: 6, (0, PUMP_MAX): 1, TEMP_LOW: 3},                                           # Max pump
+    5: {CRIT_TEMP: 6, (0, PUMP_MIN): 1, TEMP_HIGH: 2},                                          # Minimum pump speed
+    6: {(0, CRIT_TEMP): 1},                                                                     # Panic
+}, unknown_state=0)
 
 
 
@@ -35,8 +80,8 @@ COREACTIVE = 0x000001
 #def get_display_components(tab_name):
 #    return list(_display_registry.get(tab_name, {}).values())
 
-def update_controller(data: Dict[str, Any]) -> None:
-    print("Update Controller")
+def apply_controller_settings(data: Dict[str, Any]) -> None:
+    """Controller enables applied at the start of every tick (also used by tools/replay.py)."""
     data.setdefault("rod_controller_enable", 1)
     data["secondary_pump_controller0_enable"] = 0
     data["secondary_pump_controller1_enable"] = 1
@@ -45,11 +90,16 @@ def update_controller(data: Dict[str, Any]) -> None:
     data["condenser_controller_enable"] = 1
     data["rod_equilize"] = 1
 
-    update_core_temp_and_reactivity(data)
-    update_rod_controller(data)
-    update_secondary_loop_controllers(data)
-    update_boron_dosing_controller(data)
-    update_condenser_controller(data)
+def update_controller(data: Dict[str, Any]) -> None:
+    print("Update Controller")
+    apply_controller_settings(data)
+    plant = plant_state.load(data)
+    # a tick without a TIME_STAMP would look like the clock going back to 0 and reset the wheel
+    if plant.core.has_time_stamp:
+        game_timers.advance(plant.core.time_stamp)
+
+    scheduler.run(data, plant)
+    data["controllers_run"] = len(scheduler.ran_last_tick)
 
     try:
         data["MSCV loop2 DeltaP"] = (data.get("COOLANT_SEC_1_PRESSURE", 0) or 0) - (data.get("STEAM_TURBINE_1_PRESSURE", 0) or 0)
@@ -77,14 +127,16 @@ def update_controller(data: Dict[str, Any]) -> None:
     except Exception:
         data["z_Loop 3 MSCV Throttle"] = -1
 
-    data["controller_last_update"] = data.get("TIME_STAMP", 0) or 0
+    flush_game_variables()
+    data["actuator_writes_suppressed"] = actuator_stats()["suppressed"]
     return
 
 # === Extracted Controllers ===
 
-def update_core_temp_and_reactivity(data: Dict[str, Any]) -> None:
-    core_temp = data.get("CORE_TEMP", 0) or 0
-    core_criticality = float(data.get("CORE_STATE_CRITICALITY", 0) or 0)
+def update_core_temp_and_reactivity(data: Dict[str, Any], plant: Optional[PlantState] = None) -> None:
+    plant = plant or plant_state.load(data)
+    core_temp = plant.core.temp
+    core_criticality = plant.core.criticality
 
     core_temp_target = 350
     core_temp_controller_gain = 1 / 20
@@ -123,24 +175,26 @@ def update_core_temp_and_reactivity(data: Dict[str, Any]) -> None:
         "reactivity_control_effort": reactivity_control_effort
     })
 
-def update_rod_controller(data: Dict[str, Any]) -> None:
-    ingame_time = data.get("TIME_STAMP", 0) or 0
-    delta_minutes = ingame_time - (data.get("controller_last_update", ingame_time) or ingame_time)
+def update_rod_controller(data: Dict[str, Any], plant: Optional[PlantState] = None) -> None:
+    plant = plant or plant_state.load(data)
+    if not plant.core.has_time_stamp:
+        return  # no game clock this tick: the next stamped tick integrates over the whole gap
+    delta_minutes = min(active_timers().elapsed, ROD_MAX_STEP_MINUTES)
     reactivity_control_effort = data.get("reactivity_control_effort", 0) or 0
     rod_actuals: list[float] = []
 
     if data.get("rod_controller_enable", 0):
-        for i in range(9):
+        for rod in plant.rods:
             try:
-                actual = data.get(f"ROD_BANK_POS_{i}_ACTUAL", 0)
-                if isinstance(actual, float):
+                actual = rod.actual
+                if actual is not None:
                     rod_actuals.append(actual)
                     commanded = round(actual + reactivity_control_effort * delta_minutes, 2)
-                    data[f"ROD_BANK_POS_{i}_CONTROLLER"] = commanded
+                    data[rod.controller_key] = commanded
                     if round(commanded, 2) != round(actual, 2):
-                        set_game_variable(f"ROD_BANK_POS_{i}_ORDERED", commanded)
+                        set_game_variable(rod.ordered_key, commanded)
                     else:
-                        print(f"No rod update, request too close, bank: {i+1}")
+                        print(f"No rod update, request too close, bank: {rod.number+1}")
             except Exception:
                 import traceback
                 print("[ERROR] Exception setting rod controller command")
@@ -150,27 +204,12 @@ def update_rod_controller(data: Dict[str, Any]) -> None:
 
 
 def boron_state_transition(state_transition_variable: int) -> int:
-    if not (state_transition_variable & ENABLE):
-        state = 0
-    elif not (state_transition_variable & COREACTIVE):
-        state = 6
-    elif state_transition_variable & PPMLIM:
-        state = 4
-    elif state_transition_variable & NOBORON:
-        state = 5
-    elif state_transition_variable & RODHI:
-        state = 2
-    elif state_transition_variable & RODLO:
-        state = 3
-    else:
-        state = 1
-    return state
+    return BORON_FSM.step(1, state_transition_variable)
 
-def update_boron_dosing_controller(data: Dict[str, Any]) -> None:
+def update_boron_dosing_controller(data: Dict[str, Any], plant: Optional[PlantState] = None) -> None:
     print("")
     print("Starting Boron dosing controller")
-    ingame_time = data.get("TIME_STAMP", 0) or 0
-    boron_update_InGameMinutes = 1
+    plant = plant or plant_state.load(data)
     rod_upper_limit = 60
     rod_lower_limit = 50
     boron_rate_increase = 10
@@ -179,10 +218,9 @@ def update_boron_dosing_controller(data: Dict[str, Any]) -> None:
 
     boron_controller_enable = data.get("boron_controller_enable", 0) or 0
     state = data.get("boron_controller_state", 0) or 0
-    RODS_POS_ACTUAL = data.get("RODS_POS_ACTUAL", -1) or -1
-    boron_ppm = data.get("CHEM_BORON_PPM", -1) or -1
-    last_boron_update_time = data.get("last_boron_update_time", 0) or 0
-    core_state = data.get("CORE_STATE", 0)
+    RODS_POS_ACTUAL = plant.core.rods_pos_actual or -1
+    boron_ppm = plant.chem.boron_ppm or -1
+    core_state = plant.core.state
 
     state_transition_variable = 0
     if boron_controller_enable:
@@ -200,54 +238,40 @@ def update_boron_dosing_controller(data: Dict[str, Any]) -> None:
     if core_state == "REACTIVO":
         state_transition_variable |= COREACTIVE
 
-    print(f"Ingame Time {ingame_time}")
-    print(f"Last Boron Update Time {last_boron_update_time}")
-    if int(ingame_time - last_boron_update_time) < int(boron_update_InGameMinutes):
-        print("Not Time to update boron controller")
-        return
-    data["last_boron_update_time"] = ingame_time
     print(f"🟡State: {state}")
     print(f"Transition Variable: {state_transition_variable:06b}")
     match state:
         case 0:  # Initialize/OFF
             print("State 0")
-            if state_transition_variable & ENABLE:
-                state = 1
-            else:
-                state = 0
         case 1:  # Hold
             set_game_variable("CHEM_BORON_DOSAGE_ORDERED_RATE", 0)
             set_game_variable("CHEM_BORON_FILTER_ORDERED_SPEED", 0)
-            state = boron_state_transition(state_transition_variable)
         case 2:  # increase boron
             set_game_variable("CHEM_BORON_DOSAGE_ORDERED_RATE", boron_rate_increase)
             set_game_variable("CHEM_BORON_FILTER_ORDERED_SPEED", 0)
-            state = boron_state_transition(state_transition_variable)
         case 3:  # decrease boron
             set_game_variable("CHEM_BORON_DOSAGE_ORDERED_RATE", 0)
             set_game_variable("CHEM_BORON_FILTER_ORDERED_SPEED", boron_filter_speed)
-            state = boron_state_transition(state_transition_variable)
         case 4:  # Boron PPM Lim
             set_game_variable("CHEM_BORON_DOSAGE_ORDERED_RATE", 0)
             set_game_variable("CHEM_BORON_FILTER_ORDERED_SPEED", 0)
-            state = boron_state_transition(state_transition_variable)
         case 5:  # no boron
-            state = boron_state_transition(state_transition_variable)
+            pass
         case 6:  # core not reactive
-            state = boron_state_transition(state_transition_variable)
+            pass
         case _:
             pass
+    state = BORON_FSM.step(state, state_transition_variable)
     data["boron_controller_state"] = state
 
-def update_condenser_controller(data: Dict[str, Any]) -> None:
+def update_condenser_controller(data: Dict[str, Any], plant: Optional[PlantState] = None) -> None:
     print("Start Update Condenser")
-    ingame_time = data.get("TIME_STAMP", 0) or 0
+    plant = plant or plant_state.load(data)
     
-    condenser_temp = data.get("CONDENSER_TEMPERATURE", 0)
-    current_speed = data.get("CONDENSER_CIRCULATION_PUMP_SPEED", 0) or 0
+    condenser_temp = plant.condenser.temperature
+    current_speed = plant.condenser.pump_speed
     state = data.get("condenser_controller_state", 0)
     enable = data.get("condenser_controller_enable", 0)
-    last_decrease_time = data.get("last_decrease_time", 0) or 0
 
     condenser_temp_target = 103
     condenser_temp_deadband = 3
@@ -260,13 +284,6 @@ def update_condenser_controller(data: Dict[str, Any]) -> None:
             data["condenser_controller_state"] = -1
             print("No condenser temp")
             return
-        # state transition variable
-        TEMP_HIGH = 0x10000
-        TEMP_LOW = 0x01000
-        PUMP_MAX = 0x00100
-        PUMP_MIN = 0x00010
-        CRIT_TEMP = 0x00001
-
         state_transition = 0
         if condenser_temp > condenser_temp_target + condenser_temp_deadband:
             state_transition |= TEMP_HIGH
@@ -284,89 +301,74 @@ def update_condenser_controller(data: Dict[str, Any]) -> None:
         match state:
             case 0:  # Initialize
                 print("State 0")
-                state = 1
             case 1:  # Hold
                 print("State 1")
-                if state_transition & CRIT_TEMP:
-                    state = 6
-                elif state_transition & PUMP_MAX:
-                    state = 4
-                elif state_transition & PUMP_MIN:
-                    state = 5
-                elif state_transition & TEMP_HIGH:
-                    state = 2
-                elif state_transition & TEMP_LOW:
-                    state = 3
-                else:
-                    state = 1
             case 2:  # Increase
                 print("State 2")
                 new_speed = max(min(current_speed + 1, condenser_pump_max_speed), condenser_pump_min_speed)
                 set_game_variable("CONDENSER_CIRCULATION_PUMP_ORDERED_SPEED", new_speed)
-                if state_transition & CRIT_TEMP:
-                    state = 6
-                elif state_transition & PUMP_MAX:
-                    state = 4
-                elif state_transition & PUMP_MIN:
-                    state = 2
-                elif state_transition & TEMP_HIGH:
-                    state = 2
-                elif state_transition & TEMP_LOW:
-                    state = 3
-                else:
-                    state = 1
             case 3:  # Decrease
                 print("State 3")
                 new_speed = max(min(current_speed - 1, condenser_pump_max_speed), condenser_pump_min_speed)
-                if int(ingame_time - last_decrease_time) > 2:
-                    data["last_decrease_time"] = ingame_time
+                timers = active_timers()
+                if timers.ready(CONDENSER_DECREASE_TIMER):
+                    timers.once(CONDENSER_DECREASE_TIMER, CONDENSER_DECREASE_INGAME_MINUTES)
                     set_game_variable("CONDENSER_CIRCULATION_PUMP_ORDERED_SPEED", new_speed)
-                if state_transition & CRIT_TEMP:
-                    state = 6
-                elif state_transition & PUMP_MAX:
-                    state = 3
-                elif state_transition & PUMP_MIN:
-                    state = 5
-                elif state_transition & TEMP_HIGH:
-                    state = 2
-                elif state_transition & TEMP_LOW:
-                    state = 3
-                else:
-                    state = 1
             case 4:  # Max pump
                 print("State 4")
-                if state_transition & CRIT_TEMP:
-                    state = 6
-                elif not (state_transition & PUMP_MAX):
-                    state = 1
-                elif state_transition & TEMP_LOW:
-                    state = 3
-                else:
-                    state = 4
             case 5:  # Minimum Pump Speed
                 set_game_variable("CONDENSER_CIRCULATION_PUMP_ORDERED_SPEED", condenser_pump_min_speed)
                 print("state 5")
-                if state_transition & CRIT_TEMP:
-                    state = 6
-                elif not (state_transition & PUMP_MIN):
-                    state = 1
-                elif state_transition & TEMP_HIGH:
-                    state = 2
-                else:
-                    state = 5
             case 6:  # Panic
                 print("State 6")
                 set_game_variable("CONDENSER_CIRCULATION_PUMP_ORDERED_SPEED", condenser_pump_max_speed)
-                if not (state_transition & CRIT_TEMP):
-                    state = 1
-                else:
-                    state = 6
             case _:
                 print("State not recognized")
-                state = 0
+        state = CONDENSER_FSM.step(state, state_transition)
         data["condenser_controller_state"] = state
     else:
         data["condenser_controller_state"] = 100
+
+
+# === Controller registry ===
+# What each controller reads and writes decides the run order (see controller_registry.py);
+# priority only breaks ties.  Controllers without a period run when something they read
+# changed; TIME_STAMP in reads means "runs whenever the game clock moves".
+BORON_UPDATE_INGAME_MINUTES = 1
+
+registry = ControllerRegistry()
+registry.register(
+    update_core_temp_and_reactivity,
+    reads=("CORE_TEMP", "CORE_STATE_CRITICALITY"),
+    writes=("core_temp_*", "reactivity_*"),
+    priority=0,
+)
+registry.register(
+    update_rod_controller,
+    reads=("TIME_STAMP", "ROD_BANK_POS_*_ACTUAL", "reactivity_control_effort", "rod_controller_enable", "rod_equilize"),
+    writes=("ROD_BANK_POS_*_ORDERED", "ROD_BANK_POS_*_CONTROLLER"),
+    priority=1,
+)
+registry.register(
+    update_secondary_loop_controllers,
+    reads=("COOLANT_SEC_*_VOLUME", "COOLANT_SEC_CIRCULATION_PUMP_*_SPEED", "secondary_pump_controller*_enable", "secondary_loop*"),
+    writes=("COOLANT_SEC_CIRCULATION_PUMP_*_ORDERED_SPEED", "secondary_loop*_controller_state*"),
+    priority=2,
+)
+registry.register(
+    update_boron_dosing_controller,
+    reads=("RODS_POS_ACTUAL", "CHEM_BORON_PPM", "CORE_STATE", "boron_controller_enable", "boron_controller_state"),
+    writes=("CHEM_BORON_DOSAGE_ORDERED_RATE", "CHEM_BORON_FILTER_ORDERED_SPEED", "boron_controller_state"),
+    period=BORON_UPDATE_INGAME_MINUTES,
+    priority=3,
+)
+registry.register(
+    update_condenser_controller,
+    reads=("TIME_STAMP", "CONDENSER_TEMPERATURE", "CONDENSER_CIRCULATION_PUMP_SPEED", "condenser_controller_*"),
+    writes=("CONDENSER_CIRCULATION_PUMP_ORDERED_SPEED", "condenser_controller_state"),
+    priority=4,
+)
+scheduler = ControllerScheduler(registry)
         
         
  
@@ -0,0 +1,231 @@
+# Filename: controller_registry.py
+#
+# Declarative controller registry and the scheduler that runs it.
+#
+# Each controller is registered with what it reads, what it writes, an optional in-game
+# period and a priority:
+#
+#   registry.register(update_boron_dosing_controller,
+#                     reads=("RODS_POS_ACTUAL", "CHEM_BORON_PPM", "boron_controller_*"),
+#                     writes=("CHEM_BORON_*_ORDERED_*", "boron_controller_state"),
+#                     period=1, priority=3)
+#
+# Names may contain fnmatch wildcards ("ROD_BANK_POS_*_ACTUAL") so rod banks and loops
+# don't have to be listed one by one.  The registry orders the controllers once, so that
+# a controller runs after every controller writing something it reads (ties broken by
+# priority, lower first).  The scheduler then runs a controller on a tick only when:
+#   - it has never run, or
+#   - its `period` (in-game minutes) timer fired, or
+#   - one of the values it reads changed since it last ran (for controllers without a
+#     period, or registered with on_change=True).
+# A controller whose behaviour depends on elapsed time rather than its inputs declares
+# TIME_STAMP as a read, so it runs whenever the game clock moves and not while it's paused.
+# Periods are periodic timers on the game timer wheel (timer_wheel.py), which the caller
+# advances to TIME_STAMP before run().  While run() calls the controllers, the scheduler's
+# wheel is what active_timers() returns on that thread, and if the scheduler was given an
+# `actuator`, set_game_variable() writes go to it instead of sim_api.actuator; a second
+# scheduler (a replay) can then run next to the live one without sharing any state.
+
+import contextlib
+import fnmatch
+import heapq
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from plant_state import PlantState
+from timer_wheel import GameTimerWheel, game_timers, use_timers
+
+
+ControllerFunc = Callable[[Dict[str, Any], PlantState], None]
+_NEVER = object()
+
+
+def _is_pattern(name: str) -> bool:
+    return any(ch in name for ch in "*?[")
+
+def _overlaps(a: str, b: str) -> bool:
+    """True when name/pattern `a` and name/pattern `b` can refer to the same variable."""
+    return a == b or fnmatch.fnmatchcase(a, b) or fnmatch.fnmatchcase(b, a)
+
+
+class ControllerSpec:
+    __slots__ = ("name", "func", "reads", "writes", "period", "priority", "on_change")
+
+    def __init__(self, name: str, func: ControllerFunc, reads: Sequence[str], writes: Sequence[str],
+                 period: Optional[float], priority: int, on_change: bool):
+        self.name = name
+        self.func = func
+        self.reads = tuple(reads)
+        self.writes = tuple(writes)
+        self.period = period
+        self.priority = priority
+        self.on_change = on_change
+
+    def depends_on(self, other: "ControllerSpec") -> bool:
+        return any(_overlaps(read, write) for read in self.reads for write in other.writes)
+
+
+class ControllerRegistry:
+    def __init__(self):
+        self.specs: List[ControllerSpec] = []
+        self._order: Optional[List[ControllerSpec]] = None
+
+    def register(self, func: ControllerFunc, reads: Sequence[str] = (), writes: Sequence[str] = (),
+                 period: Optional[float] = None, priority: int = 0, on_change: Optional[bool] = None,
+                 name: Optional[str] = None) -> ControllerFunc:
+        """
+        Adds a controller called as func(data, plant).  `period` is in in-game minutes.
+        `on_change` defaults to True for controllers without a period and False for
+        periodic ones, so a periodic controller isn't run early because its inputs moved.
+        Returns func, so this also works as a plain call next to the definition.
+        """
+        name = name or func.__name__
+        if any(spec.name == name for spec in self.specs):
+            raise ValueError(f"Controller {name!r} is already registered")
+        if period is not None and period <= 0:
+            raise ValueError(f"Controller {name!r}: period must be positive, got {period}")
+        self.specs.append(ControllerSpec(name, func, reads, writes, period, priority,
+                                         period is None if on_change is None else on_change))
+        self._order = None
+        return func
+
+    def ordered(self) -> List[ControllerSpec]:
+        """Controllers in data-dependency order, ties broken by (priority, registration order)."""
+        if self._order is None:
+            self._order = self._sort()
+        return self._order
+
+    def _sort(self) -> List[ControllerSpec]:
+        specs = self.specs
+        after: Dict[int, List[int]] = {i: [] for i in range(len(specs))}
+        waiting = [0] * len(specs)
+        for i, reader in enumerate(specs):
+            for j, writer in enumerate(specs):
+                if i != j and reader.depends_on(writer):
+                    after[j].append(i)
+                    waiting[i] += 1
+
+        ready = [(spec.priority, i) for i, spec in enumerate(specs) if not waiting[i]]
+        heapq.heapify(ready)
+        order: List[ControllerSpec] = []
+        while ready:
+            _, i = heapq.heappop(ready)
+            order.append(specs[i])
+            for k in after[i]:
+                waiting[k] -= 1
+                if not waiting[k]:
+                    heapq.heappush(ready, (specs[k].priority, k))
+        if len(order) != len(specs):
+            cycle = sorted(spec.name for i, spec in enumerate(specs) if waiting[i])
+            raise ValueError(f"Controller data dependencies form a cycle between: {', '.join(cycle)}")
+        return order
+
+
+class _ControllerRun:
+    """Per-controller scheduling state."""
+    __slots__ = ("spec", "timer", "reads", "last_run", "last_inputs", "runs", "skips")
+
+    def __init__(self, spec: ControllerSpec):
+        self.spec = spec
+        self.timer = f"controller:{spec.name}"
+        self.reads: Tuple[str, ...] = ()
+        self.last_run: Optional[float] = None
+        self.last_inputs: Any = _NEVER
+        self.runs = 0
+        self.skips = 0
+
+
+class ControllerScheduler:
+    """
+    Runs the controllers of a registry, each only when it is due (see the module comment).
+
+    Wildcard reads are expanded against the keys present in `data`.  They are expanded again
+    whenever the plant layout is rebound (PlantState.version: a new catalog, banks or loops
+    added or removed) and whenever keys are added to `data`, e.g. a controller creating its
+    state key on its first run.  Inputs are compared by value with what they were when the
+    controller last started, so a controller that changes its own state key (an FSM moving
+    on) runs again on the next tick until it settles.
+    """
+
+    def __init__(self, registry: ControllerRegistry, timers: GameTimerWheel = game_timers, actuator: Any = None):
+        self.registry = registry
+        self.timers = timers
+        self.actuator = actuator
+        self.ran_last_tick: List[str] = []
+        self._runs: List[_ControllerRun] = []
+        self._bound: Tuple[int, int, int] = (0, -1, -1)
+        self.reset()
+
+    def reset(self):
+        """Forgets when each controller last ran, so all of them run on the next tick."""
+        for run in self._runs:
+            self.timers.cancel(run.timer)
+        self._runs = [_ControllerRun(spec) for spec in self.registry.ordered()]
+        for run in self._runs:
+            if run.spec.period is not None:
+                self.timers.every(run.timer, run.spec.period)
+        self._bound = (0, -1, -1)
+        self.ran_last_tick = []
+
+    @staticmethod
+    def _binding(data: Dict[str, Any], plant: PlantState) -> Tuple[int, int, int]:
+        return id(plant), plant.version, len(data)
+
+    def _bind(self, data: Dict[str, Any], plant: PlantState):
+        keys = list(data)
+        for run in self._runs:
+            reads: List[str] = []
+            for name in run.spec.reads:
+                if _is_pattern(name):
+                    reads += sorted(key for key in keys if fnmatch.fnmatchcase(key, name))
+                else:
+                    reads.append(name)
+            run.reads = tuple(reads)
+        self._bound = self._binding(data, plant)
+
+    def run(self, data: Dict[str, Any], plant: PlantState) -> List[str]:
+        """Runs the due controllers in order.  Returns the names of those that ran."""
+        with contextlib.ExitStack() as bound:
+            bound.enter_context(use_timers(self.timers))
+            if self.actuator is not None:
+                from sim_api import use_actuator
+                bound.enter_context(use_actuator(self.actuator))
+            return self._run(data, plant)
+
+    def _run(self, data: Dict[str, Any], plant: PlantState) -> List[str]:
+        if len(self._runs) != len(self.registry.specs):
+            self.reset()
+        now = plant.core.time_stamp
+        ran: List[str] = []
+        for run in self._runs:
+            if self._binding(data, plant) != self._bound:
+                self._bind(data, plant)
+            spec = run.spec
+            due = run.last_run is None
+            if spec.period is not None and self.timers.take(run.timer):
+                due = True
+            inputs = None
+            if spec.on_change:
+                get = data.get
+                inputs = tuple([get(name) for name in run.reads])
+                due = due or inputs != run.last_inputs
+            if not due:
+                run.skips += 1
+                continue
+            run.last_run = now
+            run.last_inputs = inputs
+            run.runs += 1
+            ran.append(spec.name)
+            try:
+                spec.func(data, plant)
+            except Exception:
+                import traceback
+                print(f"[ERROR] Exception in controller {spec.name}:")
+                traceback.print_exc()
+        self.ran_last_tick = ran
+        return ran
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        return {
+            run.spec.name: {"runs": run.runs, "skips": run.skips, "last_run": run.last_run, "period": run.spec.period}
+            for run in self._runs
+        }
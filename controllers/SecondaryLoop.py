@@ -1,8 +1,10 @@
 
-from typing import Any, Dict
+from typing import Any, Dict, Optional, Sequence
 
+from plant_state import PlantState, plant_state
 from controllers.Utilities.helper_func import fsm_bitmask_generator
-from controllers.Utilities.FSM_Calc import FSM_Calc
+from controllers.Utilities.FSM_Compiler import compile_fsm
+from sim_api import set_game_variable
 
 
 #global variable defs
@@ -22,10 +24,124 @@ PANIC_MINPUMP_HIVOL = 0b00100
 PANIC_LO_VOLUME     = 0b00010
 PANIC_HI_VOLUME     = 0b00001
 
+#loop count from which update_secondary_loop_controllers switches to the batched numpy path.
+#Below it the per-loop code is faster (numpy's per-call overhead is ~80us a tick); the two
+#cost about the same at 25-30 loops.
+SECONDARY_BATCH_MIN_LOOPS = 24
+
+
+
+#set up transition bit masks for the outer state machine    
+#True, False, either = 1, 0, 2
+to_steady  = fsm_bitmask_generator((SEC_ENABLE, 2), (SEC_HIGHVOL_LO, 0), (SEC_HIGHVOL_HI, 0), (SEC_LOWVOL_LO, 0), (SEC_LOWVOL_HI, 0), (SEC_PANIC, 0), (SEC_PANIC_EXIT, 2))
+to_dec_slo = fsm_bitmask_generator((SEC_ENABLE, 2), (SEC_HIGHVOL_LO, 1), (SEC_HIGHVOL_HI, 2), (SEC_LOWVOL_LO, 0), (SEC_LOWVOL_HI, 0), (SEC_PANIC, 0), (SEC_PANIC_EXIT, 2))
+to_dec_fst = fsm_bitmask_generator((SEC_ENABLE, 2), (SEC_HIGHVOL_LO, 2), (SEC_HIGHVOL_HI, 1), (SEC_LOWVOL_LO, 0), (SEC_LOWVOL_HI, 0), (SEC_PANIC, 0), (SEC_PANIC_EXIT, 2))
+to_inc_slo = fsm_bitmask_generator((SEC_ENABLE, 2), (SEC_HIGHVOL_LO, 0), (SEC_HIGHVOL_HI, 0), (SEC_LOWVOL_LO, 1), (SEC_LOWVOL_HI, 2), (SEC_PANIC, 0), (SEC_PANIC_EXIT, 2))
+to_inc_fst = fsm_bitmask_generator((SEC_ENABLE, 2), (SEC_HIGHVOL_LO, 0), (SEC_HIGHVOL_HI, 0), (SEC_LOWVOL_LO, 2), (SEC_LOWVOL_HI, 1), (SEC_PANIC, 0), (SEC_PANIC_EXIT, 2))
+to_panic   = fsm_bitmask_generator((SEC_ENABLE, 2), (SEC_HIGHVOL_LO, 2), (SEC_HIGHVOL_HI, 2), (SEC_LOWVOL_LO, 2), (SEC_LOWVOL_HI, 2), (SEC_PANIC, 1), (SEC_PANIC_EXIT, 2))
+fr_panic   = fsm_bitmask_generator((SEC_ENABLE, 2), (SEC_HIGHVOL_LO, 2), (SEC_HIGHVOL_HI, 2), (SEC_LOWVOL_LO, 2), (SEC_LOWVOL_HI, 2), (SEC_PANIC, 0), (SEC_PANIC_EXIT, 1))
+#create the FSM transition matrix
+Secondary_Loop_FSM_Transition_Matrix = { 
+    "off_init" : {
+        to_steady : "steady"
+    },
+    
+    "steady" : {
+        to_panic   : "panic",
+        to_dec_slo : "decrease_slow",
+        to_inc_slo : "increase_slow",
+        to_steady  : "steady"
+    },
+    
+    "increase_slow": {
+        to_panic   : "panic",
+        to_inc_fst : "increase_fast",
+        to_steady  : "steady",
+        to_inc_slo : "increase_slow"
+    },
+    "increase_fast": {
+        to_panic   : "panic",
+        to_inc_slo : "increase_slow",
+        to_inc_fst : "increase_fast"
+    },
+    "decrease_slow": {
+        to_panic   : "panic",
+        to_dec_fst : "decrease_fast",
+        to_dec_slo : "decrease_slow",
+        to_steady  : "steady"
+    },
+    "decrease_fast": {
+        to_panic   : "panic",
+        to_dec_fst : "decrease_fast",
+        to_dec_slo : "decrease_slow",                             
+    },
+    "panic": {
+        fr_panic : "steady"
+    }
+} 
+
+
+
+#set up the transition bit masks for the panic handler
+# 0 bit mask in NOT, 
+#the low/high panic volumes lie outside the fast bands, so LO_VOLUME always comes with MINPUMP_LOVOL
+#and HI_VOLUME with MINPUMP_HIVOL: those bits are "either" in p_to_lovol/p_to_hivol
+
+p_to_lovol   = fsm_bitmask_generator((PANIC_ENABLE,1),(PANIC_MINPUMP_LOVOL,2),(PANIC_MINPUMP_HIVOL,0),(PANIC_LO_VOLUME,1),(PANIC_HI_VOLUME,0))
+p_to_hivol   = fsm_bitmask_generator((PANIC_ENABLE,1),(PANIC_MINPUMP_LOVOL,0),(PANIC_MINPUMP_HIVOL,2),(PANIC_LO_VOLUME,0),(PANIC_HI_VOLUME,1))
+p_to_pumpoff = fsm_bitmask_generator((PANIC_ENABLE,1),(PANIC_MINPUMP_LOVOL,0),(PANIC_MINPUMP_HIVOL,1),(PANIC_LO_VOLUME,0),(PANIC_HI_VOLUME,0))
+p_to_pumpmin = fsm_bitmask_generator((PANIC_ENABLE,1),(PANIC_MINPUMP_LOVOL,1),(PANIC_MINPUMP_HIVOL,0),(PANIC_LO_VOLUME,0),(PANIC_HI_VOLUME,0))
+p_fr_lovol   = fsm_bitmask_generator((PANIC_ENABLE,2),(PANIC_MINPUMP_LOVOL,0),(PANIC_MINPUMP_HIVOL,2),(PANIC_LO_VOLUME,2),(PANIC_HI_VOLUME,2))
+p_fr_hivol   = fsm_bitmask_generator((PANIC_ENABLE,2),(PANIC_MINPUMP_LOVOL,1),(PANIC_MINPUMP_HIVOL,2),(PANIC_LO_VOLUME,2),(PANIC_HI_VOLUME,2))
+
+#create the panic mode transition matrix
+Panic_Mode_FSM_Transition_Matrix = {
+    "init": {
+        p_to_lovol  : "LoVolume",
+        p_to_hivol  : "HiVolume",
+        p_to_pumpmin: "PumpMin",
+        p_to_pumpoff: "PumpOff"
+
+    },
+    "LoVolume": {
+        p_to_lovol  : "LoVolume",
+        p_fr_lovol  : "Exit"
+    },
+    "HiVolume": {
+        p_to_hivol  : "HiVolume",
+        p_fr_hivol  : "Exit"
+    },
+    #a volume past either panic limit takes over from the pump speed limits
+    "PumpMin": {
+        p_to_lovol  : "LoVolume",
+        p_to_hivol  : "HiVolume",
+        p_to_pumpmin: "PumpMin",
+        p_to_pumpoff: "PumpOff"
+    },
+    "PumpOff": {
+        p_to_lovol  : "LoVolume",
+        p_to_hivol  : "HiVolume",
+        p_to_pumpmin: "PumpMin",
+        p_to_pumpoff: "PumpOff"
+
+    }
+}
+
+#compiled once at import; each evaluation below is a single table lookup
+Secondary_Loop_FSM = compile_fsm(
+    Secondary_Loop_FSM_Transition_Matrix,
+    overrides=[(fsm_bitmask_generator((SEC_ENABLE,0)),"off_init")]
+)
+Panic_Mode_FSM = compile_fsm(
+    Panic_Mode_FSM_Transition_Matrix,
+    overrides=[(fsm_bitmask_generator((PANIC_ENABLE,0)),"Exit")]
+)
+
 
 
  
-def update_secondary_loop_controllers(data:Dict[Any,Any]):
+def update_secondary_loop_controllers(data:Dict[Any,Any], plant: Optional[PlantState] = None):
+    plant = plant or plant_state.load(data)
     
     #--------------------------------------------------------Control Settings ----------------------------------------------------
     secondary_loop_volume_target  = data.setdefault("secondary_loop_volume_target" ,24000)      
@@ -39,113 +155,49 @@ def update_secondary_loop_controllers(data:Dict[Any,Any]):
     secondary_loop_slow_update    = data.setdefault("secondary_loop_slow_update"   ,3    )  
     secondary_loop_fast_update    = data.setdefault("secondary_loop_fast_update"   ,1    )    
   
+    #actions for the current state: pump speed change, and the fixed speed commanded in each panic state
+    secondary_speed_step = {
+        "increase_slow": secondary_loop_slow_update,
+        "increase_fast": secondary_loop_fast_update,
+        "decrease_slow":-secondary_loop_slow_update,
+        "decrease_fast":-secondary_loop_fast_update,
+    }
+    secondary_panic_speed = {
+        "LoVolume": secondary_loop_pump_max,
+        "HiVolume": secondary_loop_pump_off,
+        "PumpMin" : secondary_loop_pump_min,
+        "PumpOff" : secondary_loop_pump_off
+    }
 
+    #evaluate every loop at once with numpy once there are enough loops to pay for its fixed cost;
+    #"secondary_loop_batched" = 1/0 forces either path
+    batched = data.get("secondary_loop_batched")
+    if batched is None:
+        batched = len(plant.loops) >= SECONDARY_BATCH_MIN_LOOPS
+    if batched:
+        _update_loops_batched(
+            data, plant, secondary_loop_volume_target, secondary_loop_slow_tolerance, secondary_loop_high_tolerance,
+            secondary_loop_high_panic, secondary_loop_low_panic, secondary_loop_pump_min,
+            secondary_speed_step, secondary_panic_speed
+        )
+        return
 
 
-    #set up transition bit masks for the outer state machine    
-    #True, False, either = 1, 0, 2
-    to_steady  = fsm_bitmask_generator((SEC_ENABLE, 2), (SEC_HIGHVOL_LO, 0), (SEC_HIGHVOL_HI, 0), (SEC_LOWVOL_LO, 0), (SEC_LOWVOL_HI, 0), (SEC_PANIC, 0), (SEC_PANIC_EXIT, 2))
-    to_dec_slo = fsm_bitmask_generator((SEC_ENABLE, 2), (SEC_HIGHVOL_LO, 1), (SEC_HIGHVOL_HI, 2), (SEC_LOWVOL_LO, 0), (SEC_LOWVOL_HI, 0), (SEC_PANIC, 0), (SEC_PANIC_EXIT, 2))
-    to_dec_fst = fsm_bitmask_generator((SEC_ENABLE, 2), (SEC_HIGHVOL_LO, 2), (SEC_HIGHVOL_HI, 1), (SEC_LOWVOL_LO, 0), (SEC_LOWVOL_HI, 0), (SEC_PANIC, 0), (SEC_PANIC_EXIT, 2))
-    to_inc_slo = fsm_bitmask_generator((SEC_ENABLE, 2), (SEC_HIGHVOL_LO, 0), (SEC_HIGHVOL_HI, 0), (SEC_LOWVOL_LO, 1), (SEC_LOWVOL_HI, 2), (SEC_PANIC, 0), (SEC_PANIC_EXIT, 2))
-    to_inc_fst = fsm_bitmask_generator((SEC_ENABLE, 2), (SEC_HIGHVOL_LO, 0), (SEC_HIGHVOL_HI, 0), (SEC_LOWVOL_LO, 2), (SEC_LOWVOL_HI, 1), (SEC_PANIC, 0), (SEC_PANIC_EXIT, 2))
-    to_panic   = fsm_bitmask_generator((SEC_ENABLE, 2), (SEC_HIGHVOL_LO, 2), (SEC_HIGHVOL_HI, 2), (SEC_LOWVOL_LO, 2), (SEC_LOWVOL_HI, 2), (SEC_PANIC, 1), (SEC_PANIC_EXIT, 2))
-    fr_panic   = fsm_bitmask_generator((SEC_ENABLE, 2), (SEC_HIGHVOL_LO, 2), (SEC_HIGHVOL_HI, 2), (SEC_LOWVOL_LO, 2), (SEC_LOWVOL_HI, 2), (SEC_PANIC, 0), (SEC_PANIC_EXIT, 1))
-    #create the FSM transition matrix
-    Secondary_Loop_FSM_Transition_Matrix = { 
-        "off_init" : {
-            to_steady : "steady"
-        },
-        
-        "steady" : {
-            to_panic   : "panic",
-            to_dec_slo : "decrease_slow",
-            to_inc_slo : "increase_slow",
-            to_steady  : "steady"
-        },
-        
-        "increase_slow": {
-            to_panic   : "panic",
-            to_inc_fst : "increase_fast",
-            to_steady  : "steady",
-            to_inc_slo : "increase_slow"
-        },
-        "increase_fast": {
-            to_panic   : "panic",
-            to_inc_slo : "increase_slow",
-            to_inc_fst : "increase_fast"
-        },
-        "decrease_slow": {
-            to_panic   : "panic",
-            to_dec_fst : "decrease_fast",
-            to_dec_slo : "decrease_slow",
-            to_steady  : "steady"
-        },
-        "decrease_fast": {
-            to_panic   : "panic",
-            to_dec_fst : "decrease_fast",
-            to_dec_slo : "decrease_slow",                             
-        },
-        "panic": {
-            fr_panic : "steady"
-        }
-    } 
-
-
-  
-    #set up the transition bit masks for the panic handler
-    # 0 bit mask in NOT, 
-    
-    p_to_lovol   = fsm_bitmask_generator((PANIC_ENABLE,1),(PANIC_MINPUMP_LOVOL,0),(PANIC_MINPUMP_HIVOL,0),(PANIC_LO_VOLUME,1),(PANIC_HI_VOLUME,0))
-    p_to_hivol   = fsm_bitmask_generator((PANIC_ENABLE,1),(PANIC_MINPUMP_LOVOL,0),(PANIC_MINPUMP_HIVOL,0),(PANIC_LO_VOLUME,0),(PANIC_HI_VOLUME,1))
-    p_to_pumpoff = fsm_bitmask_generator((PANIC_ENABLE,1),(PANIC_MINPUMP_LOVOL,0),(PANIC_MINPUMP_HIVOL,1),(PANIC_LO_VOLUME,0),(PANIC_HI_VOLUME,0))
-    p_to_pumpmin = fsm_bitmask_generator((PANIC_ENABLE,1),(PANIC_MINPUMP_LOVOL,1),(PANIC_MINPUMP_HIVOL,0),(PANIC_LO_VOLUME,0),(PANIC_HI_VOLUME,0))
-    p_fr_lovol   = fsm_bitmask_generator((PANIC_ENABLE,2),(PANIC_MINPUMP_LOVOL,0),(PANIC_MINPUMP_HIVOL,2),(PANIC_LO_VOLUME,2),(PANIC_HI_VOLUME,2))
-    p_fr_hivol   = fsm_bitmask_generator((PANIC_ENABLE,2),(PANIC_MINPUMP_LOVOL,1),(PANIC_MINPUMP_HIVOL,2),(PANIC_LO_VOLUME,2),(PANIC_HI_VOLUME,2))
-    p_fr_pumpmin = fsm_bitmask_generator((PANIC_ENABLE,2),(PANIC_MINPUMP_LOVOL,2),(PANIC_MINPUMP_HIVOL,2),(PANIC_LO_VOLUME,2),(PANIC_HI_VOLUME,1))
-
-    #create the panic mode transition matrix
-    Panic_Mode_FSM_Transition_Matrix = {
-        "init": {
-            p_to_lovol  : "LoVolume",
-            p_to_hivol  : "HiVolume",
-            p_to_pumpmin: "PumpMin",
-            p_to_pumpoff: "PumpOff"
-
-        },
-        "LoVolume": {
-            p_to_lovol  : "LoVolume",
-            p_fr_lovol  : "Exit"
-        },
-        "HiVolume": {
-            p_to_hivol  : "HiVolume",
-            p_fr_hivol  : "Exit"
-        },
-        "PumpMin": {
-            p_to_pumpmin: "PumpMin",
-            p_to_pumpoff: "PumpOff",
-            p_fr_pumpmin: "Exit"
-        },
-        "PumpOff": {
-            p_to_pumpmin: "PumpMin",
-            p_to_pumpoff: "PumpOff"
-
-        }
-    }
-
-    for i in range(3):
+    for loop in plant.loops:
         #get variables and setup
-        print(f"[Secondary Loop {i}] -----------------------------------------------------------------------------------------")
-        loop_state_key = f"secondary_loop{i}_controller_state"        
-        secondary_controller_state = data.get(loop_state_key,"off_init")
-        secondary_panic_state      = data.get(loop_state_key + "_panic","Exit")
-        volume = data.get(f"COOLANT_SEC_{i}_VOLUME")
-        pumpspeed = data.get(f"COOLANT_SEC_CIRCULATION_PUMP_{i}_SPEED")
-        enabled = data.get(f"secondary_pump_controller{i}_enable")
+        print(f"[Secondary Loop {loop.number}] -----------------------------------------------------------------------------------------")
+        secondary_controller_state = data.get(loop.state_key,"off_init")
+        secondary_panic_state      = data.get(loop.panic_state_key,"Exit")
+        volume = loop.volume
+        pumpspeed = loop.pump_speed
+        enabled = data.get(loop.enable_key)
         print(f"Controller enabled: {enabled}, Current state: {secondary_controller_state}")
         
-        
-        
+        #no volume or pump speed reading: treat the loop as disabled and command nothing
+        if None in (volume,pumpspeed):
+            data[loop.state_key] = "off_init"
+            data[loop.panic_state_key] = "Exit"
+            continue
         
         panic =any([
             volume > secondary_loop_high_panic,
@@ -156,13 +208,12 @@ def update_secondary_loop_controllers(data:Dict[Any,Any]):
 
         state_transition_variable = 0
         if enabled                                                               : state_transition_variable |= SEC_ENABLE
-        if None in (volume,pumpspeed)                                            : state_transition_variable &= ~SEC_ENABLE
         if volume > secondary_loop_volume_target + secondary_loop_slow_tolerance : state_transition_variable |= SEC_HIGHVOL_LO
         if volume > secondary_loop_volume_target + secondary_loop_high_tolerance : state_transition_variable |= SEC_HIGHVOL_HI
         if volume < secondary_loop_volume_target - secondary_loop_slow_tolerance : state_transition_variable |= SEC_LOWVOL_LO
-        if volume > secondary_loop_volume_target - secondary_loop_high_tolerance : state_transition_variable |= SEC_LOWVOL_HI
+        if volume < secondary_loop_volume_target - secondary_loop_high_tolerance : state_transition_variable |= SEC_LOWVOL_HI
         if panic                                                                 : state_transition_variable |= SEC_PANIC
-        if secondary_panic_state == "exit"                                       : state_transition_variable |= SEC_PANIC_EXIT       
+        if secondary_panic_state == "Exit"                                       : state_transition_variable |= SEC_PANIC_EXIT       
         
         state_transition_variable_panic = 0
         if panic                                                                 : state_transition_variable_panic |= PANIC_ENABLE
@@ -174,107 +225,125 @@ def update_secondary_loop_controllers(data:Dict[Any,Any]):
 
 
 
-        secondary_action_matrix = {
-            "increase_slow":{f"COOLANT_SEC_CIRCULATION_PUMP_{i}_ORDERED_SPEED":pumpspeed + secondary_loop_slow_update},
-            "increase_fast":{f"COOLANT_SEC_CIRCULATION_PUMP_{i}_ORDERED_SPEED":pumpspeed + secondary_loop_fast_update},
-            "decrease_slow":{f"COOLANT_SEC_CIRCULATION_PUMP_{i}_ORDERED_SPEED":pumpspeed - secondary_loop_slow_update},
-            "decrease_fast":{f"COOLANT_SEC_CIRCULATION_PUMP_{i}_ORDERED_SPEED":pumpspeed - secondary_loop_fast_update},
-        }
-
-        secondary_action_matrix_panic = {
-            "LoVolume":{f"COOLANT_SEC_CIRCULATION_PUMP_{i}_ORDERED_SPEED":secondary_loop_pump_max},
-            "HiVolume":{f"COOLANT_SEC_CIRCULATION_PUMP_{i}_ORDERED_SPEED":secondary_loop_pump_off},
-            "PumpMin" :{f"COOLANT_SEC_CIRCULATION_PUMP_{i}_ORDERED_SPEED":secondary_loop_pump_min},
-            "PumpOff" :{f"COOLANT_SEC_CIRCULATION_PUMP_{i}_ORDERED_SPEED":secondary_loop_pump_off}
-        }
-
-        secondary_global_override_matrix = [
-            (fsm_bitmask_generator((SEC_ENABLE,0)),"off_init")
-        ]
-
-        secondary_global_override_matrix_panic = [
-            (fsm_bitmask_generator((PANIC_ENABLE,0)),"Exit")
-        ]
-
-        secondary_controller_state = FSM_Calc(
-            secondary_controller_state,
-            state_transition_variable,
-            Secondary_Loop_FSM_Transition_Matrix,
-            secondary_action_matrix,
-            secondary_global_override_matrix
-        )
-
-        secondary_panic_state = FSM_Calc(
-            secondary_panic_state,
-            state_transition_variable_panic,
-            Panic_Mode_FSM_Transition_Matrix,
-            secondary_action_matrix_panic,
-            secondary_global_override_matrix_panic
+        speed_step = secondary_speed_step.get(secondary_controller_state)
+        if speed_step is not None:
+            set_game_variable(loop.ordered_speed_key, pumpspeed + speed_step)
+        panic_speed = secondary_panic_speed.get(secondary_panic_state)
+        if panic_speed is not None:
+            set_game_variable(loop.ordered_speed_key, panic_speed)
+
+        secondary_controller_state = Secondary_Loop_FSM.step(secondary_controller_state, state_transition_variable)
+        secondary_panic_state      = Panic_Mode_FSM.step(secondary_panic_state, state_transition_variable_panic)
+        data[loop.state_key] = secondary_controller_state
+        data[loop.panic_state_key] = secondary_panic_state
+
+
+
+#arrays derived from the plant layout and the settings, rebuilt only when those change
+_batch_cache: Dict[Any, Any] = {}
+
+def _state_lookup(fsm, per_state: Dict[str, Any]):
+    """Array indexed by fsm state index (plus the unknown row) holding per_state's value, NaN elsewhere."""
+    key = (id(fsm), tuple(per_state.items()))
+    values = _batch_cache.get(key)
+    if values is None:
+        import numpy as np
+        values = np.full(len(fsm.states) + 1, np.nan)
+        for state, value in per_state.items():
+            if state in fsm.index:
+                values[fsm.index[state]] = value
+        _batch_cache[key] = values
+    return values
+
+def _flag_bits():
+    """Transition bits set by each threshold column of the batched comparisons."""
+    bits = _batch_cache.get("flag_bits")
+    if bits is None:
+        import numpy as np
+        bits = _batch_cache["flag_bits"] = (
+            np.array((SEC_HIGHVOL_LO, SEC_HIGHVOL_HI, 0)),
+            np.array((SEC_LOWVOL_LO, SEC_LOWVOL_HI, 0)),
+            np.array((0, PANIC_MINPUMP_HIVOL, PANIC_HI_VOLUME)),
+            np.array((0, PANIC_MINPUMP_LOVOL, PANIC_LO_VOLUME)),
         )
-        data[loop_state_key] = secondary_controller_state
-        data[loop_state_key + "_panic"] = secondary_panic_state
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
+    return bits
+
+def _loop_slots(plant: PlantState):
+    key = (plant.loop_volume_slots, plant.loop_pump_speed_slots)
+    slots = _batch_cache.get(key)
+    if slots is None:
+        import numpy as np
+        slots = _batch_cache[key] = (np.array(key[0], dtype=np.intp), np.array(key[1], dtype=np.intp))
+    return slots
+
+def _update_loops_batched(
+    data: Dict[Any, Any],
+    plant: PlantState,
+    volume_target: float,
+    slow_tolerance: float,
+    high_tolerance: float,
+    high_panic: float,
+    low_panic: float,
+    pump_min: float,
+    speed_step: Dict[str, Any],
+    panic_speed: Dict[str, Any],
+    ):
+    """
+    Same controller as the per-loop code in update_secondary_loop_controllers, with the
+    volumes, pump speeds, states and transition words of all loops held in arrays.  The
+    only per-loop Python left is reading/writing the state keys in `data` and queueing the
+    pump speed writes for loops whose state commands one.  A loop with no volume or pump speed reading
+    is treated as disabled (off_init / Exit, nothing written), as in the per-loop code.
+    """
+    import numpy as np
+
+    loops: Sequence = plant.loops
+    n = len(loops)
+    if not n:
+        return
+    values  = np.frombuffer(plant.values, dtype=np.float64)
+    volume_slots, pump_slots = _loop_slots(plant)
+    volume  = values[volume_slots]
+    pump    = values[pump_slots]
+    valid   = ~(np.isnan(volume) | np.isnan(pump))
+
+    sec_fsm, panic_fsm = Secondary_Loop_FSM, Panic_Mode_FSM
+    sec_unknown, panic_unknown = len(sec_fsm.states), len(panic_fsm.states)
+    sec_names   = [data.get(loop.state_key, "off_init") for loop in loops]
+    panic_names = [data.get(loop.panic_state_key, "Exit") for loop in loops]
+    sec_state   = np.fromiter((sec_fsm.index.get(name, sec_unknown) for name in sec_names), dtype=np.intp, count=n)
+    panic_state = np.fromiter((panic_fsm.index.get(name, panic_unknown) for name in panic_names), dtype=np.intp, count=n)
+    enabled     = np.fromiter((bool(data.get(loop.enable_key)) for loop in loops), dtype=bool, count=n)
+
+    #one column per threshold: volume above (target + slow, target + high, high panic) and below
+    #(target - slow, target - high, low panic).  Comparisons with NaN are False, so a missing
+    #reading sets no flags.  The flag bits are disjoint, so a matrix product ORs them together.
+    above = volume[:, None] > np.array((volume_target + slow_tolerance, volume_target + high_tolerance, high_panic))
+    below = volume[:, None] < np.array((volume_target - slow_tolerance, volume_target - high_tolerance, low_panic))
+    panic = (above[:, 2] | below[:, 2] | (pump <= pump_min)) & valid
+
+    exit_index = panic_fsm.index["Exit"]
+    panic_state = np.where(panic & (panic_state == exit_index), panic_fsm.index["init"], panic_state)
+
+    sec_above, sec_below, panic_above, panic_below = _flag_bits()
+    word = (
+        above @ sec_above + below @ sec_below
+        + (enabled & valid)              * SEC_ENABLE
+        + panic                          * SEC_PANIC
+        + (panic_state == exit_index)    * SEC_PANIC_EXIT
+    )
+    word_panic = above @ panic_above + below @ panic_below + panic * PANIC_ENABLE
+
+    #actions for the current states; the panic handler's fixed speed wins, as it is written last
+    ordered = pump + _state_lookup(sec_fsm, speed_step)[sec_state]
+    forced  = _state_lookup(panic_fsm, panic_speed)[panic_state]
+    ordered = np.where(valid, np.where(np.isnan(forced), ordered, forced), np.nan)
+    for i in np.flatnonzero(~np.isnan(ordered)):
+        set_game_variable(loops[i].ordered_speed_key, float(ordered[i]))
+
+    next_sec   = sec_fsm.step_array(sec_state, word)
+    next_panic = panic_fsm.step_array(panic_state, word_panic)
+    for i, loop in enumerate(loops):
+        s, p = next_sec[i], next_panic[i]
+        data[loop.state_key]       = sec_fsm.states[s] if s != sec_unknown else sec_names[i]
+        data[loop.panic_state_key] = panic_fsm.states[p] if p != panic_unknown else panic_names[i]
@@ -1,6 +1,7 @@
 from typing import Any, Dict, List, Tuple
 
 from sim_api import set_game_variable
+from controllers.Utilities.FSM_Compiler import mask_matches
 
 
 
@@ -56,7 +57,7 @@ def FSM_Calc(
     """
     try:
         for BitMask, Next_State in Override_Matrix:
-            if Transition_Variable & BitMask == BitMask:
+            if mask_matches(Transition_Variable, BitMask):
                 return Next_State
     except Exception as e:
         print(f"[FSM_Calc] Error processing overide matrix: {e}, returning current state: {Current_State}")        
@@ -77,6 +78,8 @@ def FSM_Calc(
      to do a NOT logic, you must provide a mask of all 1's the same number of bits as the transition matrix and the other bit masks. This is due to
      pythons handling of all variables as 32 bit integers.  
      Note that the function loops through the matrix, so the earlier transitions in the matrix have priority.
+     Keys may also be the (expected, mask) pairs from fsm_bitmask_generator.  For matrices evaluated every tick,
+     compile them once with FSM_Compiler.compile_fsm instead, which gives the same result from a table lookup.
     Transition_Matrix = 
         {
         "steady":
@@ -89,7 +92,7 @@ def FSM_Calc(
     """
     try:
         for BitMask, Next_State in Transition_Matrix.get(Current_State, {}).items():
-            if Transition_Variable & BitMask == BitMask:
+            if mask_matches(Transition_Variable, BitMask):
                 return Next_State
     except Exception as e:
         print(f"[FSM_Calc] Error processing transition matrix: {e}, returning current state: {Current_State}")        
@@ -0,0 +1,122 @@
+from array import array
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+BitMask = Union[int, Tuple[int, int]]
+
+# Largest transition word we will build a dense table for (2**16 entries per state).
+MAX_WORD_BITS = 16
+
+
+def normalize_mask(bitmask: BitMask) -> Tuple[int, int]:
+    """
+    Returns (expected, mask).  Accepts the pairs fsm_bitmask_generator() builds, or a plain
+    int meaning "all of these bits set" (the older FSM_Calc form).
+    """
+    if isinstance(bitmask, tuple):
+        expected, mask = bitmask
+        return expected, mask
+    return bitmask, bitmask
+
+def mask_matches(word: int, bitmask: BitMask) -> bool:
+    expected, mask = normalize_mask(bitmask)
+    return word & mask == expected
+
+
+class CompiledFSM:
+    """
+    Dense transition table for one state machine.
+
+    table[state_index * size + word] is the index of the next state, so step() is one dict
+    lookup for the state name plus one array index, whatever the number of transitions.
+    Precedence matches FSM_Calc: override entries first, then the current state's
+    transitions in the order they were written, else the machine stays where it is.
+    A state missing from the spec still takes the overrides (the last row of the table);
+    otherwise it goes to `unknown_state`, or stays put if that is None.
+    """
+
+    __slots__ = ("states", "index", "size", "word_mask", "table", "unknown_state", "_np_table")
+
+    def __init__(self, states: Sequence[Any], word_bits: int, table: "array[int]", unknown_state: Any = None):
+        self.states = tuple(states)
+        self.index: Dict[Any, int] = {state: i for i, state in enumerate(self.states)}
+        self.size = 1 << word_bits
+        self.word_mask = self.size - 1
+        self.table = table
+        self.unknown_state = unknown_state
+        self._np_table = None
+
+    def step(self, state: Any, word: int) -> Any:
+        unknown = len(self.states)
+        i = self.table[self.index.get(state, unknown) * self.size + (word & self.word_mask)]
+        if i == unknown:
+            return state if self.unknown_state is None else self.unknown_state
+        return self.states[i]
+
+    def step_index(self, state_index: int, word: int) -> int:
+        """Like step() on state indices; len(states) means an unknown state with no override."""
+        return self.table[state_index * self.size + (word & self.word_mask)]
+
+    def step_array(self, state_indices, words):
+        """step_index() for numpy arrays of state indices and words, one gather for all of them."""
+        if self._np_table is None:
+            import numpy as np
+            self._np_table = np.frombuffer(self.table, dtype=np.uint16)
+        return self._np_table[state_indices * self.size + (words & self.word_mask)]
+
+
+def compile_fsm(
+    transitions: Dict[Any, Dict[BitMask, Any]],
+    overrides: Iterable[Tuple[BitMask, Any]] = (),
+    word_bits: Optional[int] = None,
+    unknown_state: Any = None,
+    ) -> CompiledFSM:
+    """
+    Compiles a transition spec in the FSM_Calc format into a CompiledFSM, once.
+
+    transitions = {
+        "steady": {
+            to_panic   : "panic",          # (expected, mask) from fsm_bitmask_generator
+            to_dec_slo : "decrease_slow",
+        },
+        ...
+    }
+    overrides = [(fsm_bitmask_generator((SEC_ENABLE, 0)), "off_init")]
+
+    `word_bits` defaults to the highest bit used by any mask; transition words are masked
+    to that width when evaluated.
+    """
+    overrides = [(normalize_mask(bitmask), target) for bitmask, target in overrides]
+    rules: Dict[Any, List[Tuple[Tuple[int, int], Any]]] = {
+        state: [(normalize_mask(bitmask), target) for bitmask, target in spec.items()]
+        for state, spec in transitions.items()
+    }
+
+    states: Dict[Any, None] = {}
+    for state, spec in rules.items():
+        states[state] = None
+        states.update(dict.fromkeys(target for _, target in spec))
+    states.update(dict.fromkeys(target for _, target in overrides))
+    states_list = list(states)
+    index = {state: i for i, state in enumerate(states_list)}
+
+    if word_bits is None:
+        used = 0
+        for (expected, mask), _ in overrides + [rule for spec in rules.values() for rule in spec]:
+            used |= expected | mask
+        word_bits = used.bit_length()
+    if word_bits > MAX_WORD_BITS:
+        raise ValueError(f"Transition word needs {word_bits} bits; dense tables are limited to {MAX_WORD_BITS}")
+
+    size = 1 << word_bits
+    unknown = len(states_list)
+    table = array("H", bytes(2 * size * (unknown + 1)))
+    for i in range(unknown + 1):
+        candidates = overrides + rules.get(states_list[i], []) if i < unknown else overrides
+        for word in range(size):
+            target = i
+            for (expected, mask), next_state in candidates:
+                if word & mask == expected:
+                    target = index[next_state]
+                    break
+            table[i * size + word] = target
+    return CompiledFSM(states_list, word_bits, table, unknown_state)
@@ -1,8 +1,10 @@
+from collections.abc import Mapping
+
 from dash import html
 import dash_bootstrap_components as dbc
 
-def render_all_data_tab(data: dict, max_rows_per_column: int = 50):
-    if not isinstance(data, dict):
+def render_all_data_tab(data: Mapping, max_rows_per_column: int = 50):
+    if not isinstance(data, Mapping):
         return html.Div("Waiting for data...")
 
     omit_keys = [
@@ -12,9 +12,9 @@ from dash import html, dcc
 import dash_bootstrap_components as dbc
 import dash_daq as daq
 import plotly.graph_objs as go
-import pandas as pd
 
 from config import DEBUG_MODE
+from sim_api import history
 
 
 
@@ -65,13 +65,12 @@ UI_CONFIG = { # type: ignore
         "margin": dict(t=30, b=30, l=50, r=20),
         "xaxis_range": [0, 60],
         "xaxis_dtick": 10,
-        "yaxis_buffer": 100
+        "yaxis_buffer": 100,
+        "points": 400
     }
 }
 
-# Persistent history
-data_history = pd.DataFrame(columns=["ingame_minutes", "CORE_TEMP", "COOLANT_SEC_0_VOLUME", "COOLANT_SEC_1_VOLUME", "COOLANT_SEC_2_VOLUME"])
-last_ingame_time = None
+history_variables = ["CORE_TEMP", "COOLANT_SEC_0_VOLUME", "COOLANT_SEC_1_VOLUME", "COOLANT_SEC_2_VOLUME"]
 
 #def get_controller_state_as_table(state: int):
 #    return html.Table([
@@ -87,8 +86,6 @@ def make_row(label, value, background_color, text_color="lightgray"):
     ])
 
 def render_main_tab(data):
-    global data_history, last_ingame_time
-
     if not data:
         if DEBUG_MODE:
             print("[Core_tab DEBUG] render_core_tab received empty data")
@@ -103,6 +100,8 @@ def render_main_tab(data):
     core_temp_target = data.get("core_temp_target", 0)
     core_criticality = float(data.get("CORE_STATE_CRITICALITY", -1.0) or -1.0)
     ingame_time = data.get("TIME_STAMP", -1)
+    if not isinstance(ingame_time, (int, float)) or isinstance(ingame_time, bool):
+        ingame_time = -1  # present but undecoded (None): same as missing
     
     rod_actuals = [data.get(f"ROD_BANK_POS_{i}_ACTUAL", -1) for i in range(9)]
     rod_ordered = [data.get(f"ROD_BANK_POS_{i}_ORDERED", -1) for i in range(9)]
@@ -132,24 +131,12 @@ def render_main_tab(data):
     
     condenser_temperature = data.get("CONDENSER_TEMPERATURE",0)
 
-    # Update temperature history
-    data_history = pd.concat([
-        data_history,
-        pd.DataFrame({
-            "ingame_minutes": [ingame_time],
-            "CORE_TEMP": [core_temp],
-            "COOLANT_SEC_0_VOLUME": [COOLANT_SEC_0_VOLUME],
-            "COOLANT_SEC_1_VOLUME": [COOLANT_SEC_1_VOLUME],
-            "COOLANT_SEC_2_VOLUME": [COOLANT_SEC_2_VOLUME]
-        })
-    ], ignore_index=True)
-
-    if last_ingame_time is None or ingame_time > last_ingame_time:
-        data_history = data_history[data_history["ingame_minutes"] >= ingame_time - 60]
-        last_ingame_time = ingame_time
-
-    data_history["Minutes Ago"] = (ingame_time - data_history["ingame_minutes"]).clip(lower=0, upper=60)
-    
+    # History comes from the time-series store, reduced on the server to a fixed point count
+    history_window = data.get("history_window_minutes", 60) or 60
+    x_dtick = history_window * UI_CONFIG["chart"]["xaxis_dtick"] / UI_CONFIG["chart"]["xaxis_range"][1]
+    series = history.query(history_variables, ingame_time - history_window, ingame_time, points=UI_CONFIG["chart"]["points"])
+    minutes_ago = {name: series[name]["t"] - ingame_time for name in history_variables}
+
     # === Components ===
     
     rows = [
@@ -359,8 +346,8 @@ def render_main_tab(data):
         dbc.CardBody([
             dcc.Graph(figure=go.Figure([
                 go.Scatter(
-                    x=-data_history["Minutes Ago"],
-                    y=data_history["CORE_TEMP"],
+                    x=minutes_ago["CORE_TEMP"],
+                    y=series["CORE_TEMP"]["y"],
                     mode="lines",
                     line=dict(color=UI_CONFIG["colors"]["line"], width=2),
                     name="Core Temp"
@@ -386,8 +373,8 @@ def render_main_tab(data):
                     autorange=False,
                     linecolor=UI_CONFIG["colors"]["axis"],
                     mirror=True,
-                    range=[-60, 0],
-                    dtick=UI_CONFIG["chart"]["xaxis_dtick"],
+                    range=[-history_window, 0],
+                    dtick=x_dtick,
                     gridcolor=UI_CONFIG["colors"]["grid"]
                 )
             ), config={"displayModeBar": False})
@@ -396,9 +383,8 @@ def render_main_tab(data):
     
     # Calculate dynamic y-axis upper limit
     max_y_value = max(
-        data_history["COOLANT_SEC_0_VOLUME"].max(),
-        data_history["COOLANT_SEC_1_VOLUME"].max(),
-        data_history["COOLANT_SEC_2_VOLUME"].max()
+        (series[name]["y"].max() for name in history_variables[1:] if len(series[name]["y"])),
+        default=0
     )
    
 
@@ -410,22 +396,22 @@ def render_main_tab(data):
         dbc.CardBody([
             dcc.Graph(figure=go.Figure([
                 go.Scatter(
-                    x=-data_history["Minutes Ago"],
-                    y=data_history["COOLANT_SEC_2_VOLUME"],
+                    x=minutes_ago["COOLANT_SEC_2_VOLUME"],
+                    y=series["COOLANT_SEC_2_VOLUME"]["y"],
                     mode="lines",
                     line=dict(color="orange", width=2),
                     name="Loop 3"
                 ),
                 go.Scatter(
-                    x=-data_history["Minutes Ago"],
-                    y=data_history["COOLANT_SEC_1_VOLUME"],
+                    x=minutes_ago["COOLANT_SEC_1_VOLUME"],
+                    y=series["COOLANT_SEC_1_VOLUME"]["y"],
                     mode="lines",
                     line=dict(color="cyan", width=2),
                     name="Loop 2"
                 ),
                 go.Scatter(
-                    x=-data_history["Minutes Ago"],
-                    y=data_history["COOLANT_SEC_0_VOLUME"],
+                    x=minutes_ago["COOLANT_SEC_0_VOLUME"],
+                    y=series["COOLANT_SEC_0_VOLUME"]["y"],
                     mode="lines",
                     line=dict(color="magenta", width=2),
                     name="Loop 1"
@@ -452,8 +438,8 @@ def render_main_tab(data):
                     autorange=False,
                     linecolor=UI_CONFIG["colors"]["axis"],
                     mirror=True,
-                    range=[-60, 0],
-                    dtick=UI_CONFIG["chart"]["xaxis_dtick"],
+                    range=[-history_window, 0],
+                    dtick=x_dtick,
                     gridcolor=UI_CONFIG["colors"]["grid"]
                 )
             ), config={"displayModeBar": False})
@@ -6,29 +6,35 @@
 from dash import dcc
 import dash_bootstrap_components as dbc # type: ignore
 import plotly.graph_objs as go # type: ignore
-import pandas as pd
 import typing as t
 
-pressure_history = pd.DataFrame(columns=["ingame_minutes", "CORE_PRESSURE"])
+from sim_api import history
 
-def render_pressurizer_tab(data: t.Dict[t.Any, t.Any]) -> dbc.Row:
-    global pressure_history
+CHART_POINTS = 400
 
+def render_pressurizer_tab(data: t.Dict[t.Any, t.Any]) -> dbc.Row:
     core_pressure = data.get("CORE_PRESSURE", 0)
     core_pressure_max = data.get("CORE_PRESSURE_MAX", 200)
     core_pressure_oper = data.get("CORE_PRESSURE_OPERATIVE", 155)
     ingame_time = data.get("TIME_STAMP", 0)
 
-    # --- History ---
-    new_row = pd.DataFrame({"ingame_minutes": [ingame_time], "CORE_PRESSURE": [core_pressure]})
-    pressure_history = pd.concat([pressure_history, new_row], ignore_index=True)
-    pressure_history = pressure_history[pressure_history["ingame_minutes"] >= ingame_time - 60] # type: ignore
-    pressure_history["Minutes Ago"] = ingame_time - pressure_history["ingame_minutes"]
+    # --- History (min/max envelope so pressure spikes are never averaged away) ---
+    history_window = data.get("history_window_minutes", 60) or 60
+    pressure = history.query(["CORE_PRESSURE"], ingame_time - history_window, ingame_time, points=CHART_POINTS, method="minmax")["CORE_PRESSURE"]
 
     fig: go.Figure = go.Figure() # type: ignore
     fig.add_trace(go.Scatter( # type: ignore
-        x=pressure_history["Minutes Ago"], # type: ignore
-        y=pressure_history["CORE_PRESSURE"], # type: ignore
+        x=ingame_time - pressure["t"],
+        y=pressure["min"],
+        mode="lines",
+        line=dict(color="lightblue", width=0),
+        showlegend=False,
+        hoverinfo="skip"
+    ))
+    fig.add_trace(go.Scatter( # type: ignore
+        x=ingame_time - pressure["t"],
+        y=pressure["max"],
+        fill="tonexty",
         mode="lines",
         line=dict(color="lightblue", width=2),
         name="Core Pressure"
@@ -0,0 +1,220 @@
+# Filename: plant_state.py
+#
+# Slot-based view of the plant variables the controllers read every tick.
+#
+# PlantState.bind() maps each variable to a fixed slot in one typed array, once per catalog
+# version, and builds the group views (rods, secondary loops, core, condenser, chem) with
+# every key string the controllers need precomputed.  load(data) then copies the values
+# across in a single pass over a prebuilt (name, slot) list; after that the controllers
+# read plain attributes instead of formatting f-string keys and doing dict lookups with
+# "or 0" fallbacks for every field.
+#
+# Bank and loop counts come from the catalog (or, when replaying recorded data without a
+# catalog, from the keys present in the data), not from hard-coded ranges.
+
+import math
+from array import array
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import sim_api
+
+
+NAN = math.nan
+MAX_GROUP_MEMBERS = 64  # upper bound when counting rod banks / loops in a catalog
+
+
+def _value(values: "array[float]", slot: int, default: Optional[float]) -> Optional[float]:
+    value = values[slot]
+    return default if value != value else value
+
+
+class RodBank:
+    __slots__ = ("number", "_values", "_actual", "actual_key", "ordered_key", "controller_key")
+
+    def __init__(self, number: int, values: "array[float]", actual: int):
+        self.number = number
+        self._values = values
+        self._actual = actual
+        self.actual_key = f"ROD_BANK_POS_{number}_ACTUAL"
+        self.ordered_key = f"ROD_BANK_POS_{number}_ORDERED"
+        self.controller_key = f"ROD_BANK_POS_{number}_CONTROLLER"
+
+    @property
+    def actual(self) -> Optional[float]:
+        return _value(self._values, self._actual, None)
+
+
+class SecondaryLoop:
+    __slots__ = ("number", "_values", "_volume", "_pump_speed", "volume_key", "pump_speed_key", "ordered_speed_key",
+                 "state_key", "panic_state_key", "enable_key")
+
+    def __init__(self, number: int, values: "array[float]", volume: int, pump_speed: int):
+        self.number = number
+        self._values = values
+        self._volume = volume
+        self._pump_speed = pump_speed
+        self.volume_key = f"COOLANT_SEC_{number}_VOLUME"
+        self.pump_speed_key = f"COOLANT_SEC_CIRCULATION_PUMP_{number}_SPEED"
+        self.ordered_speed_key = f"COOLANT_SEC_CIRCULATION_PUMP_{number}_ORDERED_SPEED"
+        self.state_key = f"secondary_loop{number}_controller_state"
+        self.panic_state_key = f"secondary_loop{number}_controller_state_panic"
+        self.enable_key = f"secondary_pump_controller{number}_enable"
+
+    @property
+    def volume(self) -> Optional[float]:
+        return _value(self._values, self._volume, None)
+
+    @property
+    def pump_speed(self) -> Optional[float]:
+        return _value(self._values, self._pump_speed, None)
+
+
+class Core:
+    __slots__ = ("_state", "_values", "_time_stamp", "_temp", "_criticality", "_rods_pos_actual")
+
+    def __init__(self, state: "PlantState", slots: Dict[str, int]):
+        self._state = state
+        self._values = state.values
+        self._time_stamp = slots["TIME_STAMP"]
+        self._temp = slots["CORE_TEMP"]
+        self._criticality = slots["CORE_STATE_CRITICALITY"]
+        self._rods_pos_actual = slots["RODS_POS_ACTUAL"]
+
+    @property
+    def time_stamp(self) -> float:
+        return _value(self._values, self._time_stamp, 0.0)
+
+    @property
+    def has_time_stamp(self) -> bool:
+        """False when this tick has no TIME_STAMP reading and time_stamp is only its 0.0 default."""
+        stamp = self._values[self._time_stamp]
+        return stamp == stamp
+
+    @property
+    def temp(self) -> float:
+        return _value(self._values, self._temp, 0.0)
+
+    @property
+    def criticality(self) -> float:
+        return _value(self._values, self._criticality, 0.0)
+
+    @property
+    def rods_pos_actual(self) -> float:
+        return _value(self._values, self._rods_pos_actual, -1.0)
+
+    @property
+    def state(self) -> Any:
+        """CORE_STATE as reported by the game (e.g. "REACTIVO"), or 0 when unknown."""
+        return self._state.core_state
+
+
+class Condenser:
+    __slots__ = ("_values", "_temperature", "_pump_speed")
+
+    def __init__(self, values: "array[float]", slots: Dict[str, int]):
+        self._values = values
+        self._temperature = slots["CONDENSER_TEMPERATURE"]
+        self._pump_speed = slots["CONDENSER_CIRCULATION_PUMP_SPEED"]
+
+    @property
+    def temperature(self) -> Optional[float]:
+        return _value(self._values, self._temperature, None)
+
+    @property
+    def pump_speed(self) -> float:
+        return _value(self._values, self._pump_speed, 0.0)
+
+
+class Chem:
+    __slots__ = ("_values", "_boron_ppm")
+
+    def __init__(self, values: "array[float]", slots: Dict[str, int]):
+        self._values = values
+        self._boron_ppm = slots["CHEM_BORON_PPM"]
+
+    @property
+    def boron_ppm(self) -> float:
+        return _value(self._values, self._boron_ppm, -1.0)
+
+
+SCALAR_VARIABLES = (
+    "TIME_STAMP", "CORE_TEMP", "CORE_STATE_CRITICALITY", "RODS_POS_ACTUAL",
+    "CONDENSER_TEMPERATURE", "CONDENSER_CIRCULATION_PUMP_SPEED", "CHEM_BORON_PPM",
+)
+
+
+class PlantState:
+    """
+    Typed registry of the controller inputs.  Numeric values live in one array("d") with
+    NaN for missing; views return their documented default instead of NaN.
+    """
+
+    __slots__ = ("names", "slots", "values", "version", "core_state", "rods", "loops", "loop_volume_slots", "loop_pump_speed_slots",
+                 "core", "condenser", "chem", "_load", "_source", "_probes")
+
+    def __init__(self):
+        self.names: Tuple[str, ...] = ()
+        self.slots: Dict[str, int] = {}
+        self.values = array("d")
+        self.version = 0              # bumped by every bind(), so callers can tell the layout changed
+        self.core_state: Any = 0
+        self.rods: List[RodBank] = []
+        self.loops: List[SecondaryLoop] = []
+        self.loop_volume_slots: Tuple[int, ...] = ()
+        self.loop_pump_speed_slots: Tuple[int, ...] = ()
+        self._load: List[Tuple[str, int]] = []
+        self._source: Any = None
+        self._probes: Tuple[str, ...] = ()
+        self.bind(())
+
+    def bind(self, available: Sequence[str]):
+        """Lays out the slots for the rod banks and loops present in `available`."""
+        present = set(available)
+        rod_count = next((i for i in range(MAX_GROUP_MEMBERS) if f"ROD_BANK_POS_{i}_ACTUAL" not in present), MAX_GROUP_MEMBERS)
+        loop_count = next((i for i in range(MAX_GROUP_MEMBERS) if f"COOLANT_SEC_{i}_VOLUME" not in present), MAX_GROUP_MEMBERS)
+
+        names: List[str] = list(SCALAR_VARIABLES)
+        for i in range(rod_count):
+            names.append(f"ROD_BANK_POS_{i}_ACTUAL")
+        for i in range(loop_count):
+            names += [f"COOLANT_SEC_{i}_VOLUME", f"COOLANT_SEC_CIRCULATION_PUMP_{i}_SPEED"]
+
+        self.names = tuple(names)
+        self.version += 1
+        self.slots = {name: slot for slot, name in enumerate(names)}
+        self.values = array("d", [NAN]) * len(names)
+        self._load = list(self.slots.items())
+        self.rods = [RodBank(i, self.values, self.slots[f"ROD_BANK_POS_{i}_ACTUAL"]) for i in range(rod_count)]
+        self.loops = [SecondaryLoop(i, self.values, self.slots[f"COOLANT_SEC_{i}_VOLUME"], self.slots[f"COOLANT_SEC_CIRCULATION_PUMP_{i}_SPEED"])
+                      for i in range(loop_count)]
+        # For batched controllers: values[loop_volume_slots[i]] is loop i's volume
+        self.loop_volume_slots = tuple(loop._volume for loop in self.loops)
+        self.loop_pump_speed_slots = tuple(loop._pump_speed for loop in self.loops)
+        self.core = Core(self, self.slots)
+        self.condenser = Condenser(self.values, self.slots)
+        self.chem = Chem(self.values, self.slots)
+        # Keys whose appearance means the data has more banks/loops than we laid out.
+        self._probes = (f"ROD_BANK_POS_{rod_count}_ACTUAL", f"COOLANT_SEC_{loop_count}_VOLUME")
+
+    def load(self, data: Dict[str, Any]) -> "PlantState":
+        """Copies this tick's values out of `data`.  Rebinds first if the catalog changed."""
+        catalog = sim_api.catalog
+        if catalog.loaded:
+            if self._source != catalog.version:
+                self.bind(catalog.get_vars)
+                self._source = catalog.version
+        elif self._source is not None or any(probe in data for probe in self._probes):
+            self.bind([name for name in data if name.isupper()])
+            self._source = None
+
+        get = data.get
+        values = self.values
+        for name, slot in self._load:
+            value = get(name)
+            kind = type(value)
+            values[slot] = value if kind is float else float(value) if kind is int else NAN
+        self.core_state = get("CORE_STATE", 0)
+        return self
+
+
+plant_state = PlantState()
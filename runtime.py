@@ -0,0 +1,161 @@
+# Filename: runtime.py
+#
+# Control runtime: one thread that fetches simulator data and runs the controllers at a
+# fixed rate, independent of whether any browser has the dashboard open.  The Dash app
+# only reads the state this thread publishes after every tick.
+
+import atexit
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+from config import DEBUG_MODE
+from controller import update_controller
+from sim_api import fetch_simulator_data
+from snapshot import Snapshot, SnapshotPublisher
+
+
+CONTROL_INTERVAL_S = 1.0      # Fixed control period (wall clock)
+STOP_TIMEOUT_S = 10.0         # How long stop() waits for the tick in progress to finish
+
+
+def control_tick(data: Dict[str, Any]) -> None:
+    """One control cycle: read the plant, then run the controllers (which flush their writes)."""
+    try:
+        fetch_simulator_data(data)
+    except Exception:
+        import traceback
+        print("[ERROR] Exception during fetch:")
+        traceback.print_exc()
+        return
+    try:
+        update_controller(data)
+    except Exception:
+        import traceback
+        print("[ERROR] Exception during controller update:")
+        traceback.print_exc()
+
+
+class ControlRuntime:
+    """
+    Runs `tick(data)` every `interval_s` seconds on a dedicated thread.
+
+    Deadlines are fixed multiples of the interval from the start time, so time spent in a
+    tick is subtracted from the following sleep and the rate doesn't drift.  A tick that
+    runs past its next deadline counts as an overrun; the slots it overran are skipped
+    (counted in `missed_ticks`) rather than run back to back to catch up.
+
+    The thread owns `data`.  Other threads never touch it: they call request() to change
+    a setting (applied at the start of the next tick) and latest() to read the immutable
+    Snapshot published after the last completed tick.
+    """
+
+    def __init__(self, tick: Callable[[Dict[str, Any]], None] = control_tick, interval_s: float = CONTROL_INTERVAL_S,
+                 data: Optional[Dict[str, Any]] = None):
+        self.tick = tick
+        self.interval_s = interval_s
+        self.data: Dict[str, Any] = {} if data is None else data
+        self.ticks = 0
+        self.overruns = 0
+        self.missed_ticks = 0
+        self.last_duration_s = 0.0
+        self.max_duration_s = 0.0
+        self.max_lateness_s = 0.0
+        self.stopped = False
+        self.snapshots = SnapshotPublisher()
+        self._requests: Dict[str, Any] = {}
+        self._requests_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        """Starts the control thread.  Safe to call from any thread, any number of times."""
+        if self.running:
+            return
+        with self._start_lock:
+            if self.running:
+                return
+            self.stopped = False
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="control-runtime", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout_s: float = STOP_TIMEOUT_S):
+        """Lets the tick in progress finish, then ends the thread."""
+        self.stopped = True
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout_s)
+            if self._thread.is_alive():
+                print("[ERROR] Control runtime did not stop within the timeout")
+            self._thread = None
+
+    def request(self, key: str, value: Any):
+        """Sets data[key] = value at the start of the next tick (e.g. a controller enable from the UI)."""
+        with self._requests_lock:
+            self._requests[key] = value
+
+    def latest(self) -> Snapshot:
+        """The state published after the last completed tick (version 0 and empty before the first)."""
+        return self.snapshots.latest()
+
+    def _apply_requests(self):
+        with self._requests_lock:
+            requests, self._requests = self._requests, {}
+        self.data.update(requests)
+
+    def _run(self):
+        next_deadline = time.monotonic()
+        while not self._stop.is_set():
+            started = time.monotonic()
+            self.max_lateness_s = max(self.max_lateness_s, started - next_deadline)
+            self._apply_requests()
+            try:
+                self.tick(self.data)
+            except Exception:
+                import traceback
+                print("[ERROR] Exception in control tick:")
+                traceback.print_exc()
+
+            finished = time.monotonic()
+            self.ticks += 1
+            self.last_duration_s = finished - started
+            self.max_duration_s = max(self.max_duration_s, self.last_duration_s)
+
+            next_deadline += self.interval_s
+            if finished > next_deadline:
+                overrun_s = finished - next_deadline
+                skipped = int(overrun_s // self.interval_s) + 1
+                self.overruns += 1
+                self.missed_ticks += skipped
+                next_deadline += skipped * self.interval_s
+                if DEBUG_MODE:
+                    print(f"[Runtime] Tick overran by {overrun_s * 1000:.0f} ms, skipping {skipped} tick(s)")
+            self._publish()
+            self._stop.wait(max(0.0, next_deadline - time.monotonic()))
+
+    def _publish(self):
+        self.data["runtime_ticks"] = self.ticks
+        self.data["runtime_overruns"] = self.overruns
+        self.data["runtime_last_tick_ms"] = round(self.last_duration_s * 1000, 1)
+        self.snapshots.publish(self.data)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "running": self.running,
+            "ticks": self.ticks,
+            "overruns": self.overruns,
+            "missed_ticks": self.missed_ticks,
+            "last_duration_ms": round(self.last_duration_s * 1000, 2),
+            "max_duration_ms": round(self.max_duration_s * 1000, 2),
+            "max_lateness_ms": round(self.max_lateness_s * 1000, 2),
+        }
+
+
+runtime = ControlRuntime()
+atexit.register(runtime.stop)
@@ -1,103 +1,738 @@
-import requests, time, csv, os
+import requests, time, random, threading, json, atexit
+from requests.adapters import HTTPAdapter
+from concurrent.futures import ThreadPoolExecutor, wait
+from contextlib import contextmanager
 from datetime import datetime, timezone
-from typing import Any
+from typing import Any, Callable, Container, Dict, Iterable, Optional
 
-from config import DEBUG_MODE
+from config import (DEBUG_MODE, LOG_DIR, TIMESERIES_DIR, LOG_SEGMENT_MAX_BYTES, LOG_RETENTION_DAYS, LOG_RETENTION_MAX_BYTES,
+                    LOG_QUEUE_MAX_ROWS, LOG_QUEUE_POLICY, LOG_QUEUE_BLOCK_TIMEOUT_S)
+from storage.snapshot_log import MINUTES_PER_DAY
+from storage.log_process import LogWriterProcess
+from storage.columnar import ColumnarStoreWriter
+from storage.history import HistoryStore
 
 SIMULATOR_URL = "http://localhost:8785"
 MinRequestInterval_ms = 2000
 
 key_variables = ("CORE_STATE_CRITICALITY","GENERATOR_0_KW","GENERATOR_1_KW","GENERATOR_2_KW")
 
-log_variables = ["CORE_STATE_CRITICALITY", "CORE_FACTOR", "CORE_INTEGRITY", "CORE_IODINE_CUMULATIVE","CORE_IODINE_GENERATION","CORE_XENON_CUMULATIVE","CORE_XENON_GENERATION","CORE_TEMP","CORE_STATE_CRITICALITY"]
+# Concurrent acquisition settings.  A sweep is spread over at most FETCH_MAX_WORKERS
+# in-flight requests and is abandoned after FETCH_SWEEP_DEADLINE_S, so one sweep costs
+# roughly the slowest single request instead of the sum of all of them.
+FETCH_MAX_WORKERS = 16
+FETCH_SWEEP_DEADLINE_S = 0.8
 
-def persist_data_snapshot(data:dict[Any,Any], path: str ="C:\\Users\\Rsenior\\Documents\\NuclearesDataRepo\\simulator_data_log.csv"):
-    try:
-        snapshot_time = datetime.now(timezone.utc).isoformat()
-        file_exists = os.path.isfile(path)
+# Shared HTTP client settings.  Every read and write goes through one keep-alive session
+# so a sweep reuses pooled connections instead of opening a new socket per variable.  The
+# pool holds a connection per fetch worker plus HTTP_POOL_SPARE for writes and the catalog.
+# Reads made for a sweep are also bounded by the sweep deadline: their timeouts are cut to
+# the time left and no retry is started that could not finish before it.
+HTTP_CONNECT_TIMEOUT_S = 0.5
+HTTP_READ_TIMEOUT_S = 0.75
+HTTP_POOL_SPARE = 4
+HTTP_POOL_SIZE = FETCH_MAX_WORKERS + HTTP_POOL_SPARE
+HTTP_MAX_RETRIES = 2
+HTTP_RETRY_BACKOFF_S = 0.025
 
-        headers = ["timestamp"] + log_variables
+# The variable list is loaded once and only re-listed after CATALOG_RECHECK_INTERVAL_S,
+# or straight away after VariableCatalog.invalidate().
+CATALOG_RECHECK_INTERVAL_S = 60
 
-        # Check if file exists and if headers are mismatched
-        recreate_file = True
-        if file_exists:
-            with open(path, "r", newline='') as f:
-                reader = csv.reader(f)
-                existing_headers = next(reader)
-                if existing_headers == headers:
-                    recreate_file = False
+# A write equal to the last value sent is dropped unless this much time has passed.
+WRITE_RESEND_INTERVAL_S = 30
 
-        if recreate_file:
-            with open(path, "w", newline='') as f:
-                writer = csv.DictWriter(f, fieldnames=headers)
-                writer.writeheader()
+# Most distinct writes allowed to wait for the command sender thread.
+COMMAND_QUEUE_MAX = 256
 
-        row = {var: data.get(var, 'NaN') for var in log_variables}
-        row["timestamp"] = snapshot_time
+# Meta-variables probed for a one-request whole-plant read, in order of preference.  A
+# candidate is used when its response covers at least BULK_READ_MIN_COVERAGE of the catalog;
+# the variables it leaves out are still read one by one.  The bulk read is dropped after
+# BULK_READ_MAX_FAILURES failed reads in a row, and re-probed BULK_READ_REPROBE_INTERVAL_S
+# after it was dropped or last found unavailable.
+BULK_READ_VARIABLES = ("WEBSERVER_VIEW_VARIABLES",)
+BULK_READ_MIN_COVERAGE = 0.9
+BULK_READ_MAX_FAILURES = 3
+BULK_READ_REPROBE_INTERVAL_S = 30
+
+# Upper bound on variable reads issued per fetch tick.
+POLL_REQUEST_BUDGET = 64
+
+# Aging for due variables that keep missing the budget: a variable moves up one priority
+# level for every POLL_AGING_PERIODS of its own period it is overdue, so the low-priority
+# groups are still read when the high-priority ones fill the budget every tick.
+POLL_AGING_PERIODS = 1.0
+
+# Refresh policy per group as (period in seconds, priority).  Lower priority values are
+# read first when the per-tick request budget is tight; period 0 means every tick.
+POLL_GROUP_POLICY: Dict[str, tuple[float, int]] = {
+    "rods":      (0.0, 0),
+    "secondary": (1.0, 1),
+    "condenser": (2.0, 2),
+    "core":      (2.0, 2),
+    "other":     (MinRequestInterval_ms / 1000, 3),
+    "chem":      (10.0, 4),
+}
 
-        with open(path, "a", newline='') as f:
-            writer = csv.DictWriter(f, fieldnames=headers)
-            writer.writerow(row)
+# Per-variable overrides of POLL_GROUP_POLICY.
+POLL_VARIABLE_POLICY: Dict[str, tuple[float, int]] = {
+    **{var: (0.0, 0) for var in key_variables},
+    "TIME_STAMP":             (0.0, 0),
+    "CORE_TEMP":              (0.0, 0),
+    "CORE_XENON_CUMULATIVE":  (30.0, 5),
+    "CORE_IODINE_CUMULATIVE": (30.0, 5),
+}
+
+# Name prefix -> group.  Checked in order, first match wins; anything unmatched is "other".
+VARIABLE_GROUPS = (
+    ("rods",      ("ROD_BANK_", "RODS_")),
+    ("secondary", ("COOLANT_SEC_", "STEAM_", "MSCV_")),
+    ("condenser", ("CONDENSER_",)),
+    ("chem",      ("CHEM_",)),
+    ("core",      ("CORE_",)),
+)
+
+
+log_variables = ["TIME_STAMP", "CORE_STATE_CRITICALITY", "CORE_FACTOR", "CORE_INTEGRITY", "CORE_IODINE_CUMULATIVE","CORE_IODINE_GENERATION","CORE_XENON_CUMULATIVE","CORE_XENON_GENERATION","CORE_TEMP","CORE_STATE_CRITICALITY"]
+
+_snapshot_log: Optional[LogWriterProcess] = None
+
+def persist_data_snapshot(data:dict[Any,Any], directory: str = LOG_DIR):
+    """
+    Queues one log_variables row for the snapshot log writer process; nothing here waits
+    on the disk.  Changing log_variables or a new in-game day starts a new log segment;
+    closed segments are compressed and pruned by the writer process.  The queue depth and
+    dropped-row count are published as data["log_queue_depth"] / data["log_rows_dropped"].
+    """
+    global _snapshot_log
+    try:
+        headers = ["timestamp"] + list(dict.fromkeys(log_variables))
+        if _snapshot_log is None or _snapshot_log.directory != directory:
+            close_snapshot_log()
+            _snapshot_log = LogWriterProcess(directory, headers, maxsize=LOG_QUEUE_MAX_ROWS, policy=LOG_QUEUE_POLICY,
+                                             block_timeout_s=LOG_QUEUE_BLOCK_TIMEOUT_S, max_segment_bytes=LOG_SEGMENT_MAX_BYTES,
+                                             max_bytes=LOG_RETENTION_MAX_BYTES, max_days=LOG_RETENTION_DAYS)
+        _snapshot_log.set_fieldnames(headers)
+
+        row = {var: data.get(var, 'NaN') for var in log_variables}
+        row["timestamp"] = datetime.now(timezone.utc).isoformat()
+        stamp = data.get("TIME_STAMP")
+        day = int(stamp // MINUTES_PER_DAY) if isinstance(stamp, (int, float)) and not isinstance(stamp, bool) else None
+        if not _snapshot_log.submit(row, day) and DEBUG_MODE:
+            print(f"[Log] Snapshot row dropped ({_snapshot_log.dropped} total)")
+        data["log_queue_depth"] = _snapshot_log.depth()
+        data["log_rows_dropped"] = _snapshot_log.dropped
 
     except Exception as e:
         print(f"[ERROR] Failed to write snapshot: {e}")
 
-def fetch_simulator_data(data:dict[Any,Any]):
-    persist_data_snapshot(data)
-    print("[NewFetch] start")
-    lastfetch_ms = data.get("lastfetch_ms") or 0
-    IRLtime_ms = int(time.time()*1000)
+def snapshot_log_stats() -> Dict[str, int]:
+    if _snapshot_log is None:
+        return {"depth": 0, "submitted": 0, "dropped": 0, "restarts": 0}
+    return _snapshot_log.stats()
 
-    # Always fetch key variables
-    for var in key_variables:
+def close_snapshot_log():
+    """Lets the writer process flush buffered snapshot rows and exit.  Registered with atexit."""
+    global _snapshot_log
+    if _snapshot_log is not None:
         try:
-            val_resp = requests.get(f"{SIMULATOR_URL}/?Variable={var}")
-            value = val_resp.text.strip()
-            print(f"var: {var} value: {value}")
-            data[var] = float(value) if value.replace('.', '', 1).isdigit() else value
-        except Exception:
-            import traceback
-            print(f"[ERROR] Exception during key variable fetch: {var}")
-            traceback.print_exc()
+            _snapshot_log.close()
+        except Exception as e:
+            print(f"[ERROR] Failed to flush snapshot log: {e}")
+        _snapshot_log = None
+
+atexit.register(close_snapshot_log)
 
-    if IRLtime_ms - lastfetch_ms > MinRequestInterval_ms:
-        data["lastfetch_ms"] = IRLtime_ms
+_timeseries_writer: Optional[ColumnarStoreWriter] = None
+
+def record_plant_snapshot(data:dict[Any,Any], directory: str = TIMESERIES_DIR):
+    """Appends every numeric and enum value in `data` to the columnar time-series store."""
+    global _timeseries_writer
+    try:
+        if _timeseries_writer is None or _timeseries_writer.root != directory:
+            if _timeseries_writer is not None:
+                _timeseries_writer.close()
+            _timeseries_writer = ColumnarStoreWriter(directory, background=True)
+        _timeseries_writer.append(data)
+    except Exception as e:
+        print(f"[ERROR] Failed to record plant snapshot: {e}")
+
+def live_timeseries() -> Optional[ColumnarStoreWriter]:
+    """The active time-series writer, whose buffered rows are not on disk yet (see storage/history.py)."""
+    return _timeseries_writer
+
+def close_timeseries_store():
+    global _timeseries_writer
+    if _timeseries_writer is not None:
         try:
-            response = requests.get(f"{SIMULATOR_URL}/?Variable=WEBSERVER_LIST_VARIABLES")
+            _timeseries_writer.close()
         except Exception as e:
-            import traceback
-            print("[ERROR] Exception during fetching list variables:")
-            traceback.print_exc()
-            print(f"ErrorName: {e}")
-            return
+            print(f"[ERROR] Failed to flush time-series store: {e}")
+        _timeseries_writer = None
+
+atexit.register(close_timeseries_store)
+
+# Chart and /api/history queries over the persisted store plus the rows still buffered in memory.
+history = HistoryStore(TIMESERIES_DIR, live=live_timeseries)
+
+_session: Optional[requests.Session] = None
+_session_lock = threading.Lock()
+
+def configure_http(pool_size: Optional[int] = None,
+                   connect_timeout_s: Optional[float] = None,
+                   read_timeout_s: Optional[float] = None,
+                   max_retries: Optional[int] = None,
+                   retry_backoff_s: Optional[float] = None):
+    """
+    Tunes the shared simulator client.  Changing the pool size drops the current session;
+    a new one is built on the next request.
+    """
+    global HTTP_POOL_SIZE, HTTP_CONNECT_TIMEOUT_S, HTTP_READ_TIMEOUT_S, HTTP_MAX_RETRIES, HTTP_RETRY_BACKOFF_S, _session
+    if connect_timeout_s is not None:
+        HTTP_CONNECT_TIMEOUT_S = connect_timeout_s
+    if read_timeout_s is not None:
+        HTTP_READ_TIMEOUT_S = read_timeout_s
+    if max_retries is not None:
+        HTTP_MAX_RETRIES = max(0, int(max_retries))
+    if retry_backoff_s is not None:
+        HTTP_RETRY_BACKOFF_S = retry_backoff_s
+    if pool_size is not None and pool_size != HTTP_POOL_SIZE:
+        HTTP_POOL_SIZE = max(1, int(pool_size))
+        with _session_lock:
+            if _session is not None:
+                _session.close()
+                _session = None
+
+def _get_session() -> requests.Session:
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=HTTP_POOL_SIZE, pool_block=True)
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                _session = session
+    return _session
+
+def sim_request(method: str, params: Dict[str, Any], deadline: Optional[float] = None) -> requests.Response:
+    """
+    Sends one request to the simulator webserver over the pooled session.
+
+    Connection failures, timeouts and 5xx responses are retried up to HTTP_MAX_RETRIES
+    times with full-jitter exponential backoff.  Anything else is raised to the caller.
+    With a `deadline` (time.monotonic() value) every attempt's timeouts are cut to the time
+    left, and the last error is raised instead of retrying once the deadline has passed.
+    """
+    attempt = 0
+    while True:
+        connect_timeout, read_timeout = HTTP_CONNECT_TIMEOUT_S, HTTP_READ_TIMEOUT_S
+        if deadline is not None:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise requests.Timeout(f"{params.get('Variable', method)}: sweep deadline passed")
+            connect_timeout, read_timeout = min(connect_timeout, remaining), min(read_timeout, remaining)
+        try:
+            response = _get_session().request(
+                method,
+                f"{SIMULATOR_URL}/",
+                params=params,
+                timeout=(connect_timeout, read_timeout),
+            )
+            if response.status_code < 500:
+                return response
+            response.raise_for_status()
+        except (requests.ConnectionError, requests.Timeout, requests.HTTPError):
+            backoff = random.uniform(0, HTTP_RETRY_BACKOFF_S * (2 ** attempt))
+            if attempt >= HTTP_MAX_RETRIES or (deadline is not None and time.monotonic() + backoff >= deadline):
+                raise
+        time.sleep(backoff)
+        attempt += 1
+
+def variable_group(var: str) -> str:
+    for group, prefixes in VARIABLE_GROUPS:
+        if var.startswith(prefixes):
+            return group
+    return "other"
+
+def _decode_bool(text: str) -> bool:
+    upper = text.upper()
+    if upper == "TRUE":
+        return True
+    if upper == "FALSE":
+        return False
+    raise ValueError(f"not a boolean: {text!r}")
 
-        text = response.text.strip()
-        get_line = next(line for line in text.splitlines() if line.startswith("GET:"))
-        variable_list = get_line.replace("GET:", "").split(',')
+def _decode_enum(text: str) -> str:
+    if text.replace("_", "").isalpha() and text.isupper():
+        return text
+    raise ValueError(f"not an enum state: {text!r}")
 
-        fetch_error = 0
+def _decode_str(text: str) -> str:
+    if not text or ValueDecoder.infer(text) != "str":
+        raise ValueError(f"not free text: {text!r}")
+    return text
 
-        for var in variable_list:
+_DECODERS: Dict[str, Callable[[str], Any]] = {
+    "float": float,
+    "bool":  _decode_bool,
+    "enum":  _decode_enum,
+    "str":   _decode_str,
+}
+
+class ValueDecoder:
+    """
+    Turns raw webserver responses into typed values.
+
+    The type of each variable is inferred from the first value seen and its converter is
+    cached by name, so later sweeps are one dict lookup and one call per value.  If a cached
+    converter ever rejects a value the variable is re-inferred.  Each converter rejects
+    values of every other kind, so a variable first seen as text (say "N/A" before the plant
+    is loaded) decodes as a number again once the game reports one.  Kinds are:
+        float → any number, including negatives and scientific notation
+        bool  → TRUE / FALSE
+        enum  → upper-case word states such as CORE_STATE = "REACTIVO"
+        str   → anything else
+    Integral numbers decode as float too: the controllers test rod positions with
+    isinstance(value, float) and the game reports whole numbers without a decimal point.
+    Empty responses decode to None and are not used for inference.
+    """
+
+    def __init__(self):
+        self._converters: Dict[str, tuple[str, Callable[[str], Any]]] = {}
+
+    @staticmethod
+    def infer(text: str) -> str:
+        if text.upper() in ("TRUE", "FALSE"):
+            return "bool"
+        try:
+            float(text)
+            return "float"
+        except ValueError:
+            pass
+        if text.replace("_", "").isalpha() and text.isupper():
+            return "enum"
+        return "str"
+
+    def kind(self, var: str) -> Optional[str]:
+        converter = self._converters.get(var)
+        return converter[0] if converter else None
+
+    def kinds(self) -> Dict[str, str]:
+        return {var: kind for var, (kind, _) in self._converters.items()}
+
+    def forget(self, keep: Iterable[str]):
+        """Drops cached converters for every variable not in `keep`."""
+        keep = set(keep)
+        self._converters = {var: conv for var, conv in self._converters.items() if var in keep}
+
+    def decode(self, var: str, text: str) -> Any:
+        converter = self._converters.get(var)
+        if converter is not None:
             try:
-                val_resp = requests.get(f"{SIMULATOR_URL}/?Variable={var}")
-                time.sleep(0.010)
-                value = val_resp.text.strip()
-                data[var] = float(value) if value.replace('.', '', 1).isdigit() else value
-            except:
-                fetch_error += 1
-                import traceback
-                print("[ERROR] Exception during render:")
-                traceback.print_exc()
+                return converter[1](text)
+            except ValueError:
+                pass
+        if not text:
+            return None
+        kind = self.infer(text)
+        self._converters[var] = (kind, _DECODERS[kind])
+        return _DECODERS[kind](text)
 
-        if fetch_error > 0:
-            print(f"⚠  {fetch_error} ERRORS DURING FETCH   ⚠")
+    def decode_many(self, values: Dict[str, str]) -> Dict[str, Any]:
+        """Decodes a whole sweep in one pass."""
+        converters = self._converters
+        decoded: Dict[str, Any] = {}
+        for var, text in values.items():
+            converter = converters.get(var)
+            if converter is not None:
+                try:
+                    decoded[var] = converter[1](text)
+                    continue
+                except ValueError:
+                    pass
+            decoded[var] = self.decode(var, text)
+        return decoded
 
+class VariableCatalog:
+    """
+    Cached copy of the WEBSERVER_LIST_VARIABLES listing.
 
+    Holds the GET and SET variable lists, the group each GET variable belongs to and the
+    value decoder with the type inferred for it.  WEBSERVER_* meta-variables are kept apart
+    in `meta_vars` so they are never swept as plant values.  refresh() only goes back to the webserver when the
+    catalog was never loaded, was invalidated, or CATALOG_RECHECK_INTERVAL_S has passed;
+    even then the listing is only re-parsed when its text actually changed.  `version`
+    is bumped on every content change so callers can cheaply detect a new catalog.
+    """
+
+    def __init__(self, recheck_interval_s: float = CATALOG_RECHECK_INTERVAL_S):
+        self.recheck_interval_s = recheck_interval_s
+        self.get_vars: tuple[str, ...] = ()
+        self.set_vars: tuple[str, ...] = ()
+        self.meta_vars: tuple[str, ...] = ()
+        self.groups: Dict[str, tuple[str, ...]] = {}
+        self.decoder = ValueDecoder()
+        self.version = 0
+        self._listing_hash: Optional[int] = None
+        self._checked_at = 0.0
+        self._stale = True
+        self._lock = threading.Lock()
+
+    @property
+    def types(self) -> Dict[str, str]:
+        return self.decoder.kinds()
+
+    @property
+    def loaded(self) -> bool:
+        return self._listing_hash is not None
+
+    def invalidate(self):
+        """Forces the next refresh() to re-list the variables."""
+        self._stale = True
+
+    def refresh(self, force: bool = False) -> bool:
+        """Re-lists the variables if due.  Returns True when the catalog content changed."""
+        now = time.monotonic()
+        if not (force or self._stale or now - self._checked_at >= self.recheck_interval_s):
+            return False
+        with self._lock:
+            text = sim_request("GET", {"Variable": "WEBSERVER_LIST_VARIABLES"}).text.strip()
+            self._checked_at = now
+            self._stale = False
+            listing_hash = hash(text)
+            if listing_hash == self._listing_hash:
+                return False
+            self.load(text)
+            self._listing_hash = listing_hash
+            return True
+
+    def load(self, listing: str):
+        """Parses a WEBSERVER_LIST_VARIABLES response ("GET: a,b,...\nSET: c,d,...")."""
+        lists: Dict[str, tuple[str, ...]] = {"GET": (), "SET": ()}
+        for line in listing.splitlines():
+            key, sep, names = line.partition(":")
+            key = key.strip().upper()
+            if sep and key in lists:
+                lists[key] = tuple(name.strip() for name in names.split(",") if name.strip())
+
+        get_vars = tuple(var for var in lists["GET"] if not var.startswith("WEBSERVER_"))
+        groups: Dict[str, list[str]] = {}
+        for var in get_vars:
+            groups.setdefault(variable_group(var), []).append(var)
+
+        self.get_vars = get_vars
+        self.meta_vars = tuple(var for var in lists["GET"] if var.startswith("WEBSERVER_"))
+        self.set_vars = lists["SET"]
+        self.groups = {group: tuple(names) for group, names in groups.items()}
+        self.decoder.forget((*key_variables, *get_vars))
+        self.version += 1
+        if DEBUG_MODE:
+            print(f"[Catalog] v{self.version}: {len(self.get_vars)} GET / {len(self.set_vars)} SET variables")
+
+catalog = VariableCatalog()
+
+def parse_bulk_payload(text: str) -> Dict[str, str]:
+    """
+    Parses a multi-variable response into name -> raw value text.
+
+    Understands a JSON object ({"NAME": value, ...}, optionally wrapped in "values" or
+    "variables"), a JSON list of {"name": ..., "value": ...} records, or plain
+    "NAME=VALUE" / "NAME: VALUE" lines.  JSON values are turned back into the same text the
+    per-variable endpoint returns so the ValueDecoder treats both paths alike.
+    """
+    def as_text(value: Any) -> str:
+        if isinstance(value, bool):
+            return "TRUE" if value else "FALSE"
+        if value is None:
+            return ""
+        return str(value)
 
-def set_game_variable(var:str, value:Any):
     try:
-        post_url = f"{SIMULATOR_URL}/?variable={var}&value={value}"
-        res = requests.post(post_url)
+        payload = json.loads(text)
+    except ValueError:
+        payload = None
+
+    if isinstance(payload, dict):
+        for wrapper in ("values", "variables"):
+            if isinstance(payload.get(wrapper), (dict, list)):
+                payload = payload[wrapper]
+                break
+    if isinstance(payload, dict):
+        return {str(name): as_text(value) for name, value in payload.items() if not isinstance(value, (dict, list))}
+    if isinstance(payload, list):
+        return {str(item["name"]): as_text(item.get("value")) for item in payload if isinstance(item, dict) and "name" in item}
+
+    values: Dict[str, str] = {}
+    for line in text.splitlines():
+        for sep in ("=", ":"):
+            name, found, value = line.partition(sep)
+            if found and name.strip() and " " not in name.strip():
+                values[name.strip()] = value.strip()
+                break
+    return values
+
+class BulkReader:
+    """
+    Whole-plant read in one request, when the webserver offers one.
+
+    probe() tries each of BULK_READ_VARIABLES and keeps the first whose response parses into
+    values for at least BULK_READ_MIN_COVERAGE of the catalog's GET variables.  It is re-run
+    whenever the catalog version changes, and every `reprobe_interval_s` while no bulk read
+    is in use.  A failed read is raised to the caller (fetch_simulator_data falls back to
+    per-variable reads for that tick); after `max_failures` failures in a row the reader
+    disables itself until the next probe.
+    """
+
+    def __init__(self, reprobe_interval_s: float = BULK_READ_REPROBE_INTERVAL_S, max_failures: int = BULK_READ_MAX_FAILURES):
+        self.reprobe_interval_s = reprobe_interval_s
+        self.max_failures = max_failures
+        self.variable: Optional[str] = None
+        self.failures = 0
+        self._probed_version = -1
+        self._unavailable_since = 0.0
+
+    @property
+    def available(self) -> bool:
+        return self.variable is not None
+
+    def sync(self, variable_catalog: VariableCatalog):
+        if not variable_catalog.loaded:
+            return
+        if (variable_catalog.version != self._probed_version
+                or (self.variable is None and time.monotonic() - self._unavailable_since >= self.reprobe_interval_s)):
+            self._probed_version = variable_catalog.version
+            self.probe(variable_catalog)
+
+    def probe(self, variable_catalog: VariableCatalog) -> bool:
+        self.variable = None
+        self.failures = 0
+        wanted = set(variable_catalog.get_vars)
+        for candidate in BULK_READ_VARIABLES:
+            try:
+                response = sim_request("GET", {"Variable": candidate})
+                if response.status_code != 200:
+                    continue
+                values = parse_bulk_payload(response.text.strip())
+            except Exception as e:
+                if DEBUG_MODE:
+                    print(f"[Bulk] probe of {candidate} failed: {e}")
+                continue
+            if wanted and len(wanted.intersection(values)) >= BULK_READ_MIN_COVERAGE * len(wanted):
+                self.variable = candidate
+                break
+        if self.variable is None:
+            self._unavailable_since = time.monotonic()
+        if DEBUG_MODE:
+            print(f"[Bulk] bulk read {'via ' + self.variable if self.variable else 'not available'}")
+        return self.available
+
+    def read(self, deadline: Optional[float] = None) -> Dict[str, str]:
+        if self.variable is None:
+            raise RuntimeError("bulk read not available")
+        try:
+            response = sim_request("GET", {"Variable": self.variable}, deadline)
+            response.raise_for_status()
+            values = parse_bulk_payload(response.text.strip())
+            if not values:
+                raise ValueError(f"{self.variable} returned no values")
+        except Exception:
+            self.failures += 1
+            if self.failures >= self.max_failures:
+                if DEBUG_MODE:
+                    print(f"[Bulk] {self.failures} failed reads in a row, using per-variable reads until the next probe")
+                self.variable = None
+                self._unavailable_since = time.monotonic()
+            raise
+        self.failures = 0
+        return values
+
+bulk_reader = BulkReader()
+
+class PollScheduler:
+    """
+    Decides which variables to read on each fetch tick.
+
+    Every variable gets a (period_s, priority) policy: its own entry in POLL_VARIABLE_POLICY
+    if it has one, otherwise its group's entry in POLL_GROUP_POLICY.  A variable is due once
+    its period has elapsed since it was last read successfully (period 0 means every tick).
+    Due variables are read in priority order, most overdue first within a priority, and at
+    most `budget` reads are issued per tick.  Whatever misses the budget stays due and ages:
+    each POLL_AGING_PERIODS it is overdue counts as one priority level, so a priority 4
+    variable overtakes priority 0 ones once it is four periods late and is never starved.
+    Overrides from set_policy() are kept apart and survive catalog changes.
+    """
+
+    def __init__(self, budget: int = POLL_REQUEST_BUDGET, aging_periods: float = POLL_AGING_PERIODS):
+        self.budget = budget
+        self.aging_periods = aging_periods
+        self.last_polled: Dict[str, float] = {}
+        self._policy: Dict[str, tuple[float, int]] = {}
+        self._overrides: Dict[str, tuple[float, int]] = {}
+        self._due_since: Dict[str, float] = {}   # first due() that saw a never-read variable
+        self._catalog_version = -1
+
+    def policy_for(self, var: str) -> tuple[float, int]:
+        if var in POLL_VARIABLE_POLICY:
+            return POLL_VARIABLE_POLICY[var]
+        return POLL_GROUP_POLICY.get(variable_group(var), POLL_GROUP_POLICY["other"])
+
+    def sync(self, variable_catalog: VariableCatalog):
+        """Rebuilds the per-variable policy table when the catalog changes."""
+        if variable_catalog.version == self._catalog_version:
+            return
+        self._catalog_version = variable_catalog.version
+        self._policy = {var: self.policy_for(var) for var in (*key_variables, *variable_catalog.get_vars)}
+        self._policy.update(self._overrides)
+        self.last_polled = {var: t for var, t in self.last_polled.items() if var in self._policy}
+        self._due_since = {var: t for var, t in self._due_since.items() if var in self._policy}
+
+    def set_policy(self, var: str, period_s: float, priority: int):
+        """Overrides the refresh period and priority of one variable, including across catalog changes."""
+        self._overrides[var] = self._policy[var] = (period_s, priority)
+
+    def due(self, now: Optional[float] = None, skip: Container[str] = ()) -> list[str]:
+        """The variables to read this tick, best first, at most `budget`; those in `skip` are left out."""
+        now = time.monotonic() if now is None else now
+        queue: list[tuple[float, int, str]] = []
+        for var, (period_s, priority) in self._policy.items():
+            if var in skip:
+                continue
+            last = self.last_polled.get(var)
+            if last is None:
+                # Never read: due since it first showed up, and first within its priority
+                late, rank = now - self._due_since.setdefault(var, now), 0
+            else:
+                late, rank = now - last - period_s, 1
+                if late < 0:
+                    continue
+            # Periods overdue; a period-0 variable is due every tick and never ages
+            overdue = late / period_s if period_s > 0 else 0.0
+            queue.append((priority - overdue / self.aging_periods, rank, var))
+        queue.sort()
+        return [var for _, _, var in queue[:self.budget]]
+
+    def mark_polled(self, variables: Iterable[str], now: Optional[float] = None):
+        now = time.monotonic() if now is None else now
+        for var in variables:
+            self.last_polled[var] = now
+            self._due_since.pop(var, None)
+
+scheduler = PollScheduler()
+
+_fetch_executor: Optional[ThreadPoolExecutor] = None
+
+def configure_fetch(max_workers: Optional[int] = None, deadline_s: Optional[float] = None):
+    """
+    Changes the concurrency limit and/or the per-sweep deadline.
+    When the worker count changes the worker pool is rebuilt on the next sweep, and the
+    HTTP connection pool is resized to match (see configure_http).
+    """
+    global FETCH_MAX_WORKERS, FETCH_SWEEP_DEADLINE_S, _fetch_executor
+    if deadline_s is not None:
+        FETCH_SWEEP_DEADLINE_S = deadline_s
+    if max_workers is not None and max_workers != FETCH_MAX_WORKERS:
+        FETCH_MAX_WORKERS = max(1, int(max_workers))
+        if _fetch_executor is not None:
+            _fetch_executor.shutdown(wait=False, cancel_futures=True)
+            _fetch_executor = None
+        configure_http(pool_size=FETCH_MAX_WORKERS + HTTP_POOL_SPARE)
+
+def _get_fetch_executor() -> ThreadPoolExecutor:
+    global _fetch_executor
+    if _fetch_executor is None:
+        _fetch_executor = ThreadPoolExecutor(max_workers=FETCH_MAX_WORKERS, thread_name_prefix="sim-fetch")
+    return _fetch_executor
+
+def _fetch_variable(var: str, deadline: Optional[float] = None) -> str:
+    val_resp = sim_request("GET", {"Variable": var}, deadline)
+    return val_resp.text.strip()
+
+def fetch_variables(variables: Iterable[str], deadline_s: Optional[float] = None) -> tuple[Dict[str, str], int]:
+    """
+    Reads every variable in `variables` concurrently on the bounded fetch pool.
+
+    Returns (values, error_count).  values maps name -> raw response text for every request
+    that completed before the sweep deadline; requests still in flight at the deadline are
+    abandoned and counted as errors so one slow variable can't hold up the whole sweep.
+    """
+    deadline_s = FETCH_SWEEP_DEADLINE_S if deadline_s is None else deadline_s
+    deadline = time.monotonic() + deadline_s
+    executor = _get_fetch_executor()
+    futures = {executor.submit(_fetch_variable, var, deadline): var for var in dict.fromkeys(variables)}
+    done, not_done = wait(futures, timeout=deadline_s)
+
+    values: Dict[str, str] = {}
+    errors = 0
+    for future in done:
+        var = futures[future]
+        try:
+            values[var] = future.result()
+        except Exception as e:
+            errors += 1
+            print(f"[ERROR] Exception during fetch of {var}: {e}")
+    for future in not_done:
+        future.cancel()
+        errors += 1
+        if DEBUG_MODE:
+            print(f"[ERROR] Fetch of {futures[future]} missed the {deadline_s:.3f}s sweep deadline")
+    return values, errors
+
+def read_plant_values() -> tuple[Dict[str, str], int]:
+    """
+    One fetch tick's reads: the bulk read when there is one, then per-variable reads of
+    whatever the scheduler has due and the bulk payload did not cover (everything due, if
+    the bulk read is unavailable or failed).  Returns (raw values, error count).
+    """
+    scheduler.sync(catalog)
+    bulk_reader.sync(catalog)
+
+    #one deadline for the whole read, a failed bulk read included
+    deadline = time.monotonic() + FETCH_SWEEP_DEADLINE_S
+    values: Dict[str, str] = {}
+    fetch_error = 0
+    if bulk_reader.available:
+        try:
+            values = bulk_reader.read(deadline)
+        except Exception as e:
+            print(f"[ERROR] Bulk read failed, falling back to per-variable reads: {e}")
+    scheduler.mark_polled(values)
+    due = scheduler.due(skip=values)
+    if due:
+        fetched, fetch_error = fetch_variables(due, max(0.0, deadline - time.monotonic()))
+        scheduler.mark_polled(fetched)
+        values.update(fetched)
+    return values, fetch_error
+
+def fetch_simulator_data(data:dict[Any,Any]):
+    persist_data_snapshot(data, LOG_DIR)
+    record_plant_snapshot(data, TIMESERIES_DIR)
+    print("[NewFetch] start")
+
+    try:
+        catalog.refresh()
+    except Exception as e:
+        import traceback
+        print("[ERROR] Exception during fetching list variables:")
+        traceback.print_exc()
+        print(f"ErrorName: {e}")
+
+    values, fetch_error = read_plant_values()
+    decoded = catalog.decoder.decode_many(values)
+    for var in key_variables:
+        if var in decoded:
+            print(f"var: {var} value: {decoded[var]}")
+    data.update(decoded)
+
+    if fetch_error > 0:
+        print(f"⚠  {fetch_error} ERRORS DURING FETCH   ⚠")
+
+
+
+def write_game_variable(var:str, value:Any) -> bool:
+    """Sends one write to the simulator immediately, bypassing the actuator buffer."""
+    try:
+        res = sim_request("POST", {"variable": var, "value": value})
         res.raise_for_status()
         if DEBUG_MODE:
             print(f"✅ Set {var} = {value}")
@@ -106,3 +741,227 @@ def set_game_variable(var:str, value:Any):
         if DEBUG_MODE:
             print(f"❌ Failed to set {var}: {e}")
         return False
+
+class CommandTicket:
+    """Completion status of one queued write.  `status` moves from "pending" to one of
+    "sent", "failed", "superseded" (a newer value for the same variable replaced it before
+    it went out) or "rejected" (the queue was full)."""
+
+    __slots__ = ("var", "value", "status", "_event")
+
+    def __init__(self, var: str, value: Any):
+        self.var = var
+        self.value = value
+        self.status = "pending"
+        self._event = threading.Event()
+
+    @property
+    def done(self) -> bool:
+        return self._event.is_set()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Blocks until the command is resolved.  Returns True if it was sent."""
+        self._event.wait(timeout)
+        return self.status == "sent"
+
+    def _finish(self, status: str):
+        self.status = status
+        self._event.set()
+
+class CommandQueue:
+    """
+    Bounded write queue drained by one dedicated sender thread, so the control tick only
+    pays for a dict insert instead of an HTTP round trip.
+
+    Back-pressure is newest-value-wins: submitting a variable that is still waiting replaces
+    the queued value (the older ticket resolves as "superseded").  A new variable submitted
+    while COMMAND_QUEUE_MAX distinct writes are waiting is rejected immediately rather than
+    blocking the caller.
+    """
+
+    def __init__(self, sender: Callable[[str, Any], bool] = write_game_variable, maxsize: int = COMMAND_QUEUE_MAX):
+        self.sender = sender
+        self.maxsize = maxsize
+        self.sent = 0
+        self.failed = 0
+        self.superseded = 0
+        self.rejected = 0
+        self._pending: Dict[str, CommandTicket] = {}
+        self._cond = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._stopping = False
+
+    def submit(self, var: str, value: Any) -> CommandTicket:
+        ticket = CommandTicket(var, value)
+        with self._cond:
+            previous = self._pending.pop(var, None)
+            if previous is not None:
+                previous._finish("superseded")
+                self.superseded += 1
+            elif len(self._pending) >= self.maxsize:
+                ticket._finish("rejected")
+                self.rejected += 1
+                return ticket
+            self._pending[var] = ticket
+            self._cond.notify()
+            if self._thread is None:
+                self._stopping = False
+                self._thread = threading.Thread(target=self._run, name="sim-commands", daemon=True)
+                self._thread.start()
+        return ticket
+
+    def depth(self) -> int:
+        return len(self._pending)
+
+    def drain(self, timeout: Optional[float] = None) -> bool:
+        """Waits until every queued command has been resolved.  Returns False on timeout."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            tickets = list(self._pending.values())
+        for ticket in tickets:
+            remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+            ticket.wait(remaining)
+            if not ticket.done:
+                return False
+        return True
+
+    def stop(self, timeout: Optional[float] = None):
+        """Sends whatever is still queued, then stops the sender thread."""
+        with self._cond:
+            self._stopping = True
+            self._cond.notify()
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            thread.join(timeout)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._pending and not self._stopping:
+                    self._cond.wait()
+                if not self._pending:
+                    return
+                var = next(iter(self._pending))
+                ticket = self._pending.pop(var)
+            try:
+                ok = self.sender(var, ticket.value)
+            except Exception as e:
+                print(f"[ERROR] Command sender failed on {var}: {e}")
+                ok = False
+            if ok:
+                self.sent += 1
+            else:
+                self.failed += 1
+            ticket._finish("sent" if ok else "failed")
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "queued": self.depth(),
+            "sent": self.sent,
+            "failed": self.failed,
+            "superseded": self.superseded,
+            "rejected": self.rejected,
+        }
+
+class ActuatorBuffer:
+    """
+    Collects the writes made during one control tick and hands them to the command queue
+    together on flush().
+
+    - Writes to the same variable within a tick are merged; only the last value is queued.
+    - A write equal to the last value successfully sent for that variable, or to the value
+      already on its way, is dropped unless WRITE_RESEND_INTERVAL_S has passed, so a manual
+      change made in game is eventually overridden again.
+    - Whatever is left goes to the CommandQueue; flush() never waits on the network.
+
+    `merged`, `suppressed` and `queued` count writes over the lifetime of the buffer.
+    """
+
+    def __init__(self, sender: Callable[[str, Any], bool] = write_game_variable):
+        self.commands = CommandQueue(sender)
+        self.pending: Dict[str, Any] = {}
+        self.last_sent: Dict[str, tuple[Any, float]] = {}
+        self.merged = 0
+        self.suppressed = 0
+        self.queued = 0
+        self._inflight: Dict[str, tuple[Any, CommandTicket, float]] = {}
+        self._lock = threading.Lock()
+
+    def set(self, var: str, value: Any):
+        with self._lock:
+            if var in self.pending:
+                self.merged += 1
+            self.pending[var] = value
+
+    def flush(self) -> Dict[str, CommandTicket]:
+        """Queues the pending writes that change something.  Returns their tickets by variable."""
+        with self._lock:
+            pending, self.pending = self.pending, {}
+        now = time.monotonic()
+
+        for var, (value, ticket, queued_at) in list(self._inflight.items()):
+            if ticket.done:
+                del self._inflight[var]
+                if ticket.status == "sent":
+                    self.last_sent[var] = (value, queued_at)
+
+        tickets: Dict[str, CommandTicket] = {}
+        for var, value in pending.items():
+            inflight = self._inflight.get(var)
+            last = self.last_sent.get(var)
+            if inflight is not None and inflight[0] == value:
+                self.suppressed += 1
+                continue
+            if last is not None and last[0] == value and now - last[1] < WRITE_RESEND_INTERVAL_S:
+                self.suppressed += 1
+                continue
+            ticket = self.commands.submit(var, value)
+            self._inflight[var] = (value, ticket, now)
+            tickets[var] = ticket
+        self.queued += len(tickets)
+        if DEBUG_MODE and tickets:
+            print(f"[Actuator] queued {len(tickets)}, suppressed {self.suppressed} unchanged, merged {self.merged} total")
+        return tickets
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "queued": self.queued,
+            "suppressed": self.suppressed,
+            "merged": self.merged,
+            **{f"command_{k}": v for k, v in self.commands.stats().items()},
+        }
+
+actuator = ActuatorBuffer()
+_active_actuator = threading.local()
+
+def active_actuator() -> Any:
+    """The buffer bound to this thread by use_actuator(), the live `actuator` otherwise."""
+    buffer = getattr(_active_actuator, "buffer", None)
+    return actuator if buffer is None else buffer
+
+@contextmanager
+def use_actuator(buffer: Any):
+    """
+    Routes this thread's set_game_variable() calls into `buffer` for the duration of the
+    block; other threads (the control runtime) keep writing to `actuator`.
+    """
+    previous = getattr(_active_actuator, "buffer", None)
+    _active_actuator.buffer = buffer
+    try:
+        yield buffer
+    finally:
+        _active_actuator.buffer = previous
+
+def set_game_variable(var:str, value:Any):
+    """
+    Queues a write for the current control tick.  Nothing is sent until
+    flush_game_variables() is called, normally at the end of update_controller().
+    """
+    active_actuator().set(var, value)
+    return True
+
+def flush_game_variables() -> Dict[str, CommandTicket]:
+    return actuator.flush()
+
+def actuator_stats() -> Dict[str, int]:
+    return actuator.stats()
@@ -0,0 +1,59 @@
+# Filename: snapshot.py
+#
+# Immutable, versioned views of the plant/controller state for concurrent readers.
+#
+# The control runtime is the only writer: after each tick it publishes a new Snapshot built
+# from its working dict.  Publishing is a single reference assignment, so a reader calling
+# latest() gets either the old or the new snapshot, never a mix, without taking a lock.
+# A snapshot can't be modified, so readers can hold on to one as long as they like and
+# never need to copy it.
+
+import time
+from collections.abc import Mapping
+from types import MappingProxyType
+from typing import Any, Dict, Iterator, Optional
+
+
+class Snapshot(Mapping):
+    """
+    Read-only mapping of one published state.  `version` increases by one per publish;
+    `time_stamp` is the in-game TIME_STAMP it was taken at (None before the first fetch).
+    """
+
+    __slots__ = ("version", "time_stamp", "published_at", "_data")
+
+    def __init__(self, version: int, data: Dict[str, Any]):
+        self.version = version
+        self._data = MappingProxyType(dict(data))
+        self.time_stamp: Optional[float] = self._data.get("TIME_STAMP")
+        self.published_at = time.time()
+
+    def __getitem__(self, key: str) -> Any:
+        return self._data[key]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._data)
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __repr__(self) -> str:
+        return f"Snapshot(version={self.version}, time_stamp={self.time_stamp}, variables={len(self._data)})"
+
+
+class SnapshotPublisher:
+    """
+    Holds the latest Snapshot.  publish() must only be called from the single producer
+    thread; latest() may be called from any thread.
+    """
+
+    def __init__(self):
+        self._latest = Snapshot(0, {})
+
+    def publish(self, data: Dict[str, Any]) -> Snapshot:
+        snapshot = Snapshot(self._latest.version + 1, data)
+        self._latest = snapshot
+        return snapshot
+
+    def latest(self) -> Snapshot:
+        return self._latest
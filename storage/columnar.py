@@ -0,0 +1,357 @@
+import json, math, os, queue, re, threading, time
+from array import array
+from typing import Any, Dict, Iterable, Iterator, List, Mapping, Optional, Tuple
+
+
+# On-disk layout:
+#
+#   <root>/chunk_000001/meta.json
+#   <root>/chunk_000001/c0000.f8      one flat little-endian array per column
+#   <root>/chunk_000001/c0001.i2
+#   ...
+#
+# meta.json records the row count, the TIME_STAMP range of the chunk and, per variable, its
+# file, dtype and (for enum columns) the code -> label table.  Chunks are written to a
+# ".tmp" directory and renamed into place, so a chunk directory on disk is always complete
+# and never modified again.
+#
+# Numeric and bool values are stored as float64 ("f8", NaN = missing).  Strings such as
+# CORE_STATE or the secondary loop FSM states are dictionary encoded as int16 codes ("i2",
+# -1 = missing); a column that gets more than INT16_MAX + 1 distinct labels within a chunk
+# is widened to int32 codes ("i4").
+
+CHUNK_PATTERN = re.compile(r"^chunk_(\d+)$")
+INT16_MAX = 2 ** 15 - 1
+
+
+class _Column:
+    __slots__ = ("values", "labels", "codes")
+
+    def __init__(self, enum: bool, backfill: int):
+        if enum:
+            self.values = array("h", [-1]) * backfill
+            self.labels: Optional[List[str]] = []
+            self.codes: Optional[Dict[str, int]] = {}
+        else:
+            self.values = array("d", [math.nan]) * backfill
+            self.labels = None
+            self.codes = None
+
+
+class ColumnarStoreWriter:
+    """
+    Append-only columnar recorder for the full plant state.
+
+    append() takes the data dict once per tick and appends every numeric, bool and string
+    value to an in-memory typed array per variable.  A chunk is written when `chunk_rows`
+    rows are buffered, when `flush_interval_s` has passed, or on flush()/close().  Variables
+    that appear mid-chunk are back-filled with missing values; variables missing from a tick
+    get a missing value for that row.  Rows without a numeric `time_key` are skipped.
+
+    With `background=True` flush() only hands the finished chunk to a writer thread, so
+    file I/O never runs on the thread calling append(); read_buffer() keeps returning the
+    chunk's rows until it is on disk.  `chunks_written` counts chunks that reached disk.
+    """
+
+    def __init__(self, root: str, chunk_rows: int = 3600, flush_interval_s: float = 300.0, time_key: str = "TIME_STAMP",
+                 background: bool = False):
+        self.root = root
+        self.chunk_rows = chunk_rows
+        self.flush_interval_s = flush_interval_s
+        self.time_key = time_key
+        self.background = background
+        self.rows = 0
+        self.chunks_written = 0
+        self._columns: Dict[str, _Column] = {}
+        self._last_flush = time.monotonic()
+        self._next_chunk: Optional[int] = None
+        self._pending: List[Tuple[Dict[str, _Column], int]] = []
+        self._pending_lock = threading.Lock()
+        self._chunk_queue: "Optional[queue.Queue[Optional[Tuple[Dict[str, _Column], int]]]]" = None
+        self._chunk_thread: Optional[threading.Thread] = None
+
+    def append(self, data: Mapping[str, Any]):
+        stamp = data.get(self.time_key)
+        if not isinstance(stamp, (int, float)) or isinstance(stamp, bool):
+            return
+        rows = self.rows
+        columns = self._columns
+        # Convert every value before touching a column, so a value that fails (an int too
+        # large for a float) drops the whole row instead of leaving the columns misaligned.
+        added: Dict[str, _Column] = {}
+        row: List[Tuple[_Column, Any]] = []
+        for name, value in data.items():
+            if isinstance(value, (int, float)):
+                column = columns.get(name)
+                if column is None:
+                    column = added[name] = _Column(False, rows)
+                elif column.codes is not None:
+                    continue
+                row.append((column, float(value)))
+            elif isinstance(value, str):
+                column = columns.get(name)
+                if column is None:
+                    column = added[name] = _Column(True, rows)
+                elif column.codes is None:
+                    continue
+                code = column.codes.get(value)
+                if code is None:
+                    code = column.codes[value] = len(column.labels)
+                    column.labels.append(value)
+                    if code > INT16_MAX and column.values.typecode == "h":
+                        column.values = array("i", column.values)
+                row.append((column, code))
+        columns.update(added)
+        for column, value in row:
+            column.values.append(value)
+        self.rows = rows = rows + 1
+        for column in columns.values():
+            if len(column.values) < rows:
+                column.values.append(-1 if column.codes is not None else math.nan)
+
+        if rows >= self.chunk_rows or time.monotonic() - self._last_flush >= self.flush_interval_s:
+            self.flush()
+
+    def _allocate_chunk(self) -> int:
+        if self._next_chunk is None:
+            os.makedirs(self.root, exist_ok=True)
+            numbers = [int(m.group(1)) for m in map(CHUNK_PATTERN.match, os.listdir(self.root)) if m]
+            self._next_chunk = max(numbers, default=0) + 1
+        number = self._next_chunk
+        self._next_chunk += 1
+        return number
+
+    def flush(self):
+        self._last_flush = time.monotonic()
+        if not self.rows:
+            return
+        columns, rows = self._columns, self.rows
+        if self.background:
+            # the same tuple goes on the queue, so the writer thread can take it off _pending
+            chunk = (columns, rows)
+            with self._pending_lock:
+                self._pending = self._pending + [chunk]
+                self._columns, self.rows = {}, 0
+            if self._chunk_thread is None:
+                self._chunk_queue = queue.Queue()
+                self._chunk_thread = threading.Thread(target=self._run_chunk_writer, name="timeseries-writer", daemon=True)
+                self._chunk_thread.start()
+            self._chunk_queue.put(chunk)
+        else:
+            self._columns, self.rows = {}, 0
+            self._write_chunk(columns, rows)
+
+    def _run_chunk_writer(self):
+        while True:
+            item = self._chunk_queue.get()
+            if item is None:
+                return
+            try:
+                self._write_chunk(*item)
+            except Exception as e:
+                print(f"[ERROR] Failed to write time-series chunk: {e}")
+            finally:
+                with self._pending_lock:
+                    self._pending = [pending for pending in self._pending if pending is not item]
+
+    def _write_chunk(self, columns: Dict[str, _Column], rows: int):
+        final = os.path.join(self.root, f"chunk_{self._allocate_chunk():06d}")
+        staging = final + ".tmp"
+        os.makedirs(staging, exist_ok=True)
+        meta_columns: Dict[str, Dict[str, Any]] = {}
+        for index, (name, column) in enumerate(columns.items()):
+            dtype = {"h": "i2", "i": "i4"}.get(column.values.typecode, "f8")
+            filename = f"c{index:04d}.{dtype}"
+            values = column.values
+            if values.itemsize > 1 and not _LITTLE_ENDIAN:
+                values = array(values.typecode, values)
+                values.byteswap()
+            with open(os.path.join(staging, filename), "wb") as f:
+                f.write(values.tobytes())
+            meta_columns[name] = {"file": filename, "dtype": dtype}
+            if column.labels is not None:
+                meta_columns[name]["labels"] = column.labels
+
+        stamps = columns[self.time_key].values
+        meta = {
+            "rows": rows,
+            "t_min": min(stamps),
+            "t_max": max(stamps),
+            "sorted": all(a <= b for a, b in zip(stamps, stamps[1:])),
+            "time_key": self.time_key,
+            "columns": meta_columns,
+        }
+        with open(os.path.join(staging, "meta.json"), "w") as f:
+            json.dump(meta, f)
+        os.replace(staging, final)
+        self.chunks_written += 1
+
+    def read_buffer(self, names: Iterable[str]) -> Dict[str, Any]:
+        """
+        Copies the rows not yet written to disk, in the same layout as
+        ColumnarStoreReader.read() returns (enum columns as label arrays, NaN/None = missing).
+        Safe to call from another thread while append() runs; rows still being appended
+        are left out.
+        """
+        import numpy as np
+
+        names = list(names)
+        parts: Dict[str, List[Any]] = {}
+        with self._pending_lock:
+            chunks = self._pending + [(self._columns, self.rows)]
+        for columns, rows in chunks:
+            part = self._copy_columns(np, columns, rows, names)
+            if part is not None:
+                for name, values in part.items():
+                    parts.setdefault(name, []).append(values)
+        if not parts:
+            return {name: np.empty(0) for name in [self.time_key, *names]}
+        return {name: np.concatenate(values) for name, values in parts.items()}
+
+    def _copy_columns(self, np, columns: Dict[str, _Column], rows: int, names: List[str]) -> Optional[Dict[str, Any]]:
+        stamps = columns.get(self.time_key)
+        if stamps is None or not rows:
+            return None
+        result = {self.time_key: np.array(stamps.values[:rows], dtype=float)}
+        for name in names:
+            if name == self.time_key:
+                continue
+            column = columns.get(name)
+            if column is None:
+                result[name] = np.full(rows, np.nan)
+            elif column.codes is not None:
+                labels = np.array(list(column.labels) + [None], dtype=object)
+                result[name] = labels[np.array(column.values[:rows], dtype=int)]
+            else:
+                result[name] = np.array(column.values[:rows], dtype=float)
+        count = min(len(values) for values in result.values())
+        return {name: values[:count] for name, values in result.items()}
+
+    def close(self, timeout_s: float = 30.0):
+        """Writes the buffered rows and, in background mode, waits for the writer thread."""
+        self.flush()
+        if self._chunk_thread is not None:
+            self._chunk_queue.put(None)
+            self._chunk_thread.join(timeout_s)
+            self._chunk_thread = None
+
+
+_LITTLE_ENDIAN = array("H", [1]).tobytes()[0] == 1
+
+
+class ColumnarStoreReader:
+    """
+    Range reads over a columnar store directory.
+
+    Columns are memory-mapped with numpy, so a read touches only the chunks whose TIME_STAMP
+    range overlaps the request and only the columns asked for.  Call refresh() to pick up
+    chunks written since the reader was created.
+    """
+
+    def __init__(self, root: str):
+        self.root = root
+        self._chunks: List[Tuple[str, Dict[str, Any]]] = []
+        self.refresh()
+
+    def refresh(self):
+        known = {path for path, _ in self._chunks}
+        found = []
+        if os.path.isdir(self.root):
+            for name in os.listdir(self.root):
+                match = CHUNK_PATTERN.match(name)
+                if match:
+                    found.append((int(match.group(1)), os.path.join(self.root, name)))
+        chunks = [(path, meta) for path, meta in self._chunks if os.path.isdir(path)]
+        for _, path in sorted(found):
+            if path not in known:
+                with open(os.path.join(path, "meta.json")) as f:
+                    chunks.append((path, json.load(f)))
+        chunks.sort(key=lambda chunk: chunk[0])
+        self._chunks = chunks
+
+    def columns(self) -> List[str]:
+        names: Dict[str, None] = {}
+        for _, meta in self._chunks:
+            names.update(dict.fromkeys(meta["columns"]))
+        return list(names)
+
+    def time_range(self) -> Tuple[Optional[float], Optional[float]]:
+        if not self._chunks:
+            return None, None
+        return min(meta["t_min"] for _, meta in self._chunks), max(meta["t_max"] for _, meta in self._chunks)
+
+    def read(self, names: Iterable[str], t_start: Optional[float] = None, t_end: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Returns {time_key: times, name: values, ...} as numpy arrays for rows with
+        t_start <= TIME_STAMP <= t_end.  Numeric columns come back as float64 with NaN for
+        missing values; enum columns as object arrays of labels with None for missing.
+        """
+        import numpy as np
+
+        names = list(dict.fromkeys(names))
+        lo = -math.inf if t_start is None else t_start
+        hi = math.inf if t_end is None else t_end
+        parts: Dict[str, List[Any]] = {}
+        time_key = None
+        for path, meta in self._overlapping(lo, hi):
+            time_key = meta["time_key"]
+            for name, values in self._read_chunk(np, path, meta, names, lo, hi).items():
+                parts.setdefault(name, []).append(values)
+
+        if time_key is None:
+            return {name: np.empty(0) for name in ["TIME_STAMP", *names]}
+        return {name: np.concatenate(chunks) for name, chunks in parts.items()}
+
+    def iter_rows(self, names: Optional[Iterable[str]] = None, t_start: Optional[float] = None,
+                  t_end: Optional[float] = None) -> Iterator[Dict[str, Any]]:
+        """
+        Yields one dict per recorded tick in [t_start, t_end], oldest first, holding the
+        requested columns (default: every column of the chunk) with missing values left
+        out.  Only one chunk is held in memory at a time.
+        """
+        import numpy as np
+
+        lo = -math.inf if t_start is None else t_start
+        hi = math.inf if t_end is None else t_end
+        wanted = None if names is None else list(dict.fromkeys(names))
+        for path, meta in self._overlapping(lo, hi):
+            columns = self._read_chunk(np, path, meta, wanted if wanted is not None else list(meta["columns"]), lo, hi)
+            order = np.argsort(columns[meta["time_key"]], kind="stable")
+            names_in_chunk = list(columns)
+            values = [columns[name][order].tolist() for name in names_in_chunk]
+            for row in zip(*values):
+                # NaN != NaN drops missing numbers; None drops missing enum labels.
+                yield {name: value for name, value in zip(names_in_chunk, row) if value is not None and value == value}
+
+    def _overlapping(self, lo: float, hi: float) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        for path, meta in self._chunks:
+            if meta["rows"] and meta["t_max"] >= lo and meta["t_min"] <= hi:
+                yield path, meta
+
+    def _read_chunk(self, np, path: str, meta: Dict[str, Any], names: List[str], lo: float, hi: float) -> Dict[str, Any]:
+        time_key = meta["time_key"]
+        stamps = self._map(np, path, meta["columns"][time_key], meta["rows"])
+        if meta["sorted"]:
+            selection = slice(np.searchsorted(stamps, lo, "left"), np.searchsorted(stamps, hi, "right"))
+        else:
+            selection = np.nonzero((stamps >= lo) & (stamps <= hi))[0]
+        selected_time = np.asarray(stamps[selection])
+        result = {time_key: selected_time}
+        count = len(selected_time)
+        for name in names:
+            if name == time_key:
+                continue
+            column = meta["columns"].get(name)
+            if column is None:
+                result[name] = np.full(count, np.nan)
+                continue
+            values = np.asarray(self._map(np, path, column, meta["rows"])[selection])
+            if "labels" in column:
+                labels = np.array(column["labels"] + [None], dtype=object)
+                values = labels[values]
+            result[name] = values
+        return result
+
+    @staticmethod
+    def _map(np, path: str, column: Dict[str, Any], rows: int):
+        return np.memmap(os.path.join(path, column["file"]), dtype="<" + column["dtype"], mode="r", shape=(rows,))
@@ -0,0 +1,155 @@
+import math, threading, time
+from typing import Any, Callable, Dict, Iterable, Optional
+
+from storage.columnar import ColumnarStoreReader, ColumnarStoreWriter
+
+
+METHODS = ("lttb", "minmax", "raw")
+READER_REFRESH_INTERVAL_S = 5.0
+
+
+def lttb(x, y, points: int):
+    """
+    Largest-Triangle-Three-Buckets reduction of the series (x, y) to `points` samples.
+    Keeps the first and last sample and, per bucket, the sample forming the largest
+    triangle with the previously kept sample and the average of the next bucket, which
+    preserves peaks and the visual shape far better than taking every n-th sample.
+    """
+    import numpy as np
+
+    n = len(x)
+    if points >= n or points < 3:
+        return x, y
+    every = (n - 2) / (points - 2)
+    keep = np.empty(points, dtype=np.int64)
+    keep[0] = 0
+    a = 0
+    for i in range(points - 2):
+        start = int(i * every) + 1
+        end = int((i + 1) * every) + 1
+        next_end = min(int((i + 2) * every) + 1, n)
+        avg_x = x[end:next_end].mean()
+        avg_y = y[end:next_end].mean()
+        area = np.abs((x[a] - avg_x) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (avg_y - y[a]))
+        a = start + int(area.argmax())
+        keep[i + 1] = a
+    keep[-1] = n - 1
+    return x[keep], y[keep]
+
+def minmax_envelope(x, y, buckets: int):
+    """
+    Splits the series into `buckets` equal-count buckets and returns (t, lo, hi): the first
+    x of each bucket and the min and max y inside it.  Every spike survives, so this is the
+    reduction to use when the extremes matter (alarms, limits) rather than the shape.
+    """
+    import numpy as np
+
+    n = len(x)
+    if buckets >= n or buckets < 1:
+        return x, y, y
+    starts = (np.arange(buckets) * n) // buckets
+    return x[starts], np.minimum.reduceat(y, starts), np.maximum.reduceat(y, starts)
+
+
+class HistoryStore:
+    """
+    Query layer over the columnar time-series store.
+
+    query() returns any numeric variable over any TIME_STAMP range, reduced on the server
+    to about `points` samples.  Rows the live writer still holds in memory (the last few
+    minutes, not yet flushed into a chunk) are merged in when a `live` callable is given,
+    so recent windows are complete.  Safe to call from several request threads.
+    """
+
+    def __init__(self, root: str, live: Optional[Callable[[], Optional[ColumnarStoreWriter]]] = None):
+        self.root = root
+        self.live = live
+        self._reader: Optional[ColumnarStoreReader] = None
+        self._refreshed = 0.0
+        self._chunks_seen = -1
+        self._lock = threading.Lock()
+
+    def _get_reader(self, writer: Optional[ColumnarStoreWriter]) -> ColumnarStoreReader:
+        # Refresh as soon as the live writer has put a new chunk on disk, since those rows
+        # just left its buffer; otherwise only every READER_REFRESH_INTERVAL_S.
+        chunks_written = writer.chunks_written if writer is not None else self._chunks_seen
+        with self._lock:
+            if self._reader is None:
+                self._reader = ColumnarStoreReader(self.root)
+            elif chunks_written != self._chunks_seen or time.monotonic() - self._refreshed >= READER_REFRESH_INTERVAL_S:
+                self._reader.refresh()
+            else:
+                return self._reader
+            self._refreshed = time.monotonic()
+            self._chunks_seen = chunks_written
+            return self._reader
+
+    def read(self, names: Iterable[str], t_start: Optional[float] = None, t_end: Optional[float] = None) -> Dict[str, Any]:
+        """Raw rows (persisted + live buffer) as numpy arrays keyed by TIME_STAMP and each name."""
+        import numpy as np
+
+        names = list(dict.fromkeys(names))
+        writer = self.live() if self.live is not None else None
+        stored = self._get_reader(writer).read(names, t_start, t_end)
+        if writer is None:
+            return stored
+        buffered = writer.read_buffer(names)
+        stamps = buffered[writer.time_key]
+        mask = np.ones(len(stamps), dtype=bool)
+        if t_start is not None:
+            mask &= stamps >= t_start
+        if t_end is not None:
+            mask &= stamps <= t_end
+        time_key = writer.time_key
+        merged = {time_key: np.concatenate([stored.get(time_key, np.empty(0)), stamps[mask]])}
+        for name in names:
+            if name != time_key:
+                merged[name] = np.concatenate([stored.get(name, np.empty(0)), buffered[name][mask]])
+        return merged
+
+    def query(self, names: Iterable[str], t_start: Optional[float] = None, t_end: Optional[float] = None,
+              points: int = 500, method: str = "lttb", time_key: str = "TIME_STAMP") -> Dict[str, Dict[str, Any]]:
+        """
+        Returns {name: series} for each variable.  Series by method:
+          "lttb"   -> {"t": times, "y": values}            about `points` samples
+          "minmax" -> {"t": times, "min": lo, "max": hi}   `points` // 2 buckets (two values each)
+          "raw"    -> {"t": times, "y": values}            every stored sample
+        Missing and non-numeric samples are dropped before reducing.  Every series also
+        carries "raw_points", the number of samples it was reduced from.
+        """
+        import numpy as np
+
+        if method not in METHODS:
+            raise ValueError(f"Unknown downsampling method {method!r}, expected one of {METHODS}")
+        names = list(dict.fromkeys(names))
+        columns = self.read(names, t_start, t_end)
+        times = columns.get(time_key, np.empty(0))
+        order = np.argsort(times, kind="stable")
+        times = times[order]
+        result: Dict[str, Dict[str, Any]] = {}
+        for name in names:
+            values = columns.get(name)
+            if values is None or values.dtype == object:
+                values = np.full(len(times), np.nan)
+            else:
+                values = values[order]
+            valid = ~np.isnan(values)
+            t, y = times[valid], values[valid]
+            if method == "minmax":
+                t, lo, hi = minmax_envelope(t, y, max(1, points // 2))
+                result[name] = {"t": t, "min": lo, "max": hi, "raw_points": int(valid.sum())}
+            elif method == "lttb":
+                t, y = lttb(t, y, points)
+                result[name] = {"t": t, "y": y, "raw_points": int(valid.sum())}
+            else:
+                result[name] = {"t": t, "y": y, "raw_points": int(valid.sum())}
+        return result
+
+
+def series_to_json(series: Dict[str, Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    """Converts query() output to plain lists for a JSON response."""
+    return {
+        name: {key: value if isinstance(value, int) else [None if isinstance(v, float) and math.isnan(v) else v for v in value.tolist()]
+               for key, value in fields.items()}
+        for name, fields in series.items()
+    }
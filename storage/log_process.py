@@ -0,0 +1,175 @@
+import multiprocessing, queue, signal, time
+from typing import Any, Dict, List, Optional, Sequence
+
+from storage.snapshot_log import SegmentCompressor, SnapshotLogWriter
+
+
+POLICIES = ("drop", "block")
+RESTART_INTERVAL_S = 10.0
+
+
+def _log_writer_main(rows: "multiprocessing.Queue[Any]", directory: str, fieldnames: Sequence[str], options: Dict[str, Any]):
+    """
+    Body of the writer process.  Owns the SnapshotLogWriter and its SegmentCompressor, so
+    every disk write, fsync, gzip and retention delete happens here and never in the
+    process running the control loop.
+    """
+    signal.signal(signal.SIGINT, signal.SIG_IGN)  # Ctrl+C goes to the app; we stop on the None sentinel
+    compressor = SegmentCompressor(directory, options["base_name"], max_bytes=options["max_bytes"], max_days=options["max_days"])
+    writer = SnapshotLogWriter(directory, fieldnames, base_name=options["base_name"], flush_rows=options["flush_rows"],
+                               flush_interval_s=options["flush_interval_s"], max_segment_bytes=options["max_segment_bytes"],
+                               compressor=compressor)
+    parent = multiprocessing.parent_process()
+    try:
+        while True:
+            try:
+                message = rows.get(timeout=options["flush_interval_s"])
+            except queue.Empty:
+                writer.flush()
+                if parent is not None and not parent.is_alive():
+                    return
+                continue
+            if message is None:
+                return
+            try:
+                kind = message[0]
+                if kind == "row":
+                    writer.write(message[1], message[2])
+                elif kind == "fields":
+                    writer.set_fieldnames(message[1])
+                elif kind == "flush":
+                    writer.flush()
+            except Exception as e:
+                print(f"[ERROR] Log writer process failed to write: {e}")
+    finally:
+        writer.close()
+        compressor.stop()
+
+
+class LogWriterProcess:
+    """
+    Feeds snapshot log rows to a separate writer process through a bounded queue.
+
+    submit() never touches the disk.  When the queue already holds `maxsize` rows the
+    `policy` decides: "drop" discards the new row at once, "block" waits up to
+    `block_timeout_s` for room and then drops it, so even a stalled disk can't hold the
+    caller longer than that.  `submitted` and `dropped` count rows over the lifetime of
+    the object; depth() is the current queue length.  A writer process that dies is
+    restarted on the next submit (at most every RESTART_INTERVAL_S).  A schema change
+    that doesn't fit in the queue is retried before each following row, and `fieldnames`
+    only changes once the writer has been sent the new header.
+
+    The process is started with the "spawn" method on every platform, matching Windows
+    where the game runs, and so it never inherits the parent's fetch/command threads.
+    """
+
+    def __init__(self, directory: str, fieldnames: Sequence[str], maxsize: int = 10000, policy: str = "drop",
+                 block_timeout_s: float = 0.05, base_name: str = "simulator_data_log", flush_rows: int = 60,
+                 flush_interval_s: float = 10.0, max_segment_bytes: Optional[int] = 64 * 1024 * 1024,
+                 max_bytes: Optional[int] = None, max_days: Optional[int] = None):
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown log queue policy {policy!r}, expected one of {POLICIES}")
+        self.directory = directory
+        self.fieldnames = list(fieldnames)
+        self._undelivered_fieldnames: Optional[List[str]] = None
+        self.maxsize = maxsize
+        self.policy = policy
+        self.block_timeout_s = block_timeout_s
+        self.submitted = 0
+        self.dropped = 0
+        self.restarts = 0
+        self._options = {
+            "base_name": base_name,
+            "flush_rows": flush_rows,
+            "flush_interval_s": flush_interval_s,
+            "max_segment_bytes": max_segment_bytes,
+            "max_bytes": max_bytes,
+            "max_days": max_days,
+        }
+        self._context = multiprocessing.get_context("spawn")
+        self._queue: Optional["multiprocessing.Queue[Any]"] = None
+        self._process: Optional[multiprocessing.process.BaseProcess] = None
+        self._last_start = 0.0
+        self._start()
+
+    def _start(self):
+        self._last_start = time.monotonic()
+        self._queue = self._context.Queue(self.maxsize)
+        self._process = self._context.Process(
+            target=_log_writer_main,
+            args=(self._queue, self.directory, self.fieldnames, self._options),
+            name="snapshot-log-writer",
+            daemon=True,
+        )
+        self._process.start()
+
+    def _ensure_running(self) -> bool:
+        if self._process is not None and self._process.is_alive():
+            return True
+        if time.monotonic() - self._last_start < RESTART_INTERVAL_S:
+            return False
+        print("[ERROR] Snapshot log writer process is not running, restarting it")
+        self.restarts += 1
+        self._start()
+        return True
+
+    def _put(self, message: Any) -> bool:
+        if not self._ensure_running():
+            return False
+        try:
+            if self.policy == "block":
+                self._queue.put(message, timeout=self.block_timeout_s)
+            else:
+                self._queue.put_nowait(message)
+            return True
+        except queue.Full:
+            return False
+
+    def set_fieldnames(self, fieldnames: Sequence[str]):
+        fieldnames = list(fieldnames)
+        if fieldnames == self.fieldnames:
+            self._undelivered_fieldnames = None
+            return
+        if self._put(("fields", fieldnames)):
+            self.fieldnames = fieldnames
+            self._undelivered_fieldnames = None
+            return
+        if self._undelivered_fieldnames is None:
+            print("[ERROR] Snapshot log queue full, schema change not delivered yet; retrying before the next row")
+        self._undelivered_fieldnames = fieldnames
+
+    def submit(self, row: Dict[str, Any], day: Optional[int] = None) -> bool:
+        """Queues one row.  Returns False (and counts it in `dropped`) when it was discarded."""
+        self.submitted += 1
+        if self._undelivered_fieldnames is not None:
+            self.set_fieldnames(self._undelivered_fieldnames)
+        if self._put(("row", row, day)):
+            return True
+        self.dropped += 1
+        return False
+
+    def depth(self) -> int:
+        """Rows waiting in the queue, or -1 where the platform can't tell (macOS)."""
+        try:
+            return self._queue.qsize()
+        except NotImplementedError:
+            return -1
+
+    def stats(self) -> Dict[str, int]:
+        return {"depth": self.depth(), "submitted": self.submitted, "dropped": self.dropped, "restarts": self.restarts}
+
+    def close(self, timeout_s: float = 10.0):
+        """Asks the writer to flush and exit; terminates it if it hasn't within `timeout_s`."""
+        if self._process is None:
+            return
+        if self._process.is_alive():
+            try:
+                self._queue.put(None, timeout=timeout_s)
+            except queue.Full:
+                pass
+            self._process.join(timeout_s)
+            if self._process.is_alive():
+                print("[ERROR] Snapshot log writer did not stop in time, terminating it")
+                self._process.terminate()
+        self._queue.close()
+        self._process = None
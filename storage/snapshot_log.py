@@ -0,0 +1,298 @@
+import csv, gzip, os, queue, re, shutil, threading, time
+from typing import Any, Dict, Iterator, List, Optional, Sequence, TextIO
+
+# Segment file names: "<base>.<n>.csv" or, once the writer knows the in-game day,
+# "<base>.<n>.day<d>.csv".  Closed segments are compressed to the same name + ".gz".
+SEGMENT_PATTERN = r"\.(\d+)(?:\.day(\d+))?\.csv(\.gz)?$"
+MINUTES_PER_DAY = 1440
+
+
+def segment_paths(directory: str, base_name: str) -> List[str]:
+    """
+    Returns the log segments in write order: the legacy single-file log "<base>.csv"
+    first, if present, then the numbered segments by segment number.  When a segment
+    exists both plain and compressed (compression interrupted) only the plain file is
+    returned.
+    """
+    if not os.path.isdir(directory):
+        return []
+    pattern = re.compile(rf"^{re.escape(base_name)}{SEGMENT_PATTERN}")
+    numbered: Dict[int, str] = {}
+    for name in os.listdir(directory):
+        match = pattern.match(name)
+        if match:
+            number = int(match.group(1))
+            if number not in numbered or not match.group(3):
+                numbered[number] = os.path.join(directory, name)
+    paths = [numbered[number] for number in sorted(numbered)]
+    legacy = os.path.join(directory, f"{base_name}.csv")
+    if os.path.isfile(legacy):
+        paths.insert(0, legacy)
+    return paths
+
+def _segment_number(path: str) -> Optional[int]:
+    match = re.search(SEGMENT_PATTERN, path)
+    return int(match.group(1)) if match else None
+
+def segment_day(path: str) -> Optional[int]:
+    """The in-game day a segment was written on, or None for untagged segments."""
+    match = re.search(SEGMENT_PATTERN, path)
+    return int(match.group(2)) if match and match.group(2) is not None else None
+
+def _open_segment(path: str) -> TextIO:
+    if path.endswith(".gz"):
+        return gzip.open(path, "rt", newline='')
+    return open(path, "r", newline='')
+
+
+class SegmentCompressor:
+    """
+    Background worker that gzips closed log segments and enforces the retention policy.
+
+    The writer hands over each segment it closes; the worker compresses it to "<name>.gz"
+    (via a ".tmp" file and a rename, so a crash never leaves a half-written archive) and
+    deletes the plain file.  After every segment it prunes the oldest numbered segments
+    until at most `max_segments` remain, they total at most `max_bytes`, and none is older
+    than `max_days` in-game days behind the newest.  A limit of None disables that rule.
+    The segment currently being written is never compressed or deleted.
+    """
+
+    def __init__(self, directory: str, base_name: str, max_segments: Optional[int] = None,
+                 max_bytes: Optional[int] = None, max_days: Optional[int] = None):
+        self.directory = directory
+        self.base_name = base_name
+        self.max_segments = max_segments
+        self.max_bytes = max_bytes
+        self.max_days = max_days
+        self.active_path: Optional[str] = None
+        self.compressed = 0
+        self.deleted = 0
+        self._queue: "queue.Queue[Optional[str]]" = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="log-compressor", daemon=True)
+        self._thread.start()
+
+    def submit(self, path: str):
+        self._queue.put(path)
+
+    def _run(self):
+        while True:
+            path = self._queue.get()
+            try:
+                if path is None:
+                    return
+                self._compress(path)
+                self._apply_retention()
+            except Exception as e:
+                print(f"[ERROR] Log compression failed for {path}: {e}")
+            finally:
+                self._queue.task_done()
+
+    def _compress(self, path: str):
+        if path.endswith(".gz") or path == self.active_path or not os.path.isfile(path):
+            return
+        staging = path + ".gz.tmp"
+        with open(path, "rb") as src, gzip.open(staging, "wb") as dst:
+            shutil.copyfileobj(src, dst)
+        os.replace(staging, path + ".gz")
+        os.remove(path)
+        self.compressed += 1
+
+    def _apply_retention(self):
+        closed = [path for path in segment_paths(self.directory, self.base_name)
+                  if _segment_number(path) is not None and path != self.active_path]
+        sizes = {path: os.path.getsize(path) for path in closed}
+        days = [day for day in map(segment_day, closed + [self.active_path or ""]) if day is not None]
+        newest_day = max(days, default=None)
+        kept = 1 if self.active_path else 0
+        total = os.path.getsize(self.active_path) if self.active_path and os.path.isfile(self.active_path) else 0
+        doomed = []
+        # Walk newest to oldest so the limits keep the most recent history.
+        for path in reversed(closed):
+            day = segment_day(path)
+            too_old = self.max_days is not None and day is not None and newest_day is not None and day < newest_day - self.max_days
+            too_many = self.max_segments is not None and kept + 1 > self.max_segments
+            too_big = self.max_bytes is not None and total + sizes[path] > self.max_bytes
+            if too_old or too_many or too_big:
+                doomed.append(path)
+            else:
+                kept += 1
+                total += sizes[path]
+        for path in doomed:
+            os.remove(path)
+            self.deleted += 1
+
+    def drain(self, timeout_s: Optional[float] = None) -> bool:
+        """Waits until every submitted segment is processed.  Returns False on timeout."""
+        deadline = None if timeout_s is None else time.monotonic() + timeout_s
+        while self._queue.unfinished_tasks:
+            if deadline is not None and time.monotonic() > deadline:
+                return False
+            time.sleep(0.01)
+        return True
+
+    def stop(self, timeout_s: float = 5.0):
+        self._queue.put(None)
+        self._thread.join(timeout_s)
+
+
+class SnapshotLogWriter:
+    """
+    Long-lived, segmented CSV writer for the per-tick data snapshot.
+
+    The log is a series of segment files "<base>.<n>.day<d>.csv" in `directory`, each
+    starting with its own header row.  On open the writer appends to the newest segment if
+    its header matches `fieldnames`, it is for the same in-game day and it is under
+    `max_segment_bytes`; otherwise it starts the next segment.  A new segment is also
+    started whenever set_fieldnames() changes the columns, the in-game day passed to
+    write() changes, or the current segment reaches `max_segment_bytes`, so changing what
+    we log never rewrites or truncates history.  read_snapshot_log() merges the segments
+    back into one table.
+
+    Closed segments are handed to `compressor` (a SegmentCompressor), if given, which
+    gzips them and applies the retention policy off the calling thread.
+
+    The handle stays open between writes.  write() only appends the row to an in-memory
+    buffer; rows reach the disk when `flush_rows` are buffered, when `flush_interval_s` has
+    passed since the last flush, or on flush()/close().  If the file can't be written the
+    buffer keeps at most `max_buffered_rows`, oldest rows dropped first.
+    """
+
+    def __init__(self, directory: str, fieldnames: Sequence[str], base_name: str = "simulator_data_log",
+                 flush_rows: int = 60, flush_interval_s: float = 10.0, max_buffered_rows: int = 6000,
+                 max_segment_bytes: Optional[int] = 64 * 1024 * 1024, compressor: Optional[SegmentCompressor] = None):
+        self.directory = directory
+        self.base_name = base_name
+        self.fieldnames = list(fieldnames)
+        self.flush_rows = flush_rows
+        self.flush_interval_s = flush_interval_s
+        self.max_buffered_rows = max_buffered_rows
+        self.max_segment_bytes = max_segment_bytes
+        self.compressor = compressor
+        self.path: Optional[str] = None
+        self.day: Optional[int] = None
+        self._rows: List[Dict[str, Any]] = []
+        self._file: Optional[TextIO] = None
+        self._writer: Optional["csv.DictWriter[str]"] = None
+        self._last_flush = time.monotonic()
+
+    def _open(self):
+        os.makedirs(self.directory, exist_ok=True)
+        segments = [path for path in segment_paths(self.directory, self.base_name) if _segment_number(path) is not None]
+        if self.compressor is not None:
+            # Segments left uncompressed by an earlier run.
+            for path in segments[:-1]:
+                if not path.endswith(".gz"):
+                    self.compressor.submit(path)
+        if segments and self._can_append(segments[-1]):
+            self._attach(segments[-1], "a")
+            return
+        if segments and self.compressor is not None:
+            self.compressor.submit(segments[-1])
+        number = _segment_number(segments[-1]) + 1 if segments else 1
+        day_tag = f".day{self.day:05d}" if self.day is not None else ""
+        self._attach(os.path.join(self.directory, f"{self.base_name}.{number:05d}{day_tag}.csv"), "w")
+        self._writer.writeheader()
+
+    def _can_append(self, path: str) -> bool:
+        if path.endswith(".gz") or segment_day(path) != self.day:
+            return False
+        if self.max_segment_bytes is not None and os.path.getsize(path) >= self.max_segment_bytes:
+            return False
+        with open(path, "r", newline='') as f:
+            return next(csv.reader(f), None) == self.fieldnames
+
+    def _attach(self, path: str, mode: str):
+        self.path = path
+        self._file = open(path, mode, newline='')
+        self._writer = csv.DictWriter(self._file, fieldnames=self.fieldnames, extrasaction="ignore")
+        if self.compressor is not None:
+            self.compressor.active_path = path
+
+    def _close_segment(self, retire: bool = True):
+        if self._file is not None:
+            self._file.close()
+            if retire and self.compressor is not None:
+                self.compressor.active_path = None
+                self.compressor.submit(self.path)
+        self._file = None
+        self._writer = None
+
+    def set_fieldnames(self, fieldnames: Sequence[str]):
+        """Switches the log schema.  Buffered rows are flushed first; the next write starts a new segment."""
+        fieldnames = list(fieldnames)
+        if fieldnames == self.fieldnames:
+            return
+        self.flush()
+        self._close_segment()
+        self.fieldnames = fieldnames
+
+    def write(self, row: Dict[str, Any], day: Optional[int] = None):
+        """
+        Buffers one row.  `day` is the in-game day the row belongs to; when it differs from
+        the current segment's day the buffered rows are flushed and a new segment begins.
+        """
+        if day is not None and day != self.day:
+            if self.day is not None or self._file is not None:
+                self.flush()
+                self._close_segment()
+            self.day = day
+        self._rows.append(row)
+        if len(self._rows) > self.max_buffered_rows:
+            del self._rows[:len(self._rows) - self.max_buffered_rows]
+        if len(self._rows) >= self.flush_rows or time.monotonic() - self._last_flush >= self.flush_interval_s:
+            self.flush()
+
+    def flush(self):
+        self._last_flush = time.monotonic()
+        if not self._rows:
+            return
+        if self._file is None:
+            self._open()
+        rows, self._rows = self._rows, []
+        self._writer.writerows(rows)
+        self._file.flush()
+        if self.max_segment_bytes is not None and self._file.tell() >= self.max_segment_bytes:
+            self._close_segment()
+
+    def close(self):
+        try:
+            self.flush()
+        finally:
+            # The segment stays uncompressed so the next run can keep appending to it.
+            self._close_segment(retire=False)
+
+
+def _select_segments(directory: str, base_name: str, first_day: Optional[int], last_day: Optional[int]) -> List[str]:
+    """Segments whose in-game day falls in [first_day, last_day].  Untagged segments are always included."""
+    selected = []
+    for path in segment_paths(directory, base_name):
+        day = segment_day(path)
+        if day is not None and ((first_day is not None and day < first_day) or (last_day is not None and day > last_day)):
+            continue
+        selected.append(path)
+    return selected
+
+def iter_snapshot_log(directory: str, base_name: str = "simulator_data_log",
+                      first_day: Optional[int] = None, last_day: Optional[int] = None) -> Iterator[Dict[str, str]]:
+    """
+    Yields every logged row, oldest segment first, as a dict keyed by that segment's header.
+    first_day/last_day skip segments outside that in-game day range without opening them.
+    """
+    for path in _select_segments(directory, base_name, first_day, last_day):
+        with _open_segment(path) as f:
+            yield from csv.DictReader(f)
+
+def read_snapshot_log(directory: str, base_name: str = "simulator_data_log",
+                      first_day: Optional[int] = None, last_day: Optional[int] = None):
+    """
+    Reads the segments into one pandas DataFrame.  Columns are the union of every segment's
+    schema; cells a segment didn't log are NaN.  first_day/last_day limit the read to the
+    segments of that in-game day range.
+    """
+    import pandas as pd
+
+    frames = [pd.read_csv(path) for path in _select_segments(directory, base_name, first_day, last_day)]
+    frames = [frame for frame in frames if not frame.empty]
+    if not frames:
+        return pd.DataFrame()
+    return pd.concat(frames, ignore_index=True, sort=False)
@@ -0,0 +1,69 @@
+import json
+import time
+import unittest
+
+import requests
+
+import sim_api
+from tools.standin_server import start_standin_server
+
+
+class BulkReaderTests(unittest.TestCase):
+    def setUp(self):
+        self.saved = (sim_api.SIMULATOR_URL, sim_api.catalog, sim_api.scheduler, sim_api.bulk_reader)
+        self.server = start_standin_server(variables=40)
+        sim_api.SIMULATOR_URL = self.server.url
+        sim_api.catalog = sim_api.VariableCatalog()
+        sim_api.catalog.refresh(force=True)
+        sim_api.scheduler = sim_api.PollScheduler(budget=1000)
+        sim_api.bulk_reader = sim_api.BulkReader(reprobe_interval_s=0.2, max_failures=3)
+
+    def tearDown(self):
+        sim_api.SIMULATOR_URL, sim_api.catalog, sim_api.scheduler, sim_api.bulk_reader = self.saved
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_variables_missing_from_the_payload_are_read_one_by_one(self):
+        plant = self.server.plant
+        left_out = plant.get_vars[-2:]
+        plant.snapshot = lambda: json.dumps({var: plant.values[var] for var in plant.get_vars if var not in left_out})
+        values, errors = sim_api.read_plant_values()
+        self.assertTrue(sim_api.bulk_reader.available)
+        self.assertEqual(errors, 0)
+        self.assertTrue(set(sim_api.catalog.get_vars) <= set(values))
+
+    def test_disabled_after_consecutive_failures_then_reprobed(self):
+        reader = sim_api.bulk_reader
+        reader.sync(sim_api.catalog)
+        self.assertTrue(reader.available)
+
+        self.server.bulk = False
+        for _ in range(reader.max_failures - 1):
+            with self.assertRaises(requests.HTTPError):
+                reader.read()
+            self.assertTrue(reader.available)
+        with self.assertRaises(requests.HTTPError):
+            reader.read()
+        self.assertFalse(reader.available)
+
+        self.server.bulk = True
+        reader.sync(sim_api.catalog)
+        self.assertFalse(reader.available)
+        time.sleep(reader.reprobe_interval_s)
+        reader.sync(sim_api.catalog)
+        self.assertTrue(reader.available)
+
+    def test_one_good_read_resets_the_failure_count(self):
+        reader = sim_api.bulk_reader
+        reader.sync(sim_api.catalog)
+        for _ in range(2 * reader.max_failures):
+            self.server.bulk = False
+            with self.assertRaises(requests.HTTPError):
+                reader.read()
+            self.server.bulk = True
+            reader.read()
+        self.assertTrue(reader.available)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,71 @@
+import importlib.util
+import tempfile
+import time
+import unittest
+
+from storage.columnar import INT16_MAX, ColumnarStoreReader, ColumnarStoreWriter
+
+
+@unittest.skipUnless(importlib.util.find_spec("numpy"), "numpy is not installed")
+class BackgroundWriterTests(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.writer = ColumnarStoreWriter(self.directory.name, chunk_rows=10, background=True)
+
+    def tearDown(self):
+        self.writer.close()
+        self.directory.cleanup()
+
+    def wait_for_chunks(self, count):
+        deadline = time.monotonic() + 5
+        while self.writer.chunks_written < count and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(self.writer.chunks_written, count)
+
+    def test_read_returns_each_row_once_after_a_background_flush(self):
+        from storage.history import HistoryStore
+
+        for t in range(35):
+            self.writer.append({"TIME_STAMP": float(t), "CORE_TEMP": 300.0 + t, "CORE_STATE": "REACTIVO"})
+        self.wait_for_chunks(3)
+        self.assertEqual(self.writer._pending, [])
+
+        rows = HistoryStore(self.directory.name, live=lambda: self.writer).read(["CORE_TEMP", "CORE_STATE"])
+        self.assertEqual(list(rows["TIME_STAMP"]), [float(t) for t in range(35)])
+        self.assertEqual(list(rows["CORE_TEMP"]), [300.0 + t for t in range(35)])
+
+
+@unittest.skipUnless(importlib.util.find_spec("numpy"), "numpy is not installed")
+class AppendTests(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.writer = ColumnarStoreWriter(self.directory.name, chunk_rows=10 ** 6)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def read_back(self, names):
+        self.writer.close()
+        return ColumnarStoreReader(self.directory.name).read(names)
+
+    def test_a_failing_value_drops_the_whole_row(self):
+        self.writer.append({"TIME_STAMP": 1.0, "CORE_TEMP": 300.0, "CORE_STATE": "REACTIVO"})
+        with self.assertRaises(OverflowError):
+            self.writer.append({"TIME_STAMP": 2.0, "CORE_TEMP": 301.0, "CORE_STATE": "SCRAM", "NEW_VALUE": 10 ** 400})
+        self.writer.append({"TIME_STAMP": 3.0, "CORE_TEMP": 302.0, "CORE_STATE": "REACTIVO"})
+        rows = self.read_back(["CORE_TEMP", "CORE_STATE"])
+        self.assertEqual(list(rows["TIME_STAMP"]), [1.0, 3.0])
+        self.assertEqual(list(rows["CORE_TEMP"]), [300.0, 302.0])
+        self.assertEqual(list(rows["CORE_STATE"]), ["REACTIVO", "REACTIVO"])
+
+    def test_enum_codes_past_int16_are_widened(self):
+        count = INT16_MAX + 10
+        for t in range(count):
+            self.writer.append({"TIME_STAMP": float(t), "LABEL": f"state {t}"})
+        rows = self.read_back(["LABEL"])
+        self.assertEqual(rows["LABEL"][0], "state 0")
+        self.assertEqual(list(rows["LABEL"][-2:]), [f"state {count - 2}", f"state {count - 1}"])
+
+
+if __name__ == "__main__":
+    unittest.main()
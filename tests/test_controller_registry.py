@@ -0,0 +1,53 @@
+import unittest
+
+from controller_registry import ControllerRegistry, ControllerScheduler
+from plant_state import PlantState
+from timer_wheel import GameTimerWheel
+
+
+class RegistryOrderTests(unittest.TestCase):
+    def test_readers_run_after_writers(self):
+        registry = ControllerRegistry()
+        registry.register(lambda data, plant: None, reads=("core_temp_error",), name="rods", priority=0)
+        registry.register(lambda data, plant: None, writes=("core_temp_*",), name="core", priority=5)
+        self.assertEqual([spec.name for spec in registry.ordered()], ["core", "rods"])
+
+    def test_cycle_is_rejected(self):
+        registry = ControllerRegistry()
+        registry.register(lambda data, plant: None, reads=("a",), writes=("b",), name="x")
+        registry.register(lambda data, plant: None, reads=("b",), writes=("a",), name="y")
+        with self.assertRaises(ValueError):
+            registry.ordered()
+
+
+class SchedulerTests(unittest.TestCase):
+    def setUp(self):
+        self.calls = []
+        self.registry = ControllerRegistry()
+        self.registry.register(lambda data, plant: self.calls.append(1), reads=("COOLANT_SEC_*_VOLUME",), name="loops")
+        self.scheduler = ControllerScheduler(self.registry, timers=GameTimerWheel())
+        self.plant = PlantState()
+
+    def tick(self, data):
+        return self.scheduler.run(data, self.plant.load(data))
+
+    def test_runs_only_when_inputs_change(self):
+        data = {"TIME_STAMP": 1.0, "COOLANT_SEC_0_VOLUME": 24000.0}
+        self.assertEqual(self.tick(data), ["loops"])
+        self.assertEqual(self.tick(data), [])
+        data["COOLANT_SEC_0_VOLUME"] = 25000.0
+        self.assertEqual(self.tick(data), ["loops"])
+
+    def test_wildcards_follow_a_rebind_with_the_same_key_count(self):
+        data = {"TIME_STAMP": 1.0, "COOLANT_SEC_0_VOLUME": 24000.0, "COOLANT_SEC_1_VOLUME": 24000.0, "CORE_TEMP": 300.0}
+        self.tick(data)
+        # a loop appears while another key goes away: len(data) is unchanged
+        del data["CORE_TEMP"]
+        data["COOLANT_SEC_2_VOLUME"] = 24000.0
+        self.assertEqual(self.tick(data), ["loops"])
+        data["COOLANT_SEC_2_VOLUME"] = 30000.0
+        self.assertEqual(self.tick(data), ["loops"])
+
+
+if __name__ == "__main__":
+    unittest.main()
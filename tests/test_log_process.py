@@ -0,0 +1,38 @@
+import contextlib
+import io
+import unittest
+
+from storage.log_process import LogWriterProcess
+
+
+class QueueStub(LogWriterProcess):
+    """Records what would go on the queue instead of starting a writer process."""
+
+    def _start(self):
+        self.sent = []
+        self.full = False
+
+    def _put(self, message):
+        if self.full:
+            return False
+        self.sent.append(message)
+        return True
+
+
+class SchemaChangeTests(unittest.TestCase):
+    def test_schema_change_is_retried_before_the_next_row(self):
+        log = QueueStub("unused", ["timestamp", "CORE_TEMP"])
+        log.full = True
+        with contextlib.redirect_stdout(io.StringIO()):
+            log.set_fieldnames(["timestamp", "CORE_TEMP", "CORE_PRESSURE"])
+            self.assertFalse(log.submit({"timestamp": "t0"}))
+        self.assertEqual(log.fieldnames, ["timestamp", "CORE_TEMP"])
+
+        log.full = False
+        self.assertTrue(log.submit({"timestamp": "t1"}))
+        self.assertEqual(log.sent, [("fields", ["timestamp", "CORE_TEMP", "CORE_PRESSURE"]), ("row", {"timestamp": "t1"}, None)])
+        self.assertEqual(log.fieldnames, ["timestamp", "CORE_TEMP", "CORE_PRESSURE"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,57 @@
+import contextlib
+import io
+import threading
+import unittest
+
+import sim_api
+from controller_registry import ControllerRegistry
+from timer_wheel import active_timers, game_timers
+from tools.replay import replay
+
+
+def throttled_write(data, plant):
+    timers = active_timers()
+    if timers.ready("test_throttle"):
+        timers.once("test_throttle", 2)
+        sim_api.set_game_variable("CONDENSER_CIRCULATION_PUMP_ORDERED_SPEED", data["TIME_STAMP"])
+    print("replay tick")
+
+
+class ReplayIsolationTests(unittest.TestCase):
+    def setUp(self):
+        self.registry = ControllerRegistry()
+        self.registry.register(throttled_write, reads=("TIME_STAMP",), name="throttled")
+        self.snapshots = [{"TIME_STAMP": float(t)} for t in range(10, 16)]
+
+    def test_live_timers_and_actuator_are_left_alone(self):
+        saved = (game_timers.now, dict(game_timers.timers), dict(sim_api.actuator.pending))
+        result = replay(self.snapshots, registry=self.registry)
+        self.assertEqual([value for _, _, value in result.writes], [10.0, 12.0, 14.0])
+        self.assertEqual((game_timers.now, game_timers.timers, sim_api.actuator.pending), saved)
+
+    def test_other_threads_keep_the_live_bindings(self):
+        in_replay = threading.Event()
+        release = threading.Event()
+
+        def blocking(data, plant):
+            in_replay.set()
+            release.wait(5)
+
+        self.registry.register(blocking, reads=("TIME_STAMP",), name="blocking")
+        worker = threading.Thread(target=replay, args=(self.snapshots[:1],), kwargs={"registry": self.registry})
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            worker.start()
+            try:
+                self.assertTrue(in_replay.wait(5))
+                self.assertIs(active_timers(), game_timers)
+                self.assertIs(sim_api.active_actuator(), sim_api.actuator)
+                print("live tick")
+            finally:
+                release.set()
+                worker.join(5)
+        self.assertEqual(output.getvalue(), "live tick\n")
+
+
+if __name__ == "__main__":
+    unittest.main()
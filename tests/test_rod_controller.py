@@ -0,0 +1,28 @@
+import unittest
+
+import controller
+from controller_registry import ControllerRegistry
+from tools.replay import replay
+
+
+class RodControllerClockTests(unittest.TestCase):
+    def setUp(self):
+        self.registry = ControllerRegistry()
+        self.registry.register(controller.update_rod_controller, reads=("TIME_STAMP", "ROD_BANK_POS_*_ACTUAL"), name="rods")
+
+    def rod_writes(self, stamps):
+        snapshots = [{"TIME_STAMP": stamp, "ROD_BANK_POS_0_ACTUAL": 50.0} for stamp in stamps]
+        result = replay(snapshots, registry=self.registry, data={"reactivity_control_effort": 0.1})
+        return [(stamp, value) for stamp, var, value in result.writes if var == "ROD_BANK_POS_0_ORDERED"]
+
+    def test_tick_without_time_stamp_is_skipped(self):
+        # the missing tick neither moves the rods nor restarts the clock, so the next one
+        # integrates over one minute, not over the whole game time
+        self.assertEqual(self.rod_writes([100.0, 101.0, None, 102.0]), [(101.0, 50.1), (102.0, 50.1)])
+
+    def test_long_gap_is_clamped(self):
+        self.assertEqual(self.rod_writes([100.0, 1000.0]), [(1000.0, 50 + 0.1 * controller.ROD_MAX_STEP_MINUTES)])
+
+
+if __name__ == "__main__":
+    unittest.main()
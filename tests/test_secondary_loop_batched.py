@@ -0,0 +1,70 @@
+import contextlib
+import importlib.util
+import io
+import random
+import unittest
+
+from plant_state import PlantState
+from controllers import SecondaryLoop
+from tools.replay import capture_writes
+
+
+LOOPS = 10
+
+
+def run(data, batched):
+    """Runs one tick on a copy of `data` and returns (data after, sorted writes)."""
+    data = dict(data, secondary_loop_batched=batched)
+    with capture_writes() as writes, contextlib.redirect_stdout(io.StringIO()):
+        SecondaryLoop.update_secondary_loop_controllers(data, PlantState().load(data))
+        writes.flush()
+    del data["secondary_loop_batched"]
+    return data, sorted(writes.writes)
+
+
+@unittest.skipUnless(importlib.util.find_spec("numpy"), "numpy is not installed")
+class BatchedPathTests(unittest.TestCase):
+    def random_tick(self, rng, missing=0.0):
+        states = list(SecondaryLoop.Secondary_Loop_FSM.states) + ["not_a_state"]
+        panic_states = list(SecondaryLoop.Panic_Mode_FSM.states)
+        data = {"TIME_STAMP": 1.0}
+        for i in range(LOOPS):
+            volume = rng.choice([rng.uniform(10000, 45000), 24000.0, 21999.0, 26001.0])
+            pump_speed = rng.choice([rng.uniform(0, 100), 5.0, 50.0])
+            data[f"COOLANT_SEC_{i}_VOLUME"] = None if rng.random() < missing else volume
+            data[f"COOLANT_SEC_CIRCULATION_PUMP_{i}_SPEED"] = None if rng.random() < missing else pump_speed
+            data[f"secondary_pump_controller{i}_enable"] = rng.random() < 0.8
+            data[f"secondary_loop{i}_controller_state"] = rng.choice(states)
+            data[f"secondary_loop{i}_controller_state_panic"] = rng.choice(panic_states)
+        return data
+
+    def test_paths_agree(self):
+        rng = random.Random(3)
+        for _ in range(500):
+            data = self.random_tick(rng)
+            self.assertEqual(run(data, 0), run(data, 1))
+
+    def test_paths_agree_with_missing_readings(self):
+        rng = random.Random(5)
+        for _ in range(500):
+            data = self.random_tick(rng, missing=0.2)
+            self.assertEqual(run(data, 0), run(data, 1))
+
+    def test_missing_reading_disables_only_that_loop(self):
+        data = self.random_tick(random.Random(7))
+        data["COOLANT_SEC_3_VOLUME"] = None
+        data["secondary_loop3_controller_state_panic"] = "PumpOff"
+        for batched in (0, 1):
+            after, writes = run(data, batched)
+            self.assertEqual(after["secondary_loop3_controller_state"], "off_init")
+            self.assertEqual(after["secondary_loop3_controller_state_panic"], "Exit")
+            self.assertNotIn("COOLANT_SEC_CIRCULATION_PUMP_3_ORDERED_SPEED", [var for _, var, _ in writes])
+            # the other loops are evaluated as if loop 3 had a reading
+            reference, _ = run(dict(data, COOLANT_SEC_3_VOLUME=24000.0), batched)
+            for i in range(LOOPS):
+                if i != 3:
+                    self.assertEqual(after[f"secondary_loop{i}_controller_state"], reference[f"secondary_loop{i}_controller_state"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,186 @@
+import contextlib
+import importlib.util
+import io
+import unittest
+
+from plant_state import PlantState
+from controllers import SecondaryLoop
+from controllers.SecondaryLoop import update_secondary_loop_controllers
+from controllers.Utilities.FSM_Calc import FSM_Calc
+from controllers.Utilities.helper_func import fsm_bitmask_generator
+from tools.replay import capture_writes
+
+
+SPEED_KEY = "COOLANT_SEC_CIRCULATION_PUMP_0_ORDERED_SPEED"
+
+
+class OneLoop:
+    """Drives loop 0 through update_secondary_loop_controllers() one tick at a time."""
+
+    def __init__(self, state="off_init", panic_state="Exit", enabled=True):
+        self.plant = PlantState()
+        self.data = {
+            "secondary_pump_controller0_enable": enabled,
+            "secondary_loop0_controller_state": state,
+            "secondary_loop0_controller_state_panic": panic_state,
+        }
+
+    def tick(self, volume, pump_speed):
+        """Runs one tick and returns the ordered speed written this tick, or None."""
+        self.data["COOLANT_SEC_0_VOLUME"] = float(volume)
+        self.data["COOLANT_SEC_CIRCULATION_PUMP_0_SPEED"] = float(pump_speed)
+        with capture_writes() as writes, contextlib.redirect_stdout(io.StringIO()):
+            update_secondary_loop_controllers(self.data, self.plant.load(self.data))
+        return writes.pending.get(SPEED_KEY)
+
+    @property
+    def state(self):
+        return self.data["secondary_loop0_controller_state"]
+
+    @property
+    def panic_state(self):
+        return self.data["secondary_loop0_controller_state_panic"]
+
+
+class SteadyTests(unittest.TestCase):
+    def test_off_init_goes_steady_when_enabled(self):
+        loop = OneLoop()
+        self.assertIsNone(loop.tick(24000, 50))
+        self.assertEqual(loop.state, "steady")
+
+    def test_steady_holds_inside_tolerance(self):
+        loop = OneLoop("steady")
+        for volume in (24000, 24400, 23600):
+            self.assertIsNone(loop.tick(volume, 50))
+            self.assertEqual(loop.state, "steady")
+
+    def test_disable_overrides_to_off_init(self):
+        loop = OneLoop("decrease_slow")
+        loop.data["secondary_pump_controller0_enable"] = False
+        loop.tick(25000, 50)
+        self.assertEqual(loop.state, "off_init")
+
+
+class IncreaseDecreaseTests(unittest.TestCase):
+    def test_decrease_slow(self):
+        loop = OneLoop("steady")
+        self.assertIsNone(loop.tick(25000, 50))
+        self.assertEqual(loop.state, "decrease_slow")
+        self.assertEqual(loop.tick(25000, 50), 47)
+        self.assertEqual(loop.state, "decrease_slow")
+
+    def test_decrease_fast(self):
+        loop = OneLoop("decrease_slow")
+        self.assertEqual(loop.tick(27000, 50), 47)
+        self.assertEqual(loop.state, "decrease_fast")
+        self.assertEqual(loop.tick(27000, 50), 49)
+        self.assertEqual(loop.state, "decrease_fast")
+        self.assertEqual(loop.tick(25000, 49), 48)
+        self.assertEqual(loop.state, "decrease_slow")
+
+    def test_increase_slow(self):
+        loop = OneLoop("steady")
+        self.assertIsNone(loop.tick(23000, 50))
+        self.assertEqual(loop.state, "increase_slow")
+        # 23000 is below the slow band but above the fast one (target - high tolerance)
+        self.assertEqual(loop.tick(23000, 50), 53)
+        self.assertEqual(loop.state, "increase_slow")
+        self.assertEqual(loop.tick(24000, 53), 56)
+        self.assertEqual(loop.state, "steady")
+
+    def test_increase_fast(self):
+        loop = OneLoop("increase_slow")
+        self.assertEqual(loop.tick(21000, 50), 53)
+        self.assertEqual(loop.state, "increase_fast")
+        # increase_fast checks to_inc_slo first, and LOWVOL_LO is always set alongside LOWVOL_HI
+        self.assertEqual(loop.tick(21000, 53), 54)
+        self.assertEqual(loop.state, "increase_slow")
+
+
+class PanicTests(unittest.TestCase):
+    def test_pump_min(self):
+        loop = OneLoop("steady")
+        self.assertIsNone(loop.tick(20000, 3))
+        self.assertEqual((loop.state, loop.panic_state), ("panic", "PumpMin"))
+        self.assertEqual(loop.tick(20000, 3), 5)
+        self.assertEqual(loop.panic_state, "PumpMin")
+        self.assertEqual(loop.tick(45000, 5), 5)
+        self.assertEqual(loop.panic_state, "HiVolume")
+        self.assertEqual(loop.tick(45000, 5), 0)
+
+    def test_low_volume_drives_the_pump_to_max(self):
+        paths = [0, 1] if importlib.util.find_spec("numpy") else [0]
+        for batched in paths:
+            for volume in (14000, 12000, 10000):
+                loop = OneLoop("steady")
+                loop.data["secondary_loop_batched"] = batched
+                self.assertIsNone(loop.tick(volume, 50))
+                self.assertEqual((loop.state, loop.panic_state), ("panic", "LoVolume"), (batched, volume))
+                self.assertEqual(loop.tick(volume, 50), 100, (batched, volume))
+
+    def test_low_volume_takes_over_from_the_pump_limits(self):
+        for panic_state, pump_speed in (("PumpMin", 5), ("PumpOff", 0)):
+            loop = OneLoop("panic", panic_state)
+            loop.tick(12000, pump_speed)
+            self.assertEqual(loop.panic_state, "LoVolume", panic_state)
+            self.assertEqual(loop.tick(12000, pump_speed), 100, panic_state)
+
+    def test_pump_off(self):
+        loop = OneLoop("steady")
+        self.assertIsNone(loop.tick(30000, 2))
+        self.assertEqual((loop.state, loop.panic_state), ("panic", "PumpOff"))
+        self.assertEqual(loop.tick(30000, 2), 0)
+        self.assertEqual(loop.panic_state, "PumpOff")
+        self.assertEqual(loop.tick(20000, 0), 0)
+        self.assertEqual(loop.panic_state, "PumpMin")
+
+    def test_lo_volume(self):
+        loop = OneLoop("panic", "LoVolume")
+        self.assertEqual(loop.tick(10000, 50), 100)
+        self.assertEqual(loop.panic_state, "LoVolume")
+        # still panicking on pump speed, but the volume is back above the fast band
+        self.assertEqual(loop.tick(23000, 4), 100)
+        self.assertEqual(loop.panic_state, "Exit")
+
+    def test_hi_volume(self):
+        loop = OneLoop("panic", "HiVolume")
+        self.assertEqual(loop.tick(45000, 50), 0)
+        self.assertEqual(loop.panic_state, "HiVolume")
+        self.assertEqual(loop.tick(21000, 4), 0)
+        self.assertEqual(loop.panic_state, "Exit")
+
+    def test_exit_returns_to_steady(self):
+        loop = OneLoop("panic", "PumpOff")
+        self.assertEqual(loop.tick(24000, 50), 0)
+        self.assertEqual((loop.state, loop.panic_state), ("panic", "Exit"))
+        self.assertIsNone(loop.tick(24000, 50))
+        self.assertEqual((loop.state, loop.panic_state), ("steady", "Exit"))
+
+
+class CompiledTableTests(unittest.TestCase):
+    """The compiled tables must give what FSM_Calc gives, for every state and word."""
+
+    def assert_same_as_fsm_calc(self, fsm, transitions, overrides):
+        for state in list(fsm.states) + ["not_a_state"]:
+            for word in range(fsm.size):
+                with contextlib.redirect_stdout(io.StringIO()):
+                    expected = FSM_Calc(state, word, transitions, {}, overrides)
+                self.assertEqual(fsm.step(state, word), expected, (state, bin(word)))
+
+    def test_secondary_loop_fsm(self):
+        self.assert_same_as_fsm_calc(
+            SecondaryLoop.Secondary_Loop_FSM,
+            SecondaryLoop.Secondary_Loop_FSM_Transition_Matrix,
+            [(fsm_bitmask_generator((SecondaryLoop.SEC_ENABLE, 0)), "off_init")],
+        )
+
+    def test_panic_mode_fsm(self):
+        self.assert_same_as_fsm_calc(
+            SecondaryLoop.Panic_Mode_FSM,
+            SecondaryLoop.Panic_Mode_FSM_Transition_Matrix,
+            [(fsm_bitmask_generator((SecondaryLoop.PANIC_ENABLE, 0)), "Exit")],
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
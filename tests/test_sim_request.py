@@ -0,0 +1,57 @@
+import time
+import unittest
+
+import requests
+
+import sim_api
+from tools.standin_server import start_standin_server
+
+
+class SweepDeadlineTests(unittest.TestCase):
+    def setUp(self):
+        self.url = sim_api.SIMULATOR_URL
+        self.server = start_standin_server(variables=20, latency_ms=2000)
+        sim_api.SIMULATOR_URL = self.server.url
+
+    def tearDown(self):
+        sim_api.SIMULATOR_URL = self.url
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_request_gives_up_at_the_deadline(self):
+        started = time.monotonic()
+        with self.assertRaises(requests.Timeout):
+            sim_api.sim_request("GET", {"Variable": "CORE_TEMP"}, started + 0.3)
+        self.assertLess(time.monotonic() - started, 0.45)
+
+    def test_sweep_leaves_no_request_behind(self):
+        workers = sim_api.FETCH_MAX_WORKERS
+        sim_api.configure_fetch(max_workers=2)
+        try:
+            started = time.monotonic()
+            values, errors = sim_api.fetch_variables(["CORE_TEMP", "CHEM_BORON_PPM"], deadline_s=0.3)
+            self.assertEqual((values, errors), ({}, 2))
+            # both workers are free again right after the sweep instead of retrying for seconds
+            sim_api._get_fetch_executor().submit(lambda: None).result(timeout=0.3)
+            self.assertLess(time.monotonic() - started, 0.6)
+        finally:
+            sim_api.configure_fetch(max_workers=workers)
+
+
+class PoolSizeTests(unittest.TestCase):
+    def setUp(self):
+        self.workers = sim_api.FETCH_MAX_WORKERS
+
+    def tearDown(self):
+        sim_api.configure_fetch(max_workers=self.workers)
+
+    def test_configure_fetch_resizes_the_http_pool(self):
+        sim_api._get_session()
+        sim_api.configure_fetch(max_workers=self.workers + 8)
+        self.assertEqual(sim_api.HTTP_POOL_SIZE, self.workers + 8 + sim_api.HTTP_POOL_SPARE)
+        adapter = sim_api._get_session().get_adapter("http://")
+        self.assertEqual(adapter._pool_maxsize, sim_api.HTTP_POOL_SIZE)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,39 @@
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from tools.standin_server import start_standin_server
+
+
+class StandinServerTests(unittest.TestCase):
+    def setUp(self):
+        self.server = start_standin_server(variables=50)
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_counters_under_concurrent_requests(self):
+        url = self.server.url + "/"
+
+        def get(n):
+            with requests.Session() as session:
+                for _ in range(n):
+                    session.get(url, params={"Variable": "CORE_TEMP"}).raise_for_status()
+
+        with ThreadPoolExecutor(8) as pool:
+            list(pool.map(get, [25] * 8))
+        self.assertEqual(self.server.counters["get"], 200)
+
+    def test_write(self):
+        response = requests.post(self.server.url + "/", params={"variable": "CHEM_BORON_DOSAGE_ORDERED_RATE", "value": "4"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.server.plant.values["CHEM_BORON_DOSAGE_ORDERED_RATE"], 4.0)
+        self.assertEqual(self.server.counters["post"], 1)
+        response = requests.post(self.server.url + "/", params={"variable": "CORE_TEMP", "value": "4"})
+        self.assertEqual(response.status_code, 400)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,115 @@
+import random
+import time
+import unittest
+
+from timer_wheel import GameTimerWheel
+
+
+DAY = 24 * 60.0
+
+
+class GameTimerWheelTests(unittest.TestCase):
+    def test_periodic_fires_once_per_period(self):
+        wheel = GameTimerWheel()
+        wheel.every("boron", 1)
+        wheel.advance(10.0)
+        self.assertTrue(wheel.take("boron"))
+        wheel.advance(10.5)
+        self.assertFalse(wheel.take("boron"))
+        wheel.advance(11.0)
+        self.assertTrue(wheel.take("boron"))
+
+    def test_paused_clock_fires_nothing(self):
+        wheel = GameTimerWheel()
+        wheel.every("boron", 1)
+        wheel.advance(10.0)
+        wheel.take("boron")
+        for _ in range(5):
+            wheel.advance(10.0)
+            self.assertFalse(wheel.take("boron"))
+
+    def test_one_shot_cooldown(self):
+        wheel = GameTimerWheel()
+        wheel.advance(0.0)
+        wheel.once("condenser_decrease", 3)
+        wheel.advance(2.0)
+        self.assertFalse(wheel.ready("condenser_decrease"))
+        wheel.advance(3.0)
+        self.assertTrue(wheel.ready("condenser_decrease"))
+
+    def test_skipped_periods_are_missed(self):
+        wheel = GameTimerWheel()
+        wheel.every("boron", 1)
+        wheel.advance(10.0)
+        wheel.take("boron")
+        wheel.advance(13.0)
+        self.assertTrue(wheel.take("boron"))
+        self.assertFalse(wheel.take("boron"))
+        self.assertEqual(wheel.timers["boron"].missed, 2)
+
+    def test_clock_going_backwards_restarts(self):
+        wheel = GameTimerWheel()
+        wheel.every("boron", 1)
+        wheel.once("condenser_decrease", 3)
+        wheel.advance(10.0)
+        wheel.advance(5.0)
+        self.assertEqual(wheel.clock_resets, 1)
+        self.assertTrue(wheel.take("boron"))
+        self.assertNotIn("condenser_decrease", wheel.timers)
+
+    def test_large_forward_jump(self):
+        wheel = GameTimerWheel()
+        wheel.every("boron", 1)
+        wheel.every("slow", 7, first=3)
+        wheel.once("cooldown", 5)
+        wheel.advance(0.0)
+        wheel.take("boron")
+
+        started = time.perf_counter()
+        wheel.advance(100 * DAY)
+        self.assertLess(time.perf_counter() - started, 0.05)
+
+        self.assertTrue(wheel.take("boron"))
+        self.assertFalse(wheel.take("boron"))
+        self.assertEqual(wheel.timers["boron"].missed, 100 * DAY - 1)
+        self.assertTrue(wheel.take("slow"))
+        self.assertTrue(wheel.ready("cooldown"))
+        # periodic timers carry on from the new time, one period later
+        wheel.advance(100 * DAY + 0.5)
+        self.assertFalse(wheel.take("boron"))
+        wheel.advance(100 * DAY + 1)
+        self.assertTrue(wheel.take("boron"))
+
+    def test_matches_a_naive_clock(self):
+        """Random timers and clock steps on a small wheel (cascades, overflow) against plain arithmetic."""
+        rng = random.Random(5)
+        for _ in range(100):
+            wheel = GameTimerWheel(resolution=1, levels=3, slot_bits=3)
+            now = rng.randint(0, 1000)
+            expected, periods = {}, {}
+            for i in range(6):
+                name = f"t{i}"
+                if rng.random() < 0.5:
+                    delay = rng.randint(0, 2000)
+                    wheel.once(name, delay)
+                    expected[name], periods[name] = now + delay, None
+                else:
+                    period, first = rng.randint(1, 300), rng.randint(0, 600)
+                    wheel.every(name, period, first=first)
+                    expected[name], periods[name] = now + first, period
+            wheel.advance(now)
+            for _ in range(200):
+                now += rng.choice([0, 1, 1, 2, 7, 50, 600, 5000])
+                wheel.advance(now)
+                for name, period in periods.items():
+                    fires = expected[name] is not None and expected[name] <= now
+                    self.assertEqual(wheel.take(name), fires, (name, now))
+                    if fires:
+                        if period is None:
+                            expected[name] = None
+                        else:
+                            expected[name] += ((now - expected[name]) // period + 1) * period
+
+
+if __name__ == "__main__":
+    unittest.main()
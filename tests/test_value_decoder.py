@@ -0,0 +1,34 @@
+import unittest
+
+from sim_api import ValueDecoder
+
+
+class ValueDecoderTests(unittest.TestCase):
+    def test_kinds(self):
+        decoder = ValueDecoder()
+        decoded = decoder.decode_many({"A": "12", "B": "-1.5e3", "C": "TRUE", "D": "REACTIVO", "E": "hello world", "F": ""})
+        self.assertEqual(decoded, {"A": 12.0, "B": -1500.0, "C": True, "D": "REACTIVO", "E": "hello world", "F": None})
+        self.assertEqual(decoder.kinds(), {"A": "float", "B": "float", "C": "bool", "D": "enum", "E": "str"})
+
+    def test_text_then_number_is_re_inferred(self):
+        decoder = ValueDecoder()
+        self.assertEqual(decoder.decode("CORE_TEMP", "N/A"), "N/A")
+        self.assertEqual(decoder.kind("CORE_TEMP"), "str")
+        self.assertEqual(decoder.decode_many({"CORE_TEMP": "312.5"}), {"CORE_TEMP": 312.5})
+        self.assertEqual(decoder.kind("CORE_TEMP"), "float")
+
+    def test_enum_then_number_is_re_inferred(self):
+        decoder = ValueDecoder()
+        decoder.decode("CORE_STATE", "REACTIVO")
+        self.assertEqual(decoder.decode("CORE_STATE", "2"), 2.0)
+        self.assertEqual(decoder.kind("CORE_STATE"), "float")
+
+    def test_empty_response_keeps_the_kind(self):
+        decoder = ValueDecoder()
+        decoder.decode("CORE_STATE", "REACTIVO")
+        self.assertIsNone(decoder.decode("CORE_STATE", ""))
+        self.assertEqual(decoder.kind("CORE_STATE"), "enum")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,287 @@
+# Filename: timer_wheel.py
+#
+# In-game-time timers for controller throttles and periods.
+#
+# Every timer runs on TIME_STAMP (in-game minutes), not the wall clock, so a paused game
+# fires nothing and a game running faster just moves the timers along faster.  The
+# controllers ask O(1) questions ("has this fired?", "is this cooldown over?") instead of
+# keeping last_*_time keys in the data dict and doing their own subtraction.
+#
+#   game_timers.every("boron", 1)                 periodic, first firing on the next advance
+#   if game_timers.take("boron"): ...             True once per firing
+#
+#   if game_timers.ready("condenser_decrease"):   one-shot used as a cooldown
+#       game_timers.once("condenser_decrease", 3)
+#       ...
+#
+# update_controller() calls advance(TIME_STAMP) once per tick.  Timers sit in a
+# hierarchical wheel (LEVELS levels of 2**SLOT_BITS slots, RESOLUTION_MIN per slot on the
+# lowest level, about 194 in-game days before the overflow list): advancing only visits
+# the slots between the old and new time that can hold a timer, and stretches with
+# nothing in the lower levels are skipped, so a big jump in game time costs little.
+#
+# A periodic timer that fires again before anyone took the previous firing, or whose
+# periods were jumped over in one advance, fires once and counts the rest in `missed`;
+# it is re-armed straight at its first expiry after the new time, so jumping days ahead
+# costs one firing per periodic timer, not one per period.
+# TIME_STAMP going backwards (a different save loaded, a replay starting over) restarts
+# the wheel: pending one-shots are dropped and periodic timers re-armed from the new time.
+#
+# Controllers get their wheel from active_timers(): game_timers, unless a ControllerScheduler
+# bound another one for the duration of its run() on that thread (tools/replay.py does, so a
+# replay never touches the live controller's timers).
+
+import contextlib
+import math
+import threading
+from typing import Any, Dict, List, Optional, Set
+
+
+RESOLUTION_MIN = 1 / 60   # one in-game second
+SLOT_BITS = 6
+LEVELS = 4
+
+
+class GameTimer:
+    __slots__ = ("name", "delay", "period", "expires", "fired", "fire_count", "missed", "_slot", "_level")
+
+    def __init__(self, name: str, delay: int, period: Optional[int]):
+        self.name = name
+        self.delay = delay            # ticks from arming to the first firing
+        self.period = period          # ticks between firings, None for a one-shot
+        self.expires: Optional[int] = None
+        self.fired = False
+        self.fire_count = 0
+        self.missed = 0
+        self._slot: Optional[Set["GameTimer"]] = None
+        self._level = -1
+
+
+class GameTimerWheel:
+    def __init__(self, resolution: float = RESOLUTION_MIN, levels: int = LEVELS, slot_bits: int = SLOT_BITS):
+        self.resolution = resolution
+        self.levels = levels
+        self.slot_bits = slot_bits
+        self.timers: Dict[str, GameTimer] = {}
+        self.now: Optional[float] = None
+        self.elapsed = 0.0            # in-game minutes covered by the last advance()
+        self.clock_resets = 0
+        self._tick = 0
+        self._target = 0              # tick advance() is moving to; equals _tick outside advance()
+        self._mask = (1 << slot_bits) - 1
+        self._wheel: List[List[Set[GameTimer]]] = [[set() for _ in range(1 << slot_bits)] for _ in range(levels)]
+        self._overflow: Set[GameTimer] = set()
+        self._counts = [0] * (levels + 1)   # timers per level, the last entry is the overflow list
+
+    def _ticks(self, minutes: float) -> int:
+        return math.floor(minutes / self.resolution + 1e-6)
+
+    def _duration(self, minutes: float) -> int:
+        return max(0, round(minutes / self.resolution))
+
+    # --- timers -----------------------------------------------------------------------
+
+    def once(self, name: str, delay: float) -> GameTimer:
+        """(Re)arms one-shot timer `name` to fire `delay` in-game minutes from now."""
+        return self._add(GameTimer(name, self._duration(delay), None))
+
+    def every(self, name: str, period: float, first: float = 0.0) -> GameTimer:
+        """(Re)arms periodic timer `name`: first firing after `first` minutes, then every `period`."""
+        if period <= 0:
+            raise ValueError(f"Timer {name!r}: period must be positive, got {period}")
+        return self._add(GameTimer(name, self._duration(first), max(1, self._duration(period))))
+
+    def cancel(self, name: str):
+        timer = self.timers.pop(name, None)
+        if timer is not None:
+            self._remove(timer)
+
+    def due(self, name: str) -> bool:
+        """True if `name` has fired and the firing hasn't been taken yet."""
+        timer = self.timers.get(name)
+        return timer is not None and timer.fired
+
+    def take(self, name: str) -> bool:
+        """Like due(), and acknowledges the firing so the next call returns False until it fires again."""
+        timer = self.timers.get(name)
+        if timer is None or not timer.fired:
+            return False
+        timer.fired = False
+        return True
+
+    def ready(self, name: str) -> bool:
+        """For cooldowns: True if `name` was never armed or has fired since it was last armed."""
+        timer = self.timers.get(name)
+        return timer is None or timer.fired
+
+    # --- clock ------------------------------------------------------------------------
+
+    def advance(self, now: float):
+        """Moves the wheel to in-game time `now`, firing everything that expired on the way."""
+        tick = self._ticks(now)
+        if self.now is None or tick < self._tick:
+            if self.now is not None:
+                self.clock_resets += 1
+                self.reset()
+            self._start(now, tick)
+            return
+        self.elapsed = now - self.now
+        self.now = now
+        self._target = tick
+
+        counts = self._counts
+        while self._tick < tick:
+            lowest = next((level for level, count in enumerate(counts) if count), None)
+            if lowest is None:
+                self._tick = tick
+                break
+            if lowest == 0:
+                # Level-0 timers all expire inside the current block: go to the next occupied slot
+                first = self._wheel[0]
+                base = self._tick & ~self._mask
+                step_to = next((base + i for i in range((self._tick & self._mask) + 1, self._mask + 1) if first[i]),
+                               base + self._mask + 1)
+            else:
+                block = 1 << (self.slot_bits * lowest)
+                step_to = (self._tick // block + 1) * block   # next slot boundary on that level
+            if step_to > tick:
+                self._tick = tick
+                break
+            self._tick = step_to
+            self._cascade()
+            self._fire_slot(self._wheel[0][step_to & self._mask])
+
+    def reset(self):
+        """Forgets the clock (replay hook): one-shots are dropped, periodic timers re-arm on the next advance()."""
+        self._clear()
+        self.timers = {name: timer for name, timer in self.timers.items() if timer.period is not None}
+        for timer in self.timers.values():
+            timer.expires = None
+            timer.fired = False
+        self.now = None
+        self.elapsed = 0.0
+
+    def _start(self, now: float, tick: int):
+        """Arms every timer added while the clock was unknown, relative to `now`."""
+        self.now = now
+        self.elapsed = 0.0
+        self._tick = self._target = tick
+        for timer in list(self.timers.values()):
+            self._arm(timer)
+
+    def _clear(self):
+        for level in self._wheel:
+            for slot in level:
+                for timer in slot:
+                    timer._slot = None
+                slot.clear()
+        for timer in self._overflow:
+            timer._slot = None
+        self._overflow.clear()
+        self._counts = [0] * (self.levels + 1)
+
+    # --- wheel ------------------------------------------------------------------------
+
+    def _add(self, timer: GameTimer) -> GameTimer:
+        self.cancel(timer.name)
+        self.timers[timer.name] = timer
+        if self.now is not None:
+            self._arm(timer)
+        return timer
+
+    def _arm(self, timer: GameTimer):
+        timer.expires = self._tick + timer.delay
+        if timer.delay == 0:
+            self._expire(timer)
+        else:
+            self._insert(timer)
+
+    def _insert(self, timer: GameTimer):
+        expires, tick, bits = timer.expires, self._tick, self.slot_bits
+        for level in range(self.levels):
+            # The lowest level whose next-higher block contains both now and the expiry
+            if expires >> (bits * (level + 1)) == tick >> (bits * (level + 1)):
+                slot = self._wheel[level][(expires >> (bits * level)) & self._mask]
+                break
+        else:
+            level, slot = self.levels, self._overflow
+        slot.add(timer)
+        timer._slot = slot
+        timer._level = level
+        self._counts[level] += 1
+
+    def _remove(self, timer: GameTimer):
+        if timer._slot is not None:
+            timer._slot.discard(timer)
+            timer._slot = None
+            self._counts[timer._level] -= 1
+
+    def _cascade(self):
+        """On a level boundary, moves the timers of the slot now starting down to the lower levels."""
+        tick, bits = self._tick, self.slot_bits
+        if tick & ((1 << (bits * self.levels)) - 1) == 0:
+            self._reinsert(self._overflow)
+        for level in range(self.levels - 1, 0, -1):
+            if tick & ((1 << (bits * level)) - 1) == 0:
+                self._reinsert(self._wheel[level][(tick >> (bits * level)) & self._mask])
+
+    def _reinsert(self, slot: Set[GameTimer]):
+        timers = list(slot)
+        for timer in timers:
+            self._remove(timer)
+        for timer in timers:
+            if timer.expires <= self._tick:
+                self._expire(timer)
+            else:
+                self._insert(timer)
+
+    def _fire_slot(self, slot: Set[GameTimer]):
+        timers = list(slot)
+        for timer in timers:
+            self._remove(timer)
+        for timer in timers:
+            self._expire(timer)
+
+    def _expire(self, timer: GameTimer):
+        if timer.fired:
+            timer.missed += 1
+        timer.fired = True
+        timer.fire_count += 1
+        if timer.period is not None:
+            # Periods up to the tick advance() is heading for are missed, not fired one by one
+            expires = timer.expires + timer.period
+            if expires <= self._target:
+                skipped = (self._target - expires) // timer.period + 1
+                timer.missed += skipped
+                expires += skipped * timer.period
+            timer.expires = expires
+            self._insert(timer)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "now": self.now,
+            "timers": len(self.timers),
+            "scheduled": sum(self._counts),
+            "clock_resets": self.clock_resets,
+            "missed": {name: timer.missed for name, timer in self.timers.items() if timer.missed},
+        }
+
+
+game_timers = GameTimerWheel()
+
+_active = threading.local()
+
+def active_timers() -> GameTimerWheel:
+    """The wheel bound to this thread by use_timers(), game_timers otherwise."""
+    wheel = getattr(_active, "wheel", None)
+    return game_timers if wheel is None else wheel
+
+@contextlib.contextmanager
+def use_timers(wheel: GameTimerWheel):
+    """Makes active_timers() return `wheel` on this thread for the duration of the block."""
+    previous = getattr(_active, "wheel", None)
+    _active.wheel = wheel
+    try:
+        yield wheel
+    finally:
+        _active.wheel = previous
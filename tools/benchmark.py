@@ -0,0 +1,263 @@
+# Filename: benchmark.py
+#
+# Acquisition benchmarks for the hot I/O path, run against the offline stand-in server.
+#
+# Cases, each repeated for every catalog size x latency profile:
+#   sweep  - fetch_variables() over the whole catalog (one full plant read)
+#   bulk   - the same full plant read through the one-request bulk path, when the server offers it
+#   cycle  - fetch_simulator_data() + update_controller(), i.e. the non-render part of poll_and_update
+#   writes - set_game_variable() + flush_game_variables() until the command queue drains
+#
+# The snapshot log and the time-series store are pointed at a temporary directory for the run,
+# so the stand-in server's made-up plant data never lands in config.LOG_DIR / TIMESERIES_DIR.
+#
+# Usage:
+#   python -m tools.benchmark                              # full matrix, writes bench_results.json
+#   python -m tools.benchmark --sizes 100 --profiles local --iterations 5
+#   python -m tools.benchmark --check                      # exit 1 if any threshold is exceeded
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterator, List
+
+import sim_api
+import controller
+
+
+# name -> (latency_ms, jitter_ms)
+LATENCY_PROFILES: Dict[str, tuple[float, float]] = {
+    "local": (0.0, 0.0),
+    "lan":   (2.0, 1.0),
+    "slow":  (10.0, 5.0),
+}
+CATALOG_SIZES = (100, 300, 1000)
+DEFAULT_THRESHOLDS = os.path.join(os.path.dirname(__file__), "benchmark_thresholds.json")
+
+
+def percentile(samples: List[float], q: float) -> float:
+    ordered = sorted(samples)
+    if not ordered:
+        return float("nan")
+    index = min(len(ordered) - 1, max(0, round(q / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+def summarize(samples_s: List[float]) -> Dict[str, float]:
+    samples_ms = [s * 1000 for s in samples_s]
+    return {
+        "p50_ms": round(percentile(samples_ms, 50), 3),
+        "p95_ms": round(percentile(samples_ms, 95), 3),
+        "p99_ms": round(percentile(samples_ms, 99), 3),
+        "max_ms": round(max(samples_ms), 3),
+    }
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+@contextlib.contextmanager
+def standin(variables: int, latency_ms: float, jitter_ms: float) -> Iterator[str]:
+    """Runs the stand-in server in its own process so it doesn't share our GIL."""
+    port = _free_port()
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "tools.standin_server", "--port", str(port), "--variables", str(variables),
+         "--latency-ms", str(latency_ms), "--jitter-ms", str(jitter_ms), "--time-scale", "10", "--seed", "1"],
+        stdout=subprocess.DEVNULL,
+    )
+    try:
+        deadline = time.monotonic() + 10
+        while True:
+            try:
+                socket.create_connection(("127.0.0.1", port), timeout=0.2).close()
+                break
+            except OSError:
+                if time.monotonic() > deadline or proc.poll() is not None:
+                    raise RuntimeError("stand-in server did not start")
+                time.sleep(0.05)
+        yield f"http://127.0.0.1:{port}"
+    finally:
+        proc.terminate()
+        proc.wait(5)
+
+@contextlib.contextmanager
+def scratch_storage() -> Iterator[str]:
+    """Sends fetch_simulator_data()'s snapshot log and time-series writes to a temporary directory."""
+    saved = (sim_api.LOG_DIR, sim_api.TIMESERIES_DIR)
+    with tempfile.TemporaryDirectory(prefix="nucleares-bench-") as scratch:
+        sim_api.close_snapshot_log()
+        sim_api.close_timeseries_store()
+        sim_api.LOG_DIR = os.path.join(scratch, "logs")
+        sim_api.TIMESERIES_DIR = os.path.join(scratch, "timeseries")
+        try:
+            yield scratch
+        finally:
+            sim_api.close_snapshot_log()
+            sim_api.close_timeseries_store()
+            sim_api.LOG_DIR, sim_api.TIMESERIES_DIR = saved
+
+def _reset_sim_api(url: str):
+    sim_api.SIMULATOR_URL = url
+    sim_api.catalog = sim_api.VariableCatalog()
+    sim_api.scheduler = sim_api.PollScheduler()
+    sim_api.actuator = sim_api.ActuatorBuffer()
+    sim_api.bulk_reader = sim_api.BulkReader()
+
+def bench_sweep(iterations: int) -> Dict[str, Any]:
+    sim_api.catalog.refresh(force=True)
+    names = sim_api.catalog.get_vars
+    samples: List[float] = []
+    errors = 0
+    for _ in range(iterations):
+        start = time.perf_counter()
+        _, sweep_errors = sim_api.fetch_variables(names, deadline_s=30)
+        samples.append(time.perf_counter() - start)
+        errors += sweep_errors
+    return {
+        **summarize(samples),
+        "variables": len(names),
+        "vars_per_s": round(len(names) * iterations / sum(samples), 1),
+        "errors": errors,
+    }
+
+def bench_bulk(iterations: int) -> Dict[str, Any]:
+    sim_api.bulk_reader.sync(sim_api.catalog)
+    if not sim_api.bulk_reader.available:
+        return {"available": False}
+    samples: List[float] = []
+    decoded: Dict[str, Any] = {}
+    for _ in range(iterations):
+        start = time.perf_counter()
+        decoded = sim_api.catalog.decoder.decode_many(sim_api.bulk_reader.read())
+        samples.append(time.perf_counter() - start)
+    return {
+        **summarize(samples),
+        "variables": len(decoded),
+        "vars_per_s": round(len(decoded) * iterations / sum(samples), 1),
+    }
+
+def bench_cycle(iterations: int) -> Dict[str, Any]:
+    data: Dict[str, Any] = {}
+    samples: List[float] = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        sim_api.fetch_simulator_data(data)
+        controller.update_controller(data)
+        samples.append(time.perf_counter() - start)
+    sim_api.actuator.commands.drain(10)
+    return {**summarize(samples), "ticks_per_s": round(iterations / sum(samples), 2)}
+
+def bench_writes(count: int) -> Dict[str, Any]:
+    variables = sim_api.catalog.set_vars or ("CONDENSER_CIRCULATION_PUMP_ORDERED_SPEED",)
+    queue = sim_api.actuator.commands
+    sent_before = queue.sent + queue.failed
+    failed_before = queue.failed
+    enqueue_samples: List[float] = []
+    start = time.perf_counter()
+    for n in range(count):
+        var = variables[n % len(variables)]
+        t0 = time.perf_counter()
+        sim_api.set_game_variable(var, n % 100)
+        sim_api.flush_game_variables()
+        enqueue_samples.append(time.perf_counter() - t0)
+        queue.drain(5)
+    elapsed = time.perf_counter() - start
+    written = queue.sent + queue.failed - sent_before
+    return {
+        **summarize(enqueue_samples),
+        "writes": written,
+        "writes_per_s": round(written / elapsed, 1),
+        "failed": queue.failed - failed_before,
+    }
+
+def run(sizes: List[int], profiles: List[str], iterations: int) -> Dict[str, Any]:
+    cases: Dict[str, Dict[str, Any]] = {}
+
+    def record(name: str, bench, *args):
+        with contextlib.redirect_stdout(io.StringIO()):
+            cases[name] = bench(*args)
+        print(f"{name:<22} {json.dumps(cases[name])}")
+
+    with scratch_storage():
+        for profile in profiles:
+            latency_ms, jitter_ms = LATENCY_PROFILES[profile]
+            for size in sizes:
+                with standin(size, latency_ms, jitter_ms) as url:
+                    _reset_sim_api(url)
+                    record(f"sweep/{size}/{profile}", bench_sweep, iterations)
+                    record(f"bulk/{size}/{profile}", bench_bulk, iterations)
+                    record(f"cycle/{size}/{profile}", bench_cycle, iterations)
+                    if size == sizes[0]:
+                        record(f"writes/{profile}", bench_writes, iterations * 10)
+    return {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "iterations": iterations,
+            "fetch_max_workers": sim_api.FETCH_MAX_WORKERS,
+            "http_pool_size": sim_api.HTTP_POOL_SIZE,
+        },
+        "cases": cases,
+    }
+
+def check(results: Dict[str, Any], thresholds: Dict[str, Dict[str, float]]) -> List[str]:
+    """
+    Compares results against thresholds.  Threshold keys are case names; metric names ending
+    in _ms are upper limits, everything else (throughputs) is a lower limit.  Keys starting
+    with "_" are notes (e.g. the machine the limits were measured on) and are skipped.
+    """
+    failures: List[str] = []
+    for name, limits in thresholds.items():
+        if name.startswith("_"):
+            continue
+        case = results["cases"].get(name)
+        if case is None:
+            continue
+        for metric, limit in limits.items():
+            value = case.get(metric)
+            if value is None:
+                continue
+            if metric.endswith("_ms") and value > limit:
+                failures.append(f"{name}: {metric} {value} > {limit}")
+            elif not metric.endswith("_ms") and value < limit:
+                failures.append(f"{name}: {metric} {value} < {limit}")
+    return failures
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the sim_api acquisition and actuator paths")
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(CATALOG_SIZES))
+    parser.add_argument("--profiles", nargs="+", choices=sorted(LATENCY_PROFILES), default=list(LATENCY_PROFILES))
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--output", default="bench_results.json")
+    parser.add_argument("--thresholds", default=DEFAULT_THRESHOLDS)
+    parser.add_argument("--check", action="store_true", help="exit non-zero when a threshold is exceeded")
+    args = parser.parse_args()
+
+    results = run(args.sizes, args.profiles, args.iterations)
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"Results written to {args.output}")
+
+    if args.check:
+        with open(args.thresholds) as f:
+            failures = check(results, json.load(f))
+        for failure in failures:
+            print(f"❌ {failure}")
+        if failures:
+            sys.exit(1)
+        print("✅ All benchmark thresholds met")
+
+
+if __name__ == "__main__":
+    main()
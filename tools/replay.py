@@ -0,0 +1,204 @@
+# Filename: replay.py
+#
+# Offline replay of recorded plant data through the controller logic.
+#
+# Each recorded snapshot is laid over a persistent data dict (only the plant variables,
+# i.e. the UPPER_CASE simulator names, so the controllers keep their own state between
+# ticks exactly as they do live) and run through the controller registry with a fresh
+# scheduler, so controllers are skipped or throttled exactly as update_controller() does.
+# Writes that would have gone to the game are captured per tick instead of sent, and the
+# controllers' console output is discarded, so hours of history replay in seconds.
+# The replay has its own timer wheel, PlantState and actuator, bound only on the calling
+# thread, so it can run while the control runtime is live without disturbing it.
+#
+# Sources:
+#   --store DIR   the full-plant columnar time-series store (config.TIMESERIES_DIR)
+#   --csv DIR     the snapshot CSV log segments (config.LOG_DIR); only log_variables are in there
+#
+# Usage:
+#   python -m tools.replay --store ~/Documents/NuclearesDataRepo/timeseries --start 2880 --end 4320
+#   python -m tools.replay --csv ~/Documents/NuclearesDataRepo --output writes.csv
+# or from code:
+#   result = replay(iter_store_snapshots(TIMESERIES_DIR))
+#   result.writes  ->  [(TIME_STAMP, variable, value), ...]
+
+import argparse
+import contextlib
+import csv
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import sim_api
+import controller
+from controller_registry import ControllerRegistry, ControllerScheduler
+from plant_state import PlantState
+from timer_wheel import GameTimerWheel
+from storage.columnar import ColumnarStoreReader
+from storage.snapshot_log import iter_snapshot_log
+
+
+class CapturingActuator:
+    """
+    Stand-in for sim_api.actuator that records writes instead of queueing them.  Writes to
+    the same variable within a tick are merged like ActuatorBuffer does, so `writes` holds
+    what the live controller would have flushed: (TIME_STAMP, variable, value) per tick.
+    """
+
+    def __init__(self):
+        self.writes: List[Tuple[float, str, Any]] = []
+        self.pending: Dict[str, Any] = {}
+        self.stamp = 0.0
+
+    def set(self, var: str, value: Any):
+        self.pending[var] = value
+
+    def flush(self) -> Dict[str, Any]:
+        for var, value in self.pending.items():
+            self.writes.append((self.stamp, var, value))
+        self.pending = {}
+        return {}
+
+    def stats(self) -> Dict[str, int]:
+        return {"merged": 0, "suppressed": 0, "queued": 0, "pending": len(self.pending), "inflight": 0}
+
+
+@contextlib.contextmanager
+def capture_writes() -> Iterator[CapturingActuator]:
+    """Routes this thread's set_game_variable() calls into a CapturingActuator for the block."""
+    with sim_api.use_actuator(CapturingActuator()) as capturing:
+        yield capturing
+
+
+class _QuietThread:
+    """
+    Stands in for sys.stdout and drops what one thread prints.  Output from other threads
+    (the control runtime) goes through to `stream` unchanged.
+    """
+
+    def __init__(self, stream: Any, thread_id: int):
+        self.stream = stream
+        self.thread_id = thread_id
+
+    def write(self, text: str) -> int:
+        if threading.get_ident() == self.thread_id:
+            return len(text)
+        return self.stream.write(text)
+
+    def flush(self):
+        self.stream.flush()
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.stream, name)
+
+
+class ReplayResult:
+    def __init__(self, writes: List[Tuple[float, str, Any]], ticks: int, elapsed_s: float, data: Dict[str, Any],
+                 controller_stats: Optional[Dict[str, Dict[str, Any]]] = None):
+        self.writes = writes
+        self.ticks = ticks
+        self.elapsed_s = elapsed_s
+        self.data = data
+        self.controller_stats = controller_stats or {}
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "ticks": self.ticks,
+            "elapsed_s": round(self.elapsed_s, 3),
+            "ticks_per_s": round(self.ticks / self.elapsed_s, 1) if self.elapsed_s else None,
+            "writes": len(self.writes),
+            "writes_by_variable": dict(Counter(var for _, var, _ in self.writes).most_common()),
+            "controller_runs": {name: stats["runs"] for name, stats in self.controller_stats.items()},
+        }
+
+
+def is_plant_variable(name: str) -> bool:
+    return name.isupper()
+
+def replay(snapshots: Iterable[Dict[str, Any]], registry: Optional[ControllerRegistry] = None,
+           data: Optional[Dict[str, Any]] = None, quiet: bool = True) -> ReplayResult:
+    """
+    Runs every snapshot through the controllers of `registry` (controller.registry by
+    default) like update_controller() does, and returns the captured writes.  `data`
+    seeds the controller state (e.g. a starting boron_controller_state); it is updated in
+    place and returned as result.data.  Timers, plant state and writes are the replay's
+    own, so throttles start fresh and a running control runtime is left alone.
+    """
+    data = {} if data is None else data
+    timers = GameTimerWheel()
+    plant_state = PlantState()
+    capturing = CapturingActuator()
+    scheduler = ControllerScheduler(registry or controller.registry, timers=timers, actuator=capturing)
+    ticks = 0
+    quiet_output = contextlib.redirect_stdout(_QuietThread(sys.stdout, threading.get_ident())) if quiet else contextlib.nullcontext()
+    start = time.perf_counter()
+    with quiet_output:
+        for snapshot in snapshots:
+            data.update({name: value for name, value in snapshot.items() if is_plant_variable(name)})
+            capturing.stamp = data.get("TIME_STAMP", 0) or 0
+            controller.apply_controller_settings(data)
+            plant = plant_state.load(data)
+            if plant.core.has_time_stamp:
+                timers.advance(plant.core.time_stamp)
+            scheduler.run(data, plant)
+            capturing.flush()
+            ticks += 1
+    return ReplayResult(capturing.writes, ticks, time.perf_counter() - start, data, scheduler.stats())
+
+
+def iter_store_snapshots(root: str, t_start: Optional[float] = None, t_end: Optional[float] = None) -> Iterator[Dict[str, Any]]:
+    return ColumnarStoreReader(root).iter_rows(t_start=t_start, t_end=t_end)
+
+def _parse_cell(text: str) -> Any:
+    if text in ("", "NaN", "None"):
+        return None
+    try:
+        return float(text)
+    except ValueError:
+        return text
+
+def iter_csv_snapshots(directory: str, t_start: Optional[float] = None, t_end: Optional[float] = None) -> Iterator[Dict[str, Any]]:
+    for row in iter_snapshot_log(directory):
+        snapshot = {name: value for name, value in ((name, _parse_cell(text)) for name, text in row.items() if text is not None) if value is not None}
+        stamp = snapshot.get("TIME_STAMP")
+        if isinstance(stamp, float) and ((t_start is not None and stamp < t_start) or (t_end is not None and stamp > t_end)):
+            continue
+        yield snapshot
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay recorded plant data through the controllers")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--store", help="columnar time-series store directory")
+    source.add_argument("--csv", help="snapshot CSV log directory")
+    parser.add_argument("--start", type=float, default=None, help="first TIME_STAMP (in-game minutes)")
+    parser.add_argument("--end", type=float, default=None, help="last TIME_STAMP (in-game minutes)")
+    parser.add_argument("--output", default=None, help="write the captured writes to this CSV")
+    parser.add_argument("--verbose", action="store_true", help="keep the controllers' console output")
+    args = parser.parse_args()
+
+    if args.store:
+        snapshots = iter_store_snapshots(args.store, args.start, args.end)
+    else:
+        snapshots = iter_csv_snapshots(args.csv, args.start, args.end)
+    result = replay(snapshots, quiet=not args.verbose)
+
+    summary = result.summary()
+    print(f"Replayed {summary['ticks']} ticks in {summary['elapsed_s']} s ({summary['ticks_per_s']} ticks/s), {summary['writes']} writes")
+    for var, count in summary["writes_by_variable"].items():
+        print(f"  {var:<45} {count}")
+    print("Controller runs:")
+    for name, count in summary["controller_runs"].items():
+        print(f"  {name:<45} {count}")
+    if args.output:
+        with open(args.output, "w", newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(["TIME_STAMP", "variable", "value"])
+            writer.writerows(result.writes)
+        print(f"Writes written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,333 @@
+# Filename: standin_server.py
+#
+# Offline stand-in for the Nucleares webserver.
+#
+# Speaks the same protocol sim_api uses against the real game:
+#   GET  /?Variable=NAME                  -> value as plain text
+#   GET  /?Variable=WEBSERVER_LIST_VARIABLES -> "GET: a,b,...\nSET: c,d,..."
+#   GET  /?Variable=WEBSERVER_VIEW_VARIABLES -> every GET variable as one JSON object (disable with --no-bulk)
+#   POST /?variable=NAME&value=VALUE      -> sets a writable variable
+#
+# The plant behind it is a crude first-order model (rods, steam generators, condenser,
+# boron), good enough to close the controller loops, not to study reactor physics.
+#
+# Run standalone:
+#   python -m tools.standin_server --port 8785 --variables 400 --latency-ms 2 --jitter-ms 1
+# or embed it (benchmarks, replay checks):
+#   server = start_standin_server(port=0, variables=200)
+#   sim_api.SIMULATOR_URL = server.url
+#   ...
+#   server.shutdown()
+
+import argparse
+import json
+import math
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Optional
+from urllib.parse import parse_qsl, urlsplit
+
+
+ROD_BANKS = 9
+
+class PlantModel:
+    """
+    Variable store plus simple plant dynamics.  step() advances the plant by a number of
+    in-game minutes; every GET/SET variable lives in `values`.
+    """
+
+    def __init__(self, variables: int = 0, loops: int = 3, seed: Optional[int] = None):
+        self.loops = loops
+        self.rng = random.Random(seed)
+        self.values: Dict[str, Any] = {
+            "TIME_STAMP": 0.0,
+            "CORE_TEMP": 320.0,
+            "CORE_TEMP_MAX": 450.0,
+            "CORE_PRESSURE": 150.0,
+            "CORE_PRESSURE_MAX": 200.0,
+            "CORE_PRESSURE_OPERATIVE": 155.0,
+            "CORE_STATE": "REACTIVO",
+            "CORE_STATE_CRITICALITY": 0.0,
+            "CORE_CRITICAL_MASS_REACHED": True,
+            "CORE_FACTOR": 1.0,
+            "CORE_INTEGRITY": 100.0,
+            "CORE_IODINE_GENERATION": 0.0,
+            "CORE_IODINE_CUMULATIVE": 0.0,
+            "CORE_XENON_GENERATION": 0.0,
+            "CORE_XENON_CUMULATIVE": 0.0,
+            "RODS_POS_ACTUAL": 55.0,
+            "POWER_DEMAND_MW": 1500.0,
+            "CONDENSER_TEMPERATURE": 100.0,
+            "CONDENSER_CIRCULATION_PUMP_SPEED": 50.0,
+            "CONDENSER_CIRCULATION_PUMP_ORDERED_SPEED": 50.0,
+            "CHEM_BORON_PPM": 1200.0,
+            "CHEM_BORON_DOSAGE_ORDERED_RATE": 0.0,
+            "CHEM_BORON_FILTER_ORDERED_SPEED": 0.0,
+        }
+        for i in range(ROD_BANKS):
+            self.values[f"ROD_BANK_POS_{i}_ACTUAL"] = 55.0
+            self.values[f"ROD_BANK_POS_{i}_ORDERED"] = 55.0
+        for i in range(loops):
+            self.values[f"COOLANT_SEC_{i}_VOLUME"] = 24000.0
+            self.values[f"COOLANT_SEC_{i}_PRESSURE"] = 60.0
+            self.values[f"COOLANT_SEC_CIRCULATION_PUMP_{i}_SPEED"] = 50.0
+            self.values[f"COOLANT_SEC_CIRCULATION_PUMP_{i}_ORDERED_SPEED"] = 50.0
+            self.values[f"STEAM_TURBINE_{i}_PRESSURE"] = 55.0
+            self.values[f"STEAM_TURBINE_{i}_TEMPERATURE"] = 280.0
+            self.values[f"STEAM_GEN_{i}_OUTLET"] = 500.0
+            self.values[f"MSCV_{i}_OPENING_ACTUAL"] = 50.0
+            self.values[f"GENERATOR_{i}_KW"] = 500000.0
+
+        self.set_vars = tuple(
+            [f"ROD_BANK_POS_{i}_ORDERED" for i in range(ROD_BANKS)]
+            + [f"COOLANT_SEC_CIRCULATION_PUMP_{i}_ORDERED_SPEED" for i in range(loops)]
+            + ["CONDENSER_CIRCULATION_PUMP_ORDERED_SPEED", "CHEM_BORON_DOSAGE_ORDERED_RATE", "CHEM_BORON_FILTER_ORDERED_SPEED"]
+        )
+
+        # Pad the catalog out to the requested size with constant filler values.
+        for n in range(max(0, variables - len(self.values))):
+            self.values[f"STANDIN_FILLER_{n}"] = self.rng.uniform(0, 100)
+        self.get_vars = tuple(self.values)
+
+    def set(self, var: str, value: str) -> bool:
+        if var not in self.set_vars:
+            return False
+        try:
+            self.values[var] = float(value)
+        except ValueError:
+            return False
+        return True
+
+    def step(self, minutes: float):
+        v = self.values
+        v["TIME_STAMP"] += minutes
+
+        rods = 0.0
+        for i in range(ROD_BANKS):
+            actual = v[f"ROD_BANK_POS_{i}_ACTUAL"]
+            ordered = min(100.0, max(0.0, v[f"ROD_BANK_POS_{i}_ORDERED"]))
+            actual += max(-5.0 * minutes, min(5.0 * minutes, ordered - actual))
+            v[f"ROD_BANK_POS_{i}_ACTUAL"] = actual
+            rods += actual
+        v["RODS_POS_ACTUAL"] = rods / ROD_BANKS
+
+        boron = v["CHEM_BORON_PPM"]
+        boron += (v["CHEM_BORON_DOSAGE_ORDERED_RATE"] * 2.0 - v["CHEM_BORON_FILTER_ORDERED_SPEED"] * boron / 500.0) * minutes
+        v["CHEM_BORON_PPM"] = max(0.0, boron)
+
+        core_temp = v["CORE_TEMP"]
+        criticality = 0.012 * (60.0 - v["RODS_POS_ACTUAL"]) - (v["CHEM_BORON_PPM"] - 1200.0) / 20000.0 - (core_temp - 350.0) / 1500.0
+        v["CORE_STATE_CRITICALITY"] = round(criticality, 4)
+        v["CORE_STATE"] = "REACTIVO" if criticality > -0.2 else "ESTABLE"
+        v["CORE_CRITICAL_MASS_REACHED"] = criticality > 0.0
+
+        heat_removed = 0.0
+        for i in range(self.loops):
+            pump = v[f"COOLANT_SEC_CIRCULATION_PUMP_{i}_SPEED"]
+            ordered = min(100.0, max(0.0, v[f"COOLANT_SEC_CIRCULATION_PUMP_{i}_ORDERED_SPEED"]))
+            pump += max(-10.0 * minutes, min(10.0 * minutes, ordered - pump))
+            v[f"COOLANT_SEC_CIRCULATION_PUMP_{i}_SPEED"] = pump
+
+            boil_off = max(0.0, core_temp - 200.0) * 12.0
+            volume = v[f"COOLANT_SEC_{i}_VOLUME"] + (pump * 30.0 - boil_off) * minutes
+            v[f"COOLANT_SEC_{i}_VOLUME"] = max(0.0, volume)
+            v[f"STEAM_GEN_{i}_OUTLET"] = boil_off / 3.0
+            v[f"STEAM_TURBINE_{i}_TEMPERATURE"] = 0.8 * core_temp
+            v[f"GENERATOR_{i}_KW"] = boil_off * 300.0
+            heat_removed += boil_off / 400.0
+
+        core_temp += (criticality * 120.0 - (heat_removed - 10.0) * 0.2) * minutes
+        v["CORE_TEMP"] = max(20.0, core_temp)
+        v["CORE_PRESSURE"] = 100.0 + v["CORE_TEMP"] / 7.0
+
+        condenser_pump = v["CONDENSER_CIRCULATION_PUMP_SPEED"]
+        ordered = min(100.0, max(0.0, v["CONDENSER_CIRCULATION_PUMP_ORDERED_SPEED"]))
+        condenser_pump += max(-10.0 * minutes, min(10.0 * minutes, ordered - condenser_pump))
+        v["CONDENSER_CIRCULATION_PUMP_SPEED"] = condenser_pump
+        condenser_target = 70.0 + heat_removed * 2.0 - condenser_pump * 0.25
+        v["CONDENSER_TEMPERATURE"] += (condenser_target - v["CONDENSER_TEMPERATURE"]) * min(1.0, 0.2 * minutes)
+
+        iodine_gen = max(0.0, criticality + 0.2) * 5.0
+        v["CORE_IODINE_GENERATION"] = iodine_gen
+        v["CORE_IODINE_CUMULATIVE"] += (iodine_gen - v["CORE_IODINE_CUMULATIVE"] * 0.01) * minutes
+        xenon_gen = v["CORE_IODINE_CUMULATIVE"] * 0.01
+        v["CORE_XENON_GENERATION"] = xenon_gen
+        v["CORE_XENON_CUMULATIVE"] += (xenon_gen - v["CORE_XENON_CUMULATIVE"] * 0.02) * minutes
+
+        v["POWER_DEMAND_MW"] = 1500.0 + 300.0 * math.sin(v["TIME_STAMP"] / 240.0)
+
+    def format(self, var: str) -> str:
+        value = self.values[var]
+        if isinstance(value, bool):
+            return "TRUE" if value else "FALSE"
+        return str(value)
+
+    def listing(self) -> str:
+        return "GET: " + ",".join(("WEBSERVER_LIST_VARIABLES", "WEBSERVER_VIEW_VARIABLES") + self.get_vars) + "\nSET: " + ",".join(self.set_vars)
+
+    def snapshot(self) -> str:
+        return json.dumps({var: self.values[var] for var in self.get_vars})
+
+
+class StandinServer(ThreadingHTTPServer):
+    """
+    HTTP front end for a PlantModel.  Every request sleeps latency + U(0, jitter) before it
+    is answered and fails with a 500 with probability `error_rate`.  In-game time runs at
+    `time_scale` in-game minutes per wall-clock second.  Requests are handled on one thread
+    each, so the model's steps, writes and the request counters all go through `_lock`.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, address, plant: PlantModel, latency_s: float = 0.0, jitter_s: float = 0.0,
+                 error_rate: float = 0.0, time_scale: float = 1.0, bulk: bool = True):
+        super().__init__(address, _StandinHandler)
+        self.plant = plant
+        self.bulk = bulk
+        self.latency_s = latency_s
+        self.jitter_s = jitter_s
+        self.error_rate = error_rate
+        self.time_scale = time_scale
+        self.counters = {"get": 0, "post": 0, "errors_injected": 0}
+        self._lock = threading.Lock()
+        self._last_step = time.monotonic()
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def count(self, counter: str):
+        with self._lock:
+            self.counters[counter] += 1
+
+    def set(self, var: str, value: str) -> bool:
+        with self._lock:
+            return self.plant.set(var, value)
+
+    def advance(self):
+        with self._lock:
+            now = time.monotonic()
+            minutes = (now - self._last_step) * self.time_scale
+            self._last_step = now
+            while minutes > 0:
+                step = min(minutes, 1.0)
+                self.plant.step(step)
+                minutes -= step
+
+
+class _StandinHandler(BaseHTTPRequestHandler):
+    server: StandinServer
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def log_message(self, format: str, *args: Any):
+        pass
+
+    def _reply(self, status: int, body: str):
+        payload = body.encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "text/plain; charset=utf-8")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _params(self) -> Dict[str, str]:
+        return {k.lower(): v for k, v in parse_qsl(urlsplit(self.path).query)}
+
+    def _delay_and_maybe_fail(self) -> bool:
+        server = self.server
+        delay = server.latency_s + random.uniform(0, server.jitter_s)
+        if delay > 0:
+            time.sleep(delay)
+        if server.error_rate and random.random() < server.error_rate:
+            server.count("errors_injected")
+            self._reply(500, "Injected error")
+            return True
+        return False
+
+    def do_GET(self):
+        server = self.server
+        server.count("get")
+        if self._delay_and_maybe_fail():
+            return
+        server.advance()
+        var = self._params().get("variable", "")
+        if var == "WEBSERVER_LIST_VARIABLES":
+            self._reply(200, server.plant.listing())
+        elif var == "WEBSERVER_VIEW_VARIABLES" and server.bulk:
+            self._reply(200, server.plant.snapshot())
+        elif var in server.plant.values:
+            self._reply(200, server.plant.format(var))
+        else:
+            self._reply(404, f"Unknown variable {var}")
+
+    def do_POST(self):
+        server = self.server
+        server.count("post")
+        length = int(self.headers.get("Content-Length") or 0)
+        if length:
+            self.rfile.read(length)
+        if self._delay_and_maybe_fail():
+            return
+        server.advance()
+        params = self._params()
+        if server.set(params.get("variable", ""), params.get("value", "")):
+            self._reply(200, "OK")
+        else:
+            self._reply(400, "Variable not writable or bad value")
+
+
+def start_standin_server(host: str = "127.0.0.1", port: int = 0, variables: int = 0, loops: int = 3,
+                         latency_ms: float = 0.0, jitter_ms: float = 0.0, error_rate: float = 0.0,
+                         time_scale: float = 1.0, bulk: bool = True, seed: Optional[int] = None) -> StandinServer:
+    """Starts a stand-in server on a background thread.  port=0 picks a free port; see .url."""
+    server = StandinServer(
+        (host, port),
+        PlantModel(variables=variables, loops=loops, seed=seed),
+        latency_s=latency_ms / 1000,
+        jitter_s=jitter_ms / 1000,
+        error_rate=error_rate,
+        time_scale=time_scale,
+        bulk=bulk,
+    )
+    threading.Thread(target=server.serve_forever, name="standin-server", daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline stand-in for the Nucleares webserver")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8785)
+    parser.add_argument("--variables", type=int, default=0, help="pad the catalog with filler variables up to this count")
+    parser.add_argument("--loops", type=int, default=3, help="number of secondary loops / steam generators")
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="probability a request fails with HTTP 500")
+    parser.add_argument("--time-scale", type=float, default=1.0, help="in-game minutes per wall-clock second")
+    parser.add_argument("--no-bulk", action="store_true", help="don't serve WEBSERVER_VIEW_VARIABLES as a bulk read")
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    server = StandinServer(
+        (args.host, args.port),
+        PlantModel(variables=args.variables, loops=args.loops, seed=args.seed),
+        latency_s=args.latency_ms / 1000,
+        jitter_s=args.jitter_ms / 1000,
+        error_rate=args.error_rate,
+        time_scale=args.time_scale,
+        bulk=not args.no_bulk,
+    )
+    print(f"Nucleares stand-in serving {len(server.plant.get_vars)} variables on {server.url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()